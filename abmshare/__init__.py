@@ -1 +1,22 @@
-from covasim import immunity, parameters, sim
+import importlib
+
+"""
+Modules are imported lazily (on the first access of attribute), so importing abmshare does not pull in covasim and
+synthpops. Covasim modules immunity, parameters and sim are kept accessible as abmshare attributes.
+"""
+
+_covasim_modules=["immunity","parameters","sim"]
+_submodules=["covasim_ex","datafile_cache","defaults","extension_controller","grid_compute_ex","report_ex","run_plan",
+             "synthpops_ex","utils","validator"]
+
+
+def __getattr__(name:str):
+    if name in _covasim_modules:
+        return importlib.import_module(f"covasim.{name}")
+    if name in _submodules:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals().keys())+_covasim_modules+_submodules)
@@ -1,7 +1,9 @@
 import argparse
 import os
+import sys
 
 import abmshare.extension_controller as exct
+import abmshare.utils as exut
 
 if __name__=="__main__":
     parser =  argparse.ArgumentParser(description="Short sample app")
@@ -10,8 +12,16 @@ if __name__=="__main__":
     parser.add_argument("-g", "--grid_compute", nargs="?", default=False, const=True, choices=[True, False, "true", "True", "false", "False"])
     parser.add_argument("-u","--user")
     parser.add_argument("-t","--test")
+    parser.add_argument("-r","--resume",help="Output directory of interrupted run, simulation continues from its latest checkpoint")
+    parser.add_argument("-p","--import_profile",nargs="?",default=None,const=True,help="Print import time profile of the run (optionally save it to given csv file)")
     args=parser.parse_args()
 
+    if args.import_profile:
+        argv=list(sys.argv)
+        i=next(i for i,arg in enumerate(argv) if arg in ["-p","--import_profile"] or arg.startswith("--import_profile="))
+        del argv[i:i+(2 if isinstance(args.import_profile,str) and argv[i] in ["-p","--import_profile"] else 1)]
+        sys.exit(exut.profile_imports(argv,filepath=args.import_profile if isinstance(args.import_profile,str) else None))
+
     if args.grid_compute in ["true", "True", True]:
         grid_compute = True
     else:
@@ -30,6 +40,6 @@ if __name__=="__main__":
     user=args.user or os.getlogin()
 
 
-    meh = exct.ExtensionController(configuration=args.config,grid_compute=grid_compute,grid_user=user,validate=args.validate,test=args.test) #args.config
+    meh = exct.ExtensionController(configuration=args.config,grid_compute=grid_compute,grid_user=user,validate=args.validate,test=args.test,resume=args.resume) #args.config
     meh.start()
     print("Everything is done")
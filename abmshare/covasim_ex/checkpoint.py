@@ -0,0 +1,114 @@
+import glob
+import os
+import random
+
+import numba as nb
+import numpy as np
+
+import abmshare.defaults as exdf
+import abmshare.utils as exut
+import covasim as cv
+
+"""
+Checkpoints of multi region simulations.
+Checkpoint is written after the whole day t (steps and mobility synchronization) and contains all regions
+(cv.Sim with people, unique mobility indexes) and random states (numpy, python, numba), so resumed run
+continues exactly as the uninterrupted one.
+This holds for the sequential run and for region worker processes. Thread backend steps regions concurrently
+in new threads every day, they share numpy random state and numba random state is per thread, so resumed
+(and also uninterrupted) runs with thread backend are not bit-identical.
+"""
+
+
+def numba_rng_api():
+    """Private numba API with random states (numba has no public one), states are per thread
+
+    Raises:
+        RuntimeError: installed numba does not provide it
+
+    """
+    helperlib=getattr(nb,"_helperlib",None)
+    if helperlib is None or not all(hasattr(helperlib,name) for name in ["rnd_get_state","rnd_set_state","rnd_get_np_state_ptr","rnd_get_py_state_ptr"]):
+        raise RuntimeError(f"Random state of numba {nb.__version__} cannot be saved or restored (numba._helperlib API is missing), "
+                           "checkpoints are not supported with this numba version.")
+    return helperlib
+
+
+def get_rng_state()->dict:
+    """Random states of the actual process (numpy, python random and numba of the calling thread, which is used in covasim utils)
+    """
+    helperlib=numba_rng_api()
+    return {"numpy":np.random.get_state(),
+            "python":random.getstate(),
+            "numba_np":helperlib.rnd_get_state(helperlib.rnd_get_np_state_ptr()),
+            "numba_py":helperlib.rnd_get_state(helperlib.rnd_get_py_state_ptr())}
+
+
+def set_rng_state(state:dict):
+    """Restore random states saved by get_rng_state (numba state of the calling thread)
+    """
+    helperlib=numba_rng_api()
+    np.random.set_state(state["numpy"])
+    random.setstate(state["python"])
+    helperlib.rnd_set_state(helperlib.rnd_get_np_state_ptr(),state["numba_np"])
+    helperlib.rnd_set_state(helperlib.rnd_get_py_state_ptr(),state["numba_py"])
+
+
+def get_checkpoint_dirpath(save_settings:dict)->str|None:
+    if not save_settings or not save_settings.get("location"):
+        return None
+    return exut.merge_twoPaths(save_settings["location"],exdf.default_checkpoint_rel_path)
+
+
+def save_checkpoint(dirpath:str,day:int,data:dict,keep:int=None)->str:
+    """Save checkpoint for day (written to temporary file first, so killed job does not leave broken checkpoint)
+
+    Args:
+        dirpath (str): directory with checkpoints
+        day (int): last finished day
+        data (dict): checkpoint data (regions, rng states, ...)
+        keep (int, optional): how many latest checkpoints keep. Defaults to exdf.default_checkpoint_keep.
+
+    Returns:
+        str: path to saved checkpoint
+
+    """
+    keep=keep or exdf.default_checkpoint_keep
+    exut.directory_validator(dirpath)
+    filepath=os.path.join(dirpath,f"{exdf.default_checkpoint_prefix}{day:05d}.pkl")
+    data["day"]=day
+    cv.save(f"{filepath}.tmp",data)
+    os.replace(f"{filepath}.tmp",filepath)
+    for old in list_checkpoints(dirpath)[:-keep]:
+        os.remove(old)
+    return filepath
+
+
+def list_checkpoints(dirpath:str)->list:
+    """Checkpoints in directory sorted by day
+    """
+    if dirpath is None or not os.path.isdir(dirpath):
+        return []
+    return sorted(glob.glob(os.path.join(dirpath,f"{exdf.default_checkpoint_prefix}*.pkl")))
+
+
+def load_latest_checkpoint(path:str)->dict|None:
+    """Load checkpoint. Path can be checkpoint file, checkpoint directory or output directory of the run.
+
+    Args:
+        path (str): path to checkpoint or directory
+
+    Returns:
+        dict|None: checkpoint data, None if there is no checkpoint
+
+    """
+    if path is None:
+        return None
+    if os.path.isfile(path):
+        return cv.load(path)
+    checkpoints=list_checkpoints(path) or list_checkpoints(os.path.join(path,exdf.default_checkpoint_rel_path))
+    if not checkpoints:
+        print(f"There is no checkpoint in {path}")
+        return None
+    print(f"Resuming from checkpoint {checkpoints[-1]}")
+    return cv.load(checkpoints[-1])
@@ -0,0 +1,131 @@
+import contextlib
+import multiprocessing as mp
+import os
+
+import numpy as np
+import sciris as sc
+
+import abmshare.covasim_ex.mobility as mb
+import abmshare.defaults as exdf
+import covasim.utils as cvu
+
+"""
+Ensemble (multi seed) run of the whole coupled multi region simulation.
+Regions are created (and populations loaded) only once in the parent process, every member runs in freshly forked
+process (copy-on-write), so populations are not loaded again. Members send back only results, which are streamed
+into per region arrays and reduced to quantiles same way as cv.MultiSim.reduce.
+"""
+
+# Simulation_creator with created regions, inherited by forked members
+_ensemble_creator=None
+
+
+def run_ensemble_member(args:tuple)->tuple:
+    """Run one member of ensemble (in forked process). Regions of parent are used directly, because every member
+    has its own process (maxtasksperchild=1).
+
+    Args:
+        args (tuple): (index of member, seed)
+
+    Returns:
+        tuple: (index, {location code: results of cv.Sim})
+
+    """
+    index,seed=args
+    creator=_ensemble_creator
+    creator.checkpoint_settings=None
+    creator.save_settings={} # Members do not write checkpoints or progress records to output directory
+    cvu.set_seed(seed)
+    for region in creator.region_objects.values():
+        region.cv_simulation["rand_seed"]=seed
+        region.cv_simulation.init_infections()
+    if creator.mobility:
+        creator.mobility_graph=mb.interactions(creator.region_objects,init=True,indexes=creator.mobility_indexes)
+    with open(os.devnull,"w") as devnull, contextlib.redirect_stdout(devnull):
+        creator.run_single_core_sims()
+    return index,{code:region.cv_simulation.results for code,region in creator.region_objects.items()}
+
+
+class EnsembleReducer:
+    """Collects results of ensemble members (one member at time) and reduces them to median and quantiles.
+    """
+    def __init__(self,n_runs:int,quantiles:dict=None):
+        self.n_runs=n_runs
+        self.quantiles=quantiles or exdf.default_ensemble_quantiles
+        self.raw={}
+        self.templates={}
+        self.received=0
+
+    def add(self,index:int,results:dict):
+        """Add results of one member
+
+        Args:
+            index (int): index of member
+            results (dict): location code -> results of cv.Sim
+
+        """
+        for code,region_results in results.items():
+            raw=self.raw.setdefault(code,{})
+            if code not in self.templates:
+                self.templates[code]=region_results
+            for reskey,result in region_results.items():
+                if reskey=="variant":
+                    for varkey,varresult in result.items():
+                        raw.setdefault(("variant",varkey),np.zeros(varresult.values.shape+(self.n_runs,)))[...,index]=varresult.values
+                elif hasattr(result,"values"):
+                    raw.setdefault(reskey,np.zeros(result.values.shape+(self.n_runs,)))[...,index]=result.values
+        self.received+=1
+
+    def reduce(self,sims:dict)->dict:
+        """Write median, low and high quantiles to results of given sims
+
+        Args:
+            sims (dict): location code -> cv.Sim (base sims of regions)
+
+        Returns:
+            dict: location code -> reduced cv.Sim
+
+        """
+        for code,sim in sims.items():
+            results=sc.dcp(self.templates[code])
+            for key,raw in self.raw[code].items():
+                result=results["variant"][key[1]] if isinstance(key,tuple) else results[key]
+                result.values[:]=np.quantile(raw,q=0.5,axis=-1)
+                result.low=np.quantile(raw,q=self.quantiles["low"],axis=-1)
+                result.high=np.quantile(raw,q=self.quantiles["high"],axis=-1)
+            sim.results=results
+            sim.results_ready=True
+            sim.t=sim.npts-1
+            sim.metadata=dict(parallelized=True,combined=False,n_runs=self.received,quantiles=self.quantiles,use_mean=False,bounds=None)
+            sim.compute_summary()
+        return sims
+
+
+def run_ensemble(creator,n_runs:int,seeds:list=None,quantiles:dict=None,n_workers:int=None)->dict:
+    """Run ensemble of the coupled simulation, regions of creator must be created (without initial infections)
+
+    Args:
+        creator (Simulation_creator): creator with created regions
+        n_runs (int): number of members
+        seeds (list, optional): seeds of members. Defaults to None (rand_seed of the first region + index of member).
+        quantiles (dict, optional): {"low":float,"high":float}. Defaults to None (0.1, 0.9).
+        n_workers (int, optional): number of parallel members. Defaults to None (cpu count).
+
+    Returns:
+        dict: location code -> reduced cv.Sim
+
+    """
+    global _ensemble_creator
+    if seeds is None:
+        base_seed=next(iter(creator.region_objects.values())).cv_simulation["rand_seed"]
+        seeds=[base_seed+i for i in range(n_runs)]
+    reducer=EnsembleReducer(n_runs=n_runs,quantiles=quantiles)
+    _ensemble_creator=creator
+    try:
+        with mp.get_context("fork").Pool(processes=min(n_runs,n_workers or mp.cpu_count()),maxtasksperchild=1) as pool:
+            for index,results in pool.imap_unordered(run_ensemble_member,list(enumerate(seeds))):
+                reducer.add(index,results)
+                print(f"Ensemble member {reducer.received}/{n_runs} done")
+    finally:
+        _ensemble_creator=None
+    return reducer.reduce({code:region.cv_simulation for code,region in creator.region_objects.items()})
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 
 import abmshare.covasim_ex.simulation_conf_getter as exscg
 import abmshare.defaults as exdf
+import abmshare.run_plan as exrp
 import abmshare.utils as exut
 import covasim.immunity as cvim
 import covasim.interventions as cvi
@@ -280,7 +281,7 @@ def calculate_daytime(start_day:str|datetime|int=None,end_day:str|datetime|int=N
         start_day (str | dt.datetime | int, optional): Start day of intervention by num of day represented as datetime or int. Defaults to None.
         end_day (str | dt.datetime | int, optional): End day of intervention by num of day represented as datetime or int Defaults to None.
         num_days (int | str | list, optional): Start and end of intervention time, Or start time - as integer only Defaults to None.
-        config (dict | str, optional): base configuration file. Defaults to None.
+        config (dict | str | RunPlan, optional): base configuration file or compiled run plan. Defaults to None.
         return_days (bool, optional): When false returns datetime, whent true returns days as ints Defaults to False.
 
     Returns
@@ -288,10 +289,10 @@ def calculate_daytime(start_day:str|datetime|int=None,end_day:str|datetime|int=N
         list|bool: [start_day,end_day] in datetime or int days, depends on return_days boolean. Or False if not possible to calculatef
 
     """
-    # sim_start_date=exscg.get_global_pars(config,'start_day') if not None else exdf.covasim_default_datetime # Get simulation date
-    sim_start_datetime=exut.convert_str_to_date(exscg.get_global_pars(config,"start_day") if not None else exdf.covasim_default_datetime,exdf.covasim_datetime_format) # Get simulation date
-    sim_end_datetime=exut.convert_str_to_date(exscg.get_global_pars(config,"start_day") if not None else exdf.covasim_default_datetime,exdf.covasim_datetime_format) # Get simulation date
-    sim_end_datetime=sim_start_datetime + timedelta(days=exscg.get_global_pars(config,"n_days")) # Get simulation date
+    # Compiled run plan already contains start day and n_days, otherwise global pars are loaded only once
+    global_pars=config.get_global_pars() if isinstance(config,exrp.RunPlan) else exscg.get_global_pars(config) or {}
+    sim_start_datetime=exut.convert_str_to_date(global_pars.get("start_day") or exdf.covasim_default_datetime,exdf.covasim_datetime_format) # Get simulation date
+    sim_end_datetime=sim_start_datetime + timedelta(days=global_pars.get("n_days")) # Get simulation date
     # sim_start_datetime=dt.datetime.strptime(sim_start_date,exdf.covasim_datetime_format) # Convert to datetime
     if isinstance(num_days,str):
         try: num_days=int(num_days)
@@ -415,7 +416,17 @@ def process_interventions(interventions:list,config:dict)->list:
                     intervention_list.pop()
     return intervention_list
 
-def create_variants(config:str|dict,code:str):
+def get_variants_by_code(config:str|dict,code:str)->list:
+    """Variant rows of region (region specific, parent and global)
+
+    Args:
+        config (str | dict): simulation configuration
+        code (str): location code
+
+    Returns:
+        list: list of variant dictionaries
+
+    """
     config=exut.load_config(config)
     if config.get("variants",None) is None or config["variants"].get("filepath",None) is None:
         return []
@@ -436,9 +447,21 @@ def create_variants(config:str|dict,code:str):
             if key in exdf.interventions["variant"]:
                 d[key]=data.loc[i,key]
         prep_output.append(d)
-    # Finalize
+    return prep_output
+
+def process_variants(variants:list,config:dict)->list:
+    """Create covasim variants from variant rows
+
+    Args:
+        variants (list): variant dictionaries
+        config (dict): base configuration file or compiled run plan - for providing start daytime of simulation to calculate days
+
+    Returns:
+        list: list of cvim.variant
+
+    """
     output=[]
-    for variant in prep_output:
+    for variant in variants:
         int_days=calculate_daytime(start_day=variant.get("start_day",None),end_day=variant.get("end_day",None),
                             num_days=variant.get("num_days"),config=config,return_days=True)
         int_days=validate_days_and_beta_change(intervention=variant,int_days=int_days)
@@ -450,6 +473,10 @@ def create_variants(config:str|dict,code:str):
                                    ))
     return output
 
+def create_variants(config:str|dict,code:str):
+    config=exut.load_config(config)
+    return process_variants(get_variants_by_code(config,code),config)
+
 # testing only
 # import extensions.covasim_ex.immunity_process as eximm
 # import covasim.parameters as cvpar
@@ -0,0 +1,142 @@
+import copy
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import abmshare.defaults as exdf
+import abmshare.run_plan as exrp
+import abmshare.utils as exut
+
+"""
+Day-indexed intervention schedule.
+Interventions of all regions of the run plan (days are already resolved there, global pars are loaded only once) are
+compiled once into dense day x region x intervention tables: activation and parameter value of each intervention on
+each day. Regions get their slice of the schedule, stepping looks up mobility exclusion of the day by index instead of
+checking day ranges of all mobility interventions. Schedule can be exported as table for auditing.
+"""
+
+
+def intervention_days(intervention:exrp.InterventionPlan,n_days:int)->tuple:
+    """First and last active day of intervention (inclusive, clipped to simulation days), None if never active
+    """
+    if intervention.start_day is None: # Days could not be resolved, intervention is not created
+        return None
+    start_day=intervention.start_day
+    end_day=n_days if intervention.end_day is None else intervention.end_day
+    if intervention.type in exdf.intervention_schedule_reset_types and intervention.end_day is not None:
+        end_day-=1 # Change is reverted on the end day
+    start_day,end_day=max(start_day,0),min(end_day,n_days)
+    return (start_day,end_day) if start_day<=end_day else None
+
+
+def intervention_value(intervention:exrp.InterventionPlan)->float:
+    """Parameter value of intervention while it is active (e.g. beta change, daily tests), nan if it is not a number
+    """
+    value=exrp.pairs_to_dict(intervention.pars).get(exdf.intervention_schedule_value_keys.get(intervention.type))
+    if isinstance(value,(list,tuple)):
+        value=value[0] if value else None
+    try:
+        return float(value)
+    except (TypeError,ValueError):
+        return np.nan
+
+
+class InterventionSchedule:
+    """Activation (bool) and values (float, nan if inactive) of interventions by [day, region, intervention slot].
+    Slot is the position of intervention in the region plan, regions with less interventions have inactive slots.
+    """
+    def __init__(self,codes:tuple,start_day:str,n_days:int,interventions:dict):
+        """
+        Args:
+            codes (tuple): location codes of regions
+            start_day (str): start day of simulation
+            n_days (int): number of simulation days (days 0..n_days are scheduled)
+            interventions (dict): location code -> tuple of InterventionPlan
+        """
+        self.codes=tuple(codes)
+        self.start_day=start_day
+        self.n_days=n_days
+        self.interventions={code:tuple(interventions.get(code,())) for code in self.codes}
+        self.code_index={code:i for i,code in enumerate(self.codes)}
+        n_slots=max([len(items) for items in self.interventions.values()] or [0])
+        self.active=np.zeros((n_days+1,len(self.codes),n_slots),dtype=bool)
+        self.values=np.full(self.active.shape,np.nan)
+        for r,code in enumerate(self.codes):
+            for k,intervention in enumerate(self.interventions[code]):
+                days=intervention_days(intervention,n_days)
+                if days is None:
+                    continue
+                self.active[days[0]:days[1]+1,r,k]=True
+                self.values[days[0]:days[1]+1,r,k]=intervention_value(intervention)
+        types=np.array([[intervention.type for intervention in self.interventions[code]]+[None]*(n_slots-len(self.interventions[code]))
+                        for code in self.codes],dtype=object).reshape(len(self.codes),n_slots)
+        self.mobility_excluded=(self.active&(types==exdf.intervention_names_mapping["mobility_change"])).any(axis=2)
+
+    def is_mobility_excluded(self,code:str,t:int)->bool:
+        """Region has active mobility_change intervention on day t (it is excluded from mobility)
+        """
+        return 0<=t<=self.n_days and bool(self.mobility_excluded[t,self.code_index[code]])
+
+    def region_schedule(self,code:str)->"InterventionSchedule":
+        """Schedule of one region (e.g. for Region in worker process), slice of the compiled tables
+        """
+        r=self.code_index[code]
+        schedule=copy.copy(self)
+        schedule.codes=(code,)
+        schedule.interventions={code:self.interventions[code]}
+        schedule.code_index={code:0}
+        schedule.active=self.active[:,r:r+1].copy()
+        schedule.values=self.values[:,r:r+1].copy()
+        schedule.mobility_excluded=self.mobility_excluded[:,r:r+1].copy()
+        return schedule
+
+    def to_dataframe(self,only_active:bool=False)->pd.DataFrame:
+        """Schedule as long table (day, date, location_code, slot, type, label, active, value)
+        """
+        start=exut.convert_str_to_date(self.start_day or exdf.covasim_default_datetime,exdf.covasim_datetime_format)
+        dates=[exut.convert_date_to_str(start+timedelta(days=t),exdf.covasim_datetime_format) for t in range(self.n_days+1)]
+        frames=[]
+        for r,code in enumerate(self.codes):
+            for k,intervention in enumerate(self.interventions[code]):
+                frames.append(pd.DataFrame({"day":np.arange(self.n_days+1),
+                                            "date":dates,
+                                            "location_code":code,
+                                            "slot":k,
+                                            "type":intervention.type,
+                                            "label":exrp.pairs_to_dict(intervention.pars).get("label"),
+                                            "active":self.active[:,r,k],
+                                            "value":self.values[:,r,k]}))
+        columns=["day","date","location_code","slot","type","label","active","value"]
+        df=pd.concat(frames,ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        if only_active:
+            df=df[df["active"]].reset_index(drop=True)
+        return df.sort_values(["day","location_code","slot"],kind="stable",ignore_index=True)
+
+    def export(self,filepath:str,only_active:bool=False)->str:
+        """Save schedule table as csv or xlsx (by extension of filepath)
+        """
+        df=self.to_dataframe(only_active=only_active)
+        if filepath.lower().endswith(".xlsx"):
+            df.to_excel(filepath,index=False)
+        else:
+            df.to_csv(filepath,index=False)
+        return filepath
+
+
+def compile_schedule(plan:exrp.RunPlan,codes:list=None)->InterventionSchedule:
+    """Compile interventions of regions of run plan into day indexed schedule
+
+    Args:
+        plan (exrp.RunPlan): compiled run plan (with simulation configuration)
+        codes (list, optional): only these regions. Defaults to None (all regions of the plan).
+
+    Returns:
+        InterventionSchedule: schedule
+
+    """
+    if plan.n_days is None:
+        raise ValueError("Run plan does not contain simulation, intervention schedule can not be compiled.")
+    regions=[region for region in plan.regions if codes is None or region.location_code in codes]
+    return InterventionSchedule(tuple(region.location_code for region in regions),plan.start_day,plan.n_days,
+                                {region.location_code:region.interventions for region in regions})
@@ -1,4 +1,5 @@
-import random as rnd
+import os
+import zlib
 
 import numpy as np
 import pandas as pd
@@ -20,32 +21,101 @@ def synchronize_people(s1, s2, c1_ids,c2_ids,init_infection=False):
     s2 = foreign region simulation
     c1_ids,c2_ids = indexes calculated via "mobility_indexes" method. It works the way that, for example person id[2] in s1 is the same as person id[end-2] in s2
     init_infection(bool)            : if its init infection, then synchronize all pars
+    Commuter slices of all states are gathered at once, resolved by masks and every changed array is written back by one scatter.
     """
+    if c1_ids is None or c2_ids is None or len(c1_ids)==0:
+        return
+    states1=gather_people_states(s1,c1_ids)
+    states2=gather_people_states(s2,c2_ids)
+    changed1,changed2=synchronize_states(states1,states2)
+    scatter_people_states(s1,c1_ids,states1,changed1)
+    scatter_people_states(s2,c2_ids,states2,changed2)
+
+
+def gather_people_states(sim, ids):
+    """Copy synchronized states of given people out of the simulation.
+    Used when simulations lives in different processes, so only commuters are exchanged, not whole regions.
+
+    Args:
+        sim (cv.Sim): simulation with people
+        ids (list): indexes of people to copy
+
+    Returns:
+        dict: state name -> numpy array (copy), variant states are 2D arrays (n_variants x len(ids))
+
+    """
+    ids=np.asarray(ids,dtype=np.int64)
+    states={}
     for par in exdf.person_all_states:
         if par == "uid":
             continue
-        p1 = getattr(s1.people, par)[c1_ids]
-        p2 = getattr(s2.people, par)[c2_ids]
-        m_id = np.where(np.logical_xor(np.isnan(p1),np.isnan(p2)) | (~np.isnan(p1) & ~np.isnan(p2) & (p1 != p2)))[0]
-        for id in m_id:
-            if np.isnan(p1[id]):
-                getattr(s1.people, par)[c1_ids[id]] = getattr(s2.people, par)[c2_ids[id]]
-            elif np.isnan(p2[id]) or p1[id] != p2[id]:
-                getattr(s2.people, par)[c2_ids[id]] = getattr(s1.people, par)[c1_ids[id]]
-
+        states[par] = getattr(sim.people, par)[ids]
     for par in exdf.person_arrays:
-        for variant in range(s1.pars["n_variants"]):
-            # p1 = getattr(s1.people, par)[variant][[c1_ids]]
-            # p2 = getattr(s2.people, par)[variant][[c2_ids]]
-            p1 = getattr(s1.people, par)[variant][c1_ids]
-            p2 = getattr(s2.people, par)[variant][c2_ids]
-            m_id = np.where(np.logical_xor(np.isnan(p1), np.isnan(p2)) | (~np.isnan(p1) & ~np.isnan(p2) & np.not_equal(p1, p2)))[0]
+        states[par] = getattr(sim.people, par)[:sim.pars["n_variants"], ids]
+    return states
+
+
+def scatter_people_states(sim, ids, states:dict, masks:dict=None):
+    """Write states gathered by gather_people_states (and synchronized) back to the simulation.
+
+    Args:
+        sim (cv.Sim): simulation with people
+        ids (list): indexes of people, same order as for gathering
+        states (dict): state name -> numpy array
+        masks (dict, optional): state name -> boolean mask of changed values, only those are written. Defaults to None (write all given states).
+
+    """
+    ids=np.asarray(ids,dtype=np.int64)
+    for par,values in states.items():
+        if masks is not None:
+            if par not in masks:
+                continue
+            if par in exdf.person_arrays:
+                rows,cols=np.nonzero(masks[par])
+                getattr(sim.people, par)[rows, ids[cols]] = values[rows, cols]
+            else:
+                getattr(sim.people, par)[ids[masks[par]]] = values[masks[par]]
+        elif par in exdf.person_arrays:
+            getattr(sim.people, par)[:values.shape[0], ids] = values
+        else:
+            getattr(sim.people, par)[ids] = values
 
-            for id in m_id:
-                if np.isnan(p1[id]):
-                    getattr(s1.people, par)[variant][c1_ids[id]] = getattr(s2.people, par)[variant][c2_ids[id]]
-                elif np.isnan(p2[id]) or np.not_equal(p1[id], p2[id]):
-                    getattr(s2.people, par)[variant][c2_ids[id]] = getattr(s1.people, par)[variant][c1_ids[id]]
+
+def synchronize_values(p1, p2):
+    """Resolve differences between the same people in two arrays (in place).
+    Missing (NaN) value is taken from the other region, otherwise home region value (p1) wins.
+
+    Returns:
+        tuple: boolean masks of changed values in p1 and p2
+
+    """
+    nan1 = np.isnan(p1)
+    nan2 = np.isnan(p2)
+    mismatch = np.logical_xor(nan1, nan2) | (~nan1 & ~nan2 & np.not_equal(p1, p2))
+    to_p1 = mismatch & nan1
+    to_p2 = mismatch & ~nan1
+    p1[to_p1] = p2[to_p1]
+    p2[to_p2] = p1[to_p2]
+    return to_p1, to_p2
+
+
+def synchronize_states(states1:dict, states2:dict):
+    """Same as synchronize_people, but on states gathered from the simulations (in place).
+    states1 = states of commuters in home region
+    states2 = states of the same commuters in foreign region
+
+    Returns:
+        tuple: dicts (state name -> mask of changed values) for states1 and states2, only changed states are included
+
+    """
+    changed1,changed2={},{}
+    for par in states1:
+        to_p1,to_p2=synchronize_values(states1[par],states2[par])
+        if to_p1.any():
+            changed1[par]=to_p1
+        if to_p2.any():
+            changed2[par]=to_p2
+    return changed1,changed2
 
 
 # def create_default_mobility_indexes(region_list:dict):
@@ -70,67 +140,289 @@ def synchronize_people(s1, s2, c1_ids,c2_ids,init_infection=False):
 
 #             output[loc_code2]=(list(range(int(min_id1), int(max_id1))), list(range(int(min_id2), int(max_id2))))
 
-def extract_indexes(random_indexes, count):
-    """Helper function for creating random mobility indexes
+def mobility_count(value)->int:
+    """Number of commuters, missing value means no commuters
+    """
+    return 0 if value is None or pd.isna(value) else int(value)
+
+
+def allocate_mobility_indexes(region, partners:list, seed:int=None)->dict:
+    """Allocate commuter indexes of one region. Region population is permuted once with a generator seeded
+    by the simulation seed and location code (so it does not depend on order or other regions) and every
+    incoming/outcoming partner gets contiguous block of the permutation.
 
     Args:
-        random_indexes (_type_): random indexes to pick from
-        count (_type_): number of random indexes to pick
+        region (Region): region with mobility data
+        partners (list): location codes of other regions
+        seed (int, optional): simulation seed. Defaults to None (rand_seed of region simulation).
 
     Returns:
-        list: list of indexes by specific range
+        dict: {"incoming_indexes":{code:np.ndarray(int32)},"outcoming_indexes":{code:np.ndarray(int32)}}
 
-    """
-    out = set(rnd.sample(list(random_indexes), count))
-    random_indexes -= out
-    return list(out)
+    Raises:
+        ValueError: if region has more commuters than people
 
-def create_random_mobility_indexes(region_list:dict):
+    """
+    if seed is None:
+        seed=region.rand_seed or 0
+    counts_in=[mobility_count((region.mobility_incoming_data or {}).get(code)) for code in partners]
+    counts_out=[mobility_count((region.mobility_data or {}).get(code)) for code in partners]
+    total_sum=sum(counts_in)+sum(counts_out)
+    if total_sum>int(region.population_size):
+        raise ValueError(f"Region {region.location_code} has {total_sum} commuters (incoming and outcoming), "
+                         f"which is more than its population size {int(region.population_size)}.")
+    rng=np.random.default_rng(np.random.SeedSequence([int(seed),zlib.crc32(str(region.location_code).encode())]))
+    random_indexes=rng.permutation(int(region.population_size))[:total_sum].astype(np.int32)
+    incoming_dict,outcoming_dict={},{}
+    start=0
+    for code,count_in,count_out in zip(partners,counts_in,counts_out):
+        incoming_dict[code]=random_indexes[start:start+count_in]
+        start+=count_in
+        outcoming_dict[code]=random_indexes[start:start+count_out]
+        start+=count_out
+    return {
+        "incoming_indexes":incoming_dict,
+        "outcoming_indexes":outcoming_dict,
+    }
+
+
+def create_random_mobility_indexes(region_list:dict,seed:int=None):
     """Method for random picking indexes for mobility
 
     Args:
-        region_list (dict): _description_
+        region_list (dict): location code -> Region
+        seed (int, optional): simulation seed. Defaults to None (rand_seed of every region simulation).
 
     """
     for key, val in region_list.items():
-        total_sum = int(sum(v for v in val.mobility_incoming_data.values() if not pd.isna(v)))
-        total_sum+=int(sum(v for v in val.mobility_data.values() if not pd.isna(v)))
-        # Use a set for random_indexes for faster membership checks and differences
-        random_indexes = set(rnd.sample(range(int(val.population_size)), total_sum))
-        incoming_dict={}
-        outcoming_dict={}
-        for key2, val2 in region_list.items():
-            incoming_indexes, outcoming_indexes = [], []
-            if key == key2:
-                continue
+        val.unique_mobility_indexes=allocate_mobility_indexes(val,[key2 for key2 in region_list.keys() if key2!=key],seed=seed)
+
+
+def save_mobility_indexes(region_list:dict,filepath:str):
+    """Save mobility indexes of all regions (npz, key is "code/direction/partner"), so the run can be reloaded with the same commuters
+
+    Args:
+        region_list (dict): location code -> Region
+        filepath (str): path to .npz file
+
+    """
+    arrays={}
+    for key,val in region_list.items():
+        for direction,partners in (val.unique_mobility_indexes or {}).items():
+            for partner,ids in partners.items():
+                arrays[f"{key}/{direction}/{partner}"]=np.asarray(ids,dtype=np.int32)
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)),exist_ok=True)
+    np.savez_compressed(filepath,**arrays)
 
-            count_in = int(val.mobility_incoming_data.get(key2))
-            count_out = int(val.mobility_data.get(key2))
 
-            # Extract incoming and outcoming indexes
-            incoming_indexes.extend(extract_indexes(random_indexes, count_in))
-            outcoming_indexes.extend(extract_indexes(random_indexes, count_out))
+def load_mobility_indexes(filepath:str)->dict|None:
+    """Load mobility indexes saved by save_mobility_indexes
 
-            incoming_dict[key2]=incoming_indexes
-            outcoming_dict[key2]=outcoming_indexes
+    Args:
+        filepath (str): path to .npz file
+
+    Returns:
+        dict|None: location code -> unique mobility indexes, None if filepath is not given
 
-        val.unique_mobility_indexes = {
-            "incoming_indexes":incoming_dict,
-            "outcoming_indexes":outcoming_dict,
-        }
+    Raises:
+        FileNotFoundError: configured file does not exist
 
+    """
+    if filepath is None:
+        return None
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Mobility indexes file {filepath} (mobility indexes_filepath) does not exist.")
+    output={}
+    with np.load(filepath) as data:
+        for name in data.files:
+            key,direction,partner=name.split("/")
+            output.setdefault(key,{"incoming_indexes":{},"outcoming_indexes":{}})[direction][partner]=data[name]
+    return output
+
+
+def has_mobility_indexes(indexes:dict|None,codes:list)->bool:
+    """Loaded mobility indexes cover all regions, warns which regions are missing (all regions are then allocated randomly)
+    """
+    if not indexes:
+        return False
+    missing=[code for code in codes if code not in indexes]
+    if missing:
+        print(f"\nWarning: loaded mobility indexes do not contain regions {', '.join(map(str,missing))}, "
+              f"mobility indexes of all regions are allocated randomly (run differs from the run indexes were saved by).")
+    return not missing
+
+
+class MobilityGraph:
+    """Sparse graph of region pairs with commuters (CSR over regions).
+    Built once after mobility indexes are created, daily synchronization walks only pairs with non-zero flow.
+    Regions excluded by mobility interventions are masked out, edge lists are cached per exclude set,
+    so the whole day range of a lockdown reuses the same edges.
+    """
+    def __init__(self,region_list:dict):
+        self.codes=list(region_list.keys())
+        code_index={code:i for i,code in enumerate(self.codes)}
+        sources,targets=[],[]
+        for key0,reg0 in region_list.items():
+            if reg0.mobility_data is None:
+                continue
+            outcoming=(reg0.unique_mobility_indexes or {}).get("outcoming_indexes") or {}
+            for key1,reg1 in region_list.items():
+                if key0==key1 or reg1.mobility_data is None or outcoming.get(key1) is None or len(outcoming.get(key1))==0:
+                    continue
+                sources.append(code_index[key0])
+                targets.append(code_index[key1])
+        # CSR: neighbours of region i are indices[indptr[i]:indptr[i+1]]
+        self.indptr=np.concatenate(([0],np.cumsum(np.bincount(np.asarray(sources,dtype=np.int32),minlength=len(self.codes))))).astype(np.int32)
+        self.indices=np.asarray(targets,dtype=np.int32)
+        self.sources=np.repeat(np.arange(len(self.codes),dtype=np.int32),np.diff(self.indptr))
+        self._edges_cache={}
+
+    def __len__(self):
+        return len(self.indices)
+
+    def partners(self,code:str)->list:
+        i=self.codes.index(code)
+        return [self.codes[j] for j in self.indices[self.indptr[i]:self.indptr[i+1]]]
+
+    def edges(self,exclude:list=None)->list:
+        """Active region pairs (home, foreign) for regions which are not excluded
+
+        Args:
+            exclude (list, optional): location codes excluded from synchronization. Defaults to None.
+
+        Returns:
+            list: list of tuples (location code from, location code to)
+
+        """
+        key=frozenset(exclude or ())
+        if key not in self._edges_cache:
+            node_mask=np.array([code not in key for code in self.codes],dtype=bool)
+            edge_mask=node_mask[self.sources] & node_mask[self.indices] if len(self) else np.zeros(0,dtype=bool)
+            self._edges_cache[key]=[(self.codes[i],self.codes[j]) for i,j in zip(self.sources[edge_mask],self.indices[edge_mask])]
+        return self._edges_cache[key]
+
+    def active_codes(self,exclude:list=None)->list:
+        """Location codes which have at least one active edge
+        """
+        active=set()
+        for key0,key1 in self.edges(exclude):
+            active.update((key0,key1))
+        return [code for code in self.codes if code in active]
+
+
+def interactions(region_list:dict,init:bool=False,exclude:list=None,graph:MobilityGraph=None,indexes:dict=None):
+    """Synchronize commuters between regions.
 
-def interactions(region_list:dict,init:bool=False):
-    if init:
+    Args:
+        region_list (dict): location code -> Region
+        init (bool, optional): create mobility indexes first. Defaults to False.
+        exclude (list, optional): location codes excluded for this day (mobility interventions). Defaults to None.
+        graph (MobilityGraph, optional): precompiled graph of region pairs, created from region_list if not given. Defaults to None.
+        indexes (dict, optional): loaded mobility indexes (location code -> indexes), used on init instead of random allocation. Defaults to None.
+
+    Returns:
+        MobilityGraph: graph used for synchronization, can be reused for next days
+
+    """
+    if init and has_mobility_indexes(indexes,list(region_list.keys())):
+        for key,val in region_list.items():
+            val.set_unique_mobility_indexes(indexes[key])
+    elif init:
         create_random_mobility_indexes(region_list=region_list)
-    for key0,reg0 in region_list.items():
-        for key1,reg1 in region_list.items():
-            if key0==key1 or reg0.mobility_data is None or reg1.mobility_data is None:
+    if graph is None or init:
+        graph=MobilityGraph(region_list)
+    for key0,key1 in graph.edges(exclude):
+        synchronize_people(region_list[key0].cv_simulation,region_list[key1].cv_simulation,
+                           region_list[key0].unique_mobility_indexes.get("outcoming_indexes").get(key1),
+                           region_list[key1].unique_mobility_indexes.get("incoming_indexes").get(key0),init_infection=init)
+    return graph
+
+
+def commuter_infection_counts(region)->tuple:
+    """Number of infectious commuters and all commuters (incoming and outcoming) of the region
+
+    Args:
+        region (Region): region with mobility indexes
+
+    Returns:
+        tuple: (infectious commuters, commuters)
+
+    """
+    infectious,commuters=0,0
+    for partners in (region.unique_mobility_indexes or {}).values():
+        for ids in partners.values():
+            if ids is None or len(ids)==0:
                 continue
-            synchronize_people(reg0.cv_simulation,reg1.cv_simulation,reg0.unique_mobility_indexes.get("outcoming_indexes").get(key1),
-                               reg1.unique_mobility_indexes.get("incoming_indexes").get(key0),init_infection=init)
+            infectious+=int(np.count_nonzero(region.cv_simulation.people.infectious[ids]))
+            commuters+=len(ids)
+    return infectious,commuters
 
 
+class SyncPolicy:
+    """When commuters are synchronized. Sync is done every "interval" days, or (if threshold is given)
+    when the fraction of infectious commuters changed more than threshold since the last sync.
+    Default (interval 1, no threshold) synchronizes after every day. Threshold without interval is adaptive mode
+    (interval 0, sync only on threshold), with interval 1 threshold has no effect.
+
+    Raises:
+        ValueError: negative interval or interval 0 without threshold
+    """
+    def __init__(self,interval:int=None,threshold:float=None):
+        if interval is None:
+            interval=0 if threshold is not None else exdf.default_mobility_sync_interval
+        elif interval<0:
+            raise ValueError(f"Mobility sync_interval must not be negative, got {interval}.")
+        elif interval==0 and threshold is None:
+            raise ValueError("Mobility sync_interval 0 (adaptive synchronization) needs sync_threshold, "
+                             "otherwise commuters would be synchronized only after the first day.")
+        elif threshold is not None and interval==1:
+            print(f"\nWarning: mobility sync_threshold {threshold} has no effect with sync_interval 1 (sync after every day), "
+                  f"leave out sync_interval or set it to 0 for adaptive synchronization.")
+        self.interval=interval
+        self.threshold=threshold
+        self.last_sync_day=None
+        self.last_fraction=None
+        self.count=0
+        self.skipped=0
+        self.time=0.0
+
+    @property
+    def needs_fraction(self)->bool:
+        return self.threshold is not None
+
+    def should_sync(self,t:int,infected_fraction:float=None)->bool:
+        """Decide if commuters should be synchronized after day t
+
+        Args:
+            t (int): day of the simulation
+            infected_fraction (float, optional): actual fraction of infectious commuters (needed only with threshold). Defaults to None.
+
+        Returns:
+            bool: True if synchronize
+
+        """
+        if self.last_sync_day is None or (self.interval and t-self.last_sync_day>=self.interval):
+            return True
+        if self.threshold is not None and infected_fraction is not None and self.last_fraction is not None:
+            return abs(infected_fraction-self.last_fraction)>self.threshold
+        return False
+
+    def record(self,t:int,elapsed:float,infected_fraction:float=None):
+        self.last_sync_day=t
+        self.last_fraction=infected_fraction
+        self.count+=1
+        self.time+=elapsed
+
+    def skip(self):
+        self.skipped+=1
+
+    def summary(self)->dict:
+        return {"interval":self.interval,
+                "threshold":self.threshold,
+                "sync_count":self.count,
+                "skipped_count":self.skipped,
+                "sync_time":self.time}
+
 
 def mobility_indexes(mobility,pop_sz,id1,id2):
     """This method returns a list representing persons who are travelling across regions (sims).
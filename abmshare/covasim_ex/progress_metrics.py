@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+"""
+Running progress metrics of the day loop.
+Cumulative counters are updated only from values of the actual day (no re-summing of the whole results vectors)
+and every day is published to the console and as one JSON line to the run output directory.
+"""
+
+
+def region_day_values(region,t:int)->dict:
+    """Values of one region for day t, used for progress metrics
+
+    Args:
+        region (Region): stepped region
+        t (int): day of the simulation
+
+    Returns:
+        dict: new infections, new deaths and number of dead for day t
+
+    """
+    results=region.cv_simulation.results
+    return {"new_infections":float(results["new_infections"][t]),
+            "new_deaths":float(results["new_deaths"][t]),
+            "n_dead":float(results["n_dead"][t])}
+
+
+class ProgressMetrics:
+    """Aggregator of per day progress (infections and deaths) of all regions.
+    """
+    def __init__(self,codes:list,filepath:str=None,separator:str="\t"):
+        """
+        Args:
+            codes (list): location codes of regions
+            filepath (str, optional): path to JSONL file with per day records. Defaults to None (console only).
+            separator (str, optional): separator of console line. Defaults to "\t".
+        """
+        self.codes=list(codes)
+        self.filepath=filepath
+        self.separator=separator
+        self.cum_infections={code:0.0 for code in self.codes}
+        self.n_dead={code:0.0 for code in self.codes}
+        self.start_time=time.perf_counter()
+        self.file=None
+        if self.filepath:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filepath)),exist_ok=True)
+            self.file=open(self.filepath,"a",buffering=1)
+
+    def restore(self,regions:dict,day:int):
+        """Set cumulative counters from results of regions before day (when resuming from checkpoint) and remove
+        records of day and later days from JSONL file (they are written again by the resumed run)
+        """
+        for code,region in regions.items():
+            results=region.cv_simulation.results
+            self.cum_infections[code]=float(sum(results["new_infections"][:day]))
+            self.n_dead[code]=float(results["n_dead"][day-1]) if day>0 else 0.0
+        if self.file:
+            self.truncate(day)
+
+    def truncate(self,day:int):
+        """Keep only records of days before day in JSONL file
+        """
+        self.file.close()
+        with open(self.filepath) as file:
+            lines=[line for line in file if line.strip() and json.loads(line)["day"]<day]
+        tmp_path=f"{self.filepath}.tmp{os.getpid()}"
+        with open(tmp_path,"w") as file:
+            file.writelines(lines)
+        os.replace(tmp_path,self.filepath)
+        self.file=open(self.filepath,"a",buffering=1)
+
+    def update(self,t:int,day_values:dict,date:str=None)->dict:
+        """Update counters by values of day t, print progress line and write JSON record
+
+        Args:
+            t (int): day of the simulation
+            day_values (dict): location code -> values of region_day_values
+            date (str, optional): date of day t. Defaults to None.
+
+        Returns:
+            dict: record of the day
+
+        """
+        regions={}
+        for code,values in day_values.items():
+            self.cum_infections[code]+=values["new_infections"]
+            self.n_dead[code]=max(self.n_dead[code],values["n_dead"])
+            regions[code]={"new_infections":values["new_infections"],"cum_infections":self.cum_infections[code],
+                           "new_deaths":values["new_deaths"],"n_dead":self.n_dead[code]}
+        record={"day":t,
+                "date":date,
+                "new_infections":sum(value["new_infections"] for value in regions.values()),
+                "cum_infections":sum(self.cum_infections.values()),
+                "new_deaths":sum(value["new_deaths"] for value in regions.values()),
+                "n_dead":sum(self.n_dead.values()),
+                "elapsed":time.perf_counter()-self.start_time,
+                "regions":regions}
+        sep=self.separator
+        print(f"\nDay: {t} {sep}"+
+              f"Infections    [{int(record['new_infections'])}/{int(record['cum_infections'])}]{sep}"+
+              f"Deaths    [{int(record['new_deaths'])}/{int(record['n_dead'])}]",end="")
+        if self.file:
+            self.file.write(json.dumps(record)+"\n")
+        return record
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file=None
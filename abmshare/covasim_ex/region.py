@@ -3,7 +3,11 @@ import numpy as np
 import pandas as pd
 import sciris as sc
 
+import abmshare.covasim_ex.intervention_process as exip
+import abmshare.covasim_ex.intervention_schedule as exis
 import abmshare.defaults as exdf
+import abmshare.run_plan as exrp
+import abmshare.synthpops_ex.population_store as exps
 import abmshare.utils as exut
 import covasim as cv
 import synthpops as sp
@@ -23,7 +27,9 @@ class Region:
                  save_settings:dict=None,
                  wait:bool=False,
                  test:bool=False,
-                 override_pop_location:bool=False):
+                 override_pop_location:bool=False,
+                 schedule:exis.InterventionSchedule=None,
+                 population_store:exps.PopulationStore=None):
         """_summary_
 
         Args:
@@ -34,6 +40,8 @@ class Region:
             intervention_list (list, optional): _description_. Defaults to None.
             region_pars (dict, optional): _description_. Defaults to None.
             variant_list (list, optional): _description_. Defaults to None.
+            schedule (InterventionSchedule, optional): compiled schedule of interventions of region. Defaults to None.
+            population_store (PopulationStore, optional): store of store:// popfiles. Defaults to None (default store).
 
         """
         self.location_code=location_code
@@ -47,6 +55,8 @@ class Region:
         self.save_settings=save_settings
         self.test=test
         self.override_pop_location=override_pop_location
+        self.schedule=schedule
+        self.population_store=population_store or exps.PopulationStore()
         # Aditional pars
         if self.mobility_incoming_data:
             self.original_population_size=population_size-sum([v for k,v in self.mobility_incoming_data.items() if v is not None and not pd.isna(v)]) # Without added mobility
@@ -57,6 +67,7 @@ class Region:
         self.mobility_intervention_list=[]
         self.unique_mobility_indexes={}
         self.cv_simulation=None
+        self.rng_state=None # Own random stream of region in worker process (moves with region between workers)
         # Process
         if not wait:
             self.process()
@@ -73,6 +84,9 @@ class Region:
     def filter_simulation_pars(self):
         """Filter incoming parameters to constructor and simulation specific pars. (For covasim simulation creation)
         """
+        # Population from store (popfile store://<key>, or store:// for the last used population of the location code)
+        if exps.is_store_popfile(self.region_pars.get("popfile")):
+            self.region_pars["popfile"]=self.resolve_store_popfile(self.region_pars["popfile"])
         # Filter only those pars, which can be used in simulation
         for key, value in self.region_pars.items():
             if key in exdf.covasim_constructor_pars_mapping.keys():
@@ -97,6 +111,15 @@ class Region:
         # Add population size
         self.simulation_pars["pop_size"]=self.population_size
 
+    def resolve_store_popfile(self,popfile:str)->str:
+        """Path to population in population store
+        """
+        filepath=self.population_store.resolve(popfile,location_code=self.location_code,n=self.population_size)
+        if filepath is None:
+            raise FileNotFoundError(f"There is no population {popfile} for region {self.name} ({self.location_code}) "
+                                    f"in population store {self.population_store.dirpath}.")
+        return filepath
+
     def filter_mobility_interventions(self):
         """Filter mobility interventions and add them to separate intervention list
         """
@@ -123,10 +146,11 @@ class Region:
         except Exception as e:
             print(f"Cannot create simulation for region {self.name} with error {e}")
 
-    def initialize_simulation(self):
+    def initialize_simulation(self,init_infections:bool=True):
         """Initialize simulation and set some default parameters
+        init_infections (bool)          : seed initial infections (ensemble members seed them later with their own seed)
         """
-        self.cv_simulation.initialize(verbose=0.1)
+        self.cv_simulation.initialize(verbose=0.1,init_infections=init_infections)
         self.cv_simulation._orig_pars=sc.dcp(self.cv_simulation.pars)
         self.cv_simulation.set_seed(self.cv_simulation.pars.get("rand_seed",-1)) # Like default covasim
         return self.cv_simulation
@@ -155,6 +179,10 @@ class Region:
     def get_days(self):
         return self.cv_simulation["n_days"]
 
+    @property
+    def rand_seed(self):
+        return self.cv_simulation["rand_seed"] if self.cv_simulation is not None else None
+
 
     def run_step(self):
         if self.cv_simulation.initialized:
@@ -162,7 +190,52 @@ class Region:
         else:
             print(f"You cannot run simulation {self.name} because it is not initialized. Please initialize it first.")
 
+    def is_mobility_excluded(self,t:int)->bool:
+        """Region has active mobility intervention on day t (looked up in schedule, if it is compiled)
+        """
+        schedule=getattr(self,"schedule",None) # Regions from older checkpoints have no schedule
+        if schedule is not None:
+            return schedule.is_mobility_excluded(self.location_code,t)
+        return any(change.start_day <= t <= change.end_day for change in self.mobility_intervention_list)
+
     def set_unique_mobility_indexes(self,data:dict):
         """Set unique people to simulation
         """
         self.unique_mobility_indexes=data
+
+
+def create_region(configuration:dict,location_code:str,save_settings:dict=None,test:bool=False,
+                  override_pop_location:bool=False,init_infections:bool=True,schedule:exis.InterventionSchedule=None)->Region:
+    """Create region from compiled run plan (or simulation configuration) and initialize its simulation
+
+    Args:
+        configuration (dict | RunPlan): compiled run plan or simulation configuration (plan of the region is compiled from it)
+        location_code (str): location code of region
+        save_settings (dict, optional): save settings. Defaults to None.
+        test (bool, optional): test settings. Defaults to False.
+        override_pop_location (bool, optional): if it should override pop location. Defaults to False.
+        init_infections (bool, optional): seed initial infections. Defaults to True.
+        schedule (InterventionSchedule, optional): schedule compiled for the whole run, region gets its slice. Defaults to None (compiled for region).
+
+    Returns:
+        Region: initialized region
+
+    """
+    plan=configuration if isinstance(configuration,exrp.RunPlan) else exrp.compile_run_plan(simulation_configuration=configuration,codes=[location_code])
+    region_plan=plan.region(location_code)
+    region = Region(location_code=location_code,
+                    name=region_plan.name,
+                    population_size=region_plan.population_size,
+                    mobility_data=plan.mobility_data(location_code),
+                    mobility_incoming_data=plan.mobility_incoming_data(location_code),
+                    intervention_list=exip.process_interventions(interventions=[intervention.as_dict() for intervention in region_plan.interventions],
+                                                                 config=plan),
+                    variant_list=exip.process_variants(variants=[variant.as_dict() for variant in region_plan.variants],config=plan),
+                    region_pars=region_plan.get_pars(),
+                    save_settings=save_settings,
+                    test=test,
+                    override_pop_location=override_pop_location,
+                    schedule=schedule.region_schedule(location_code) if schedule is not None else exis.compile_schedule(plan,codes=[location_code]),
+                    population_store=exps.PopulationStore(dirpath=plan.population_store_dirpath,max_bytes=plan.population_store_max_bytes))
+    region.initialize_simulation(init_infections=init_infections)
+    return region
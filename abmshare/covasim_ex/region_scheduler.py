@@ -0,0 +1,133 @@
+import heapq
+
+import abmshare.defaults as exdf
+
+"""
+Load balancing of regions across region workers.
+Regions are packed on bounded number of workers by LPT (longest processing time first), cost of region is estimated
+from population size and number of contacts (edges in all layers) and later replaced by measured step times.
+"""
+
+
+def estimate_region_cost(region)->float:
+    """Estimated cost of one simulation step of region (people + contacts in all layers)
+
+    Args:
+        region (Region): initialized region
+
+    Returns:
+        float: estimated cost (no units, only for comparing of regions)
+
+    """
+    cost=float(region.population_size or 0)
+    try:
+        cost+=float(sum(len(layer) for layer in region.cv_simulation.people.contacts.values()))
+    except AttributeError: # Region without simulation or people (e.g. not initialized yet)
+        pass
+    return cost
+
+
+def lpt_schedule(costs:dict,n_workers:int)->list:
+    """Pack regions on workers, the most expensive region first to the least loaded worker
+
+    Args:
+        costs (dict): location code -> cost
+        n_workers (int): number of workers
+
+    Returns:
+        list: list of lists of location codes (one list per worker)
+
+    """
+    n_workers=max(1,min(n_workers,len(costs)))
+    heap=[(0.0,i) for i in range(n_workers)]
+    groups=[[] for _ in range(n_workers)]
+    for code in sorted(costs.keys(),key=lambda code:(-costs[code],code)):
+        load,i=heapq.heappop(heap)
+        groups[i].append(code)
+        heapq.heappush(heap,(load+costs[code],i))
+    return groups
+
+
+def makespan(groups:list,costs:dict)->float:
+    return max([sum(costs[code] for code in group) for group in groups] or [0.0])
+
+
+class RegionScheduler:
+    """Assigns regions to workers, collects measured step times and proposes new assignment when measured costs drift.
+    """
+    def __init__(self,n_workers:int,rebalance_interval:int=0,threshold:float=None,smoothing:float=None):
+        """
+        Args:
+            n_workers (int): maximal number of workers
+            rebalance_interval (int, optional): how often (days) check the assignment, 0 means never. Defaults to 0.
+            threshold (float, optional): minimal relative improvement of makespan for migration. Defaults to exdf.default_rebalance_threshold.
+            smoothing (float, optional): weight of the last measured step time (exponential moving average). Defaults to exdf.default_step_time_smoothing.
+        """
+        self.n_workers=n_workers
+        self.rebalance_interval=rebalance_interval or 0
+        self.threshold=exdf.default_rebalance_threshold if threshold is None else threshold
+        self.smoothing=exdf.default_step_time_smoothing if smoothing is None else smoothing
+        self.estimated_costs={}
+        self.step_times={}
+        self.busy_times=[0.0]*n_workers
+        self.wall_time=0.0
+        self.rebalances=0
+
+    def initial_groups(self,regions:dict,groups:list=None)->list:
+        """Assignment of regions to workers by estimated costs
+
+        Args:
+            regions (dict): location code -> Region (or already known cost, e.g. population size)
+            groups (list, optional): already known assignment (e.g. from checkpoint), used instead of scheduling. Defaults to None.
+
+        Returns:
+            list: list of lists of location codes (one list per worker)
+
+        """
+        self.estimated_costs={code:region if isinstance(region,(int,float)) else estimate_region_cost(region) for code,region in regions.items()}
+        groups=groups or lpt_schedule(self.estimated_costs,self.n_workers)
+        self.busy_times=[0.0]*len(groups)
+        return groups
+
+    def record(self,groups:list,day_results:dict,elapsed:float):
+        """Save measured step times of one day
+
+        Args:
+            groups (list): actual assignment of regions to workers
+            day_results (dict): location code -> day results (with "step_time")
+            elapsed (float): wall time of the whole step of all workers
+
+        """
+        self.wall_time+=elapsed
+        for i,group in enumerate(groups):
+            for code in group:
+                step_time=day_results[code].get("step_time",0.0)
+                self.busy_times[i]+=step_time
+                previous=self.step_times.get(code)
+                self.step_times[code]=step_time if previous is None else self.smoothing*step_time+(1-self.smoothing)*previous
+
+    def rebalance(self,t:int,groups:list)->list|None:
+        """New assignment of regions, if it is time to check it and measured makespan improves more than threshold
+
+        Returns:
+            list|None: new groups or None (keep actual assignment)
+
+        """
+        if not self.rebalance_interval or (t+1)%self.rebalance_interval!=0 or len(self.step_times)<sum(len(group) for group in groups):
+            return None
+        new_groups=lpt_schedule(self.step_times,len(groups))
+        new_groups+=[[] for _ in range(len(groups)-len(new_groups))]
+        if makespan(new_groups,self.step_times)<(1-self.threshold)*makespan(groups,self.step_times):
+            self.rebalances+=1
+            return new_groups
+        return None
+
+    def utilization(self,groups:list)->dict:
+        """Per worker utilization (busy time of worker / wall time of steps)
+        """
+        return {"workers":[{"regions":list(group),
+                            "busy_time":self.busy_times[i],
+                            "utilization":self.busy_times[i]/self.wall_time if self.wall_time else 0.0}
+                           for i,group in enumerate(groups)],
+                "step_wall_time":self.wall_time,
+                "rebalances":self.rebalances}
@@ -0,0 +1,352 @@
+import multiprocessing as mp
+import threading
+import time
+import traceback
+import zlib
+
+import numpy as np
+
+import abmshare.covasim_ex.checkpoint as ckpt
+import abmshare.covasim_ex.mobility as mb
+from abmshare.covasim_ex.progress_metrics import region_day_values
+from abmshare.covasim_ex.region import create_region
+from abmshare.covasim_ex.region_scheduler import estimate_region_cost
+import covasim.utils as cvu
+
+"""
+Process resident regions for multi core simulations.
+Every worker process owns its regions (with cv.Sim) for the whole run. Coordinator sends only small commands
+(step day t, gather/scatter commuters) and receives per day scalars back, so the GIL does not serialize the regions.
+Every region has its own random stream (restored before and saved after its step), which moves with the region,
+so results do not depend on the assignment of regions to workers. Migrated regions are sent directly between workers.
+"""
+
+
+def region_stream_seed(seed:int,location_code:str)->int:
+    """Seed of random stream of region (seed of the run and location code)
+    """
+    return int(np.random.SeedSequence([int(seed),zlib.crc32(str(location_code).encode())]).generate_state(1)[0]%2**31)
+
+
+def region_day_results(region, t:int, mobility:bool=True, commuters:bool=False)->dict:
+    """Per day scalars of the region, which are sent back to the coordinator
+
+    Args:
+        region (Region): stepped region
+        t (int): day of the simulation
+        mobility (bool): if mobility interventions should be evaluated
+        commuters (bool): if infectious commuters should be counted (for adaptive sync policy)
+
+    Returns:
+        dict: day results
+
+    """
+    excluded=mobility and region.is_mobility_excluded(t)
+    output=region_day_values(region,t)
+    output["date"]=region.cv_simulation.date(t)
+    output["mobility_excluded"]=excluded
+    if commuters:
+        output["infectious_commuters"],output["commuters"]=mb.commuter_infection_counts(region)
+    return output
+
+
+class RegionHandle:
+    """Lightweight description of region living in worker process. Coordinator uses it instead of the region itself
+    (mobility indexes allocation, mobility graph, scheduling), so the simulation is never sent to coordinator.
+    """
+    def __init__(self,region):
+        self.location_code=region.location_code
+        self.name=region.name
+        self.population_size=region.population_size
+        self.original_population_size=region.original_population_size
+        self.mobility_data=region.mobility_data
+        self.mobility_incoming_data=region.mobility_incoming_data
+        self.rand_seed=region.rand_seed
+        self.n_days=region.get_days()
+        self.cost=estimate_region_cost(region)
+        self.unique_mobility_indexes={}
+
+    def get_days(self):
+        return self.n_days
+
+    def set_unique_mobility_indexes(self,data:dict):
+        self.unique_mobility_indexes=data
+
+
+class RegionWorkerProcess:
+    """Worker side of the region worker. Holds regions and dispatches commands from the coordinator.
+    """
+    def __init__(self,regions:dict,peers:dict=None):
+        self.regions=regions
+        self.peers=peers or {} # index of worker -> connection to it
+
+    def create(self,codes:list,configuration:dict,save_settings:dict=None,test:bool=False,override_pop_location:bool=False,schedule=None):
+        """Create and initialize regions directly in this worker
+
+        Returns:
+            dict: location code -> RegionHandle
+
+        """
+        for code in codes:
+            self.regions[code]=create_region(configuration,code,save_settings=save_settings,test=test,override_pop_location=override_pop_location,
+                                             schedule=schedule)
+        return {code:RegionHandle(self.regions[code]) for code in codes}
+
+    def set_seed(self,seed:int):
+        """Seed own random stream of every region
+        """
+        for code,region in self.regions.items():
+            cvu.set_seed(region_stream_seed(seed,code))
+            region.rng_state=ckpt.get_rng_state()
+
+    def step(self,t:int,mobility:bool=True,commuters:bool=False):
+        output={}
+        for code,region in self.regions.items():
+            start=time.perf_counter()
+            if getattr(region,"rng_state",None) is not None: # Regions from older checkpoints continue with stream of worker
+                ckpt.set_rng_state(region.rng_state)
+            region.run_step()
+            region.rng_state=ckpt.get_rng_state()
+            output[code]=region_day_results(region,t,mobility,commuters)
+            output[code]["step_time"]=time.perf_counter()-start
+        return output
+
+    def gather(self,codes:list=None):
+        """Return commuter states for every partner region (incoming and outcoming indexes)
+        """
+        output={}
+        for code,region in self.regions.items():
+            if codes is not None and code not in codes:
+                continue
+            output[code]={}
+            for direction in ["outcoming_indexes","incoming_indexes"]:
+                output[code][direction]={partner:mb.gather_people_states(region.cv_simulation,ids)
+                                         for partner,ids in region.unique_mobility_indexes.get(direction,{}).items()
+                                         if codes is None or partner in codes}
+        return output
+
+    def scatter(self,states:dict):
+        for code,directions in states.items():
+            region=self.regions[code]
+            for direction,partners in directions.items():
+                for partner,values in partners.items():
+                    mb.scatter_people_states(region.cv_simulation,region.unique_mobility_indexes[direction][partner],values)
+
+    def set_mobility_indexes(self,indexes:dict):
+        for code,value in indexes.items():
+            if code in self.regions:
+                self.regions[code].set_unique_mobility_indexes(value)
+
+    def migrate(self,outgoing:dict,incoming:list):
+        """Send regions to other workers and receive regions from them (directly, not through coordinator).
+        Regions are sent from separate thread, so workers exchanging regions with each other do not block.
+
+        Args:
+            outgoing (dict): index of worker -> location codes of regions sent to it
+            incoming (list): indexes of workers sending regions to this worker
+
+        """
+        regions={peer:{code:self.regions.pop(code) for code in codes} for peer,codes in outgoing.items()}
+
+        def send():
+            for peer,value in regions.items():
+                self.peers[peer].send(value)
+
+        sender=threading.Thread(target=send)
+        sender.start()
+        for peer in incoming:
+            self.regions.update(self.peers[peer].recv())
+        sender.join()
+
+    def checkpoint(self):
+        """Regions and random state of this worker (for checkpoint of the whole run)
+        """
+        return {"regions":self.regions,"rng_state":ckpt.get_rng_state()}
+
+    def finalize(self):
+        for region in self.regions.values():
+            region.finalize_simulation()
+        return self.regions
+
+
+def region_worker_loop(conn,regions:dict,seed:int=None,rng_state:dict=None,peers:dict=None):
+    """Main loop of worker process. Every message is a tuple (command, kwargs), answer is tuple (status, data)
+    Forked workers inherit the same random state, so every worker is reseeded with its own seed
+    (or random state from checkpoint is restored).
+    """
+    if rng_state is not None:
+        ckpt.set_rng_state(rng_state)
+    elif seed is not None:
+        cvu.set_seed(seed)
+    worker=RegionWorkerProcess(regions,peers=peers)
+    while True:
+        command,kwargs=conn.recv()
+        if command=="close":
+            conn.send(("ok",None))
+            break
+        try:
+            conn.send(("ok",getattr(worker,command)(**kwargs)))
+        except Exception:
+            conn.send(("error",traceback.format_exc()))
+    conn.close()
+
+
+class RegionWorker:
+    """Coordinator side handle of one worker process.
+    """
+    def __init__(self,regions:dict,name:str=None,seed:int=None,rng_state:dict=None,peers:dict=None):
+        self.codes=list(regions.keys())
+        self.conn,child_conn=mp.Pipe()
+        self.process=mp.Process(target=region_worker_loop,args=(child_conn,regions,seed,rng_state,peers),name=name,daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def send(self,command:str,**kwargs):
+        self.conn.send((command,kwargs))
+
+    def recv(self):
+        status,data=self.conn.recv()
+        if status=="error":
+            raise RuntimeError(f"Region worker {self.process.name} ({', '.join(self.codes)}) failed:\n{data}")
+        return data
+
+    def call(self,command:str,**kwargs):
+        self.send(command,**kwargs)
+        return self.recv()
+
+    def close(self):
+        try:
+            if self.process.is_alive():
+                self.call("close")
+        except (EOFError,BrokenPipeError,OSError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class RegionWorkerPool:
+    """Group of region workers, commands are send to all workers first and answers are collected afterwards,
+    so the workers run in parallel.
+    """
+    def __init__(self,region_groups:list,seed:int=None,rng_states:list=None):
+        # Pipe between every pair of workers (for migration of regions)
+        peers=[{} for _ in region_groups]
+        for i in range(len(region_groups)):
+            for j in range(i+1,len(region_groups)):
+                peers[i][j],peers[j][i]=mp.Pipe()
+        self.workers=[]
+        try:
+            for i,regions in enumerate(region_groups):
+                self.workers.append(RegionWorker(regions,name=f"region_worker_{i}",seed=seed+i if seed is not None else None,
+                                                 rng_state=rng_states[i] if rng_states is not None else None,peers=peers[i]))
+        except Exception:
+            self.close() # Workers started before the failure
+            raise
+        finally:
+            for conns in peers: # Only workers use them
+                for conn in conns.values():
+                    conn.close()
+
+    def broadcast(self,command:str,kwargs_by_worker:list=None,**kwargs)->dict:
+        """Send command to all workers and merge their answers (dict by location code)
+        """
+        for i,worker in enumerate(self.workers):
+            worker.send(command,**(kwargs_by_worker[i] if kwargs_by_worker is not None else kwargs))
+        output={}
+        for worker in self.workers:
+            data=worker.recv()
+            if isinstance(data,dict):
+                output.update(data)
+        return output
+
+    def create(self,groups:list,**kwargs)->dict:
+        """Create regions directly in workers (group of location codes per worker)
+
+        Returns:
+            dict: location code -> RegionHandle
+
+        """
+        handles=self.broadcast("create",kwargs_by_worker=[dict(codes=group,**kwargs) for group in groups])
+        for worker,group in zip(self.workers,groups):
+            worker.codes=list(group)
+        return handles
+
+    def set_seed(self,seed:int):
+        """Seed random stream of every region (region initialization resets random state)
+        """
+        self.broadcast("set_seed",seed=seed)
+
+    def set_mobility_indexes(self,indexes:dict):
+        self.broadcast("set_mobility_indexes",indexes=indexes)
+
+    def step(self,t:int,mobility:bool=True,commuters:bool=False)->dict:
+        return self.broadcast("step",t=t,mobility=mobility,commuters=commuters)
+
+    def synchronize(self,graph:mb.MobilityGraph,exclude:list=None):
+        """Exchange commuters between regions (which are not excluded) and write synchronized states back.
+
+        Args:
+            graph (MobilityGraph): graph of region pairs with commuters
+            exclude (list): location codes excluded from synchronization for this day
+
+        """
+        edges=graph.edges(exclude)
+        if not edges:
+            return
+        states=self.broadcast("gather",codes=graph.active_codes(exclude))
+        updates={}
+        for key0,key1 in edges:
+            out_states,in_states=states[key0]["outcoming_indexes"][key1],states[key1]["incoming_indexes"][key0]
+            changed_out,changed_in=mb.synchronize_states(out_states,in_states)
+            updates.setdefault(key0,{}).setdefault("outcoming_indexes",{})[key1]={par:out_states[par] for par in changed_out}
+            updates.setdefault(key1,{}).setdefault("incoming_indexes",{})[key0]={par:in_states[par] for par in changed_in}
+        # Only changed states are sent back
+        self.broadcast("scatter",kwargs_by_worker=[{"states":{code:updates[code] for code in worker.codes if code in updates}}
+                                                   for worker in self.workers])
+
+    @property
+    def groups(self)->list:
+        return [list(worker.codes) for worker in self.workers]
+
+    def migrate(self,groups:list):
+        """Move regions between workers to match new assignment
+
+        Args:
+            groups (list): list of lists of location codes (one list per worker)
+
+        """
+        target={code:i for i,group in enumerate(groups) for code in group}
+        outgoing=[{} for _ in self.workers]
+        for i,worker in enumerate(self.workers):
+            for code in worker.codes:
+                if target[code]!=i:
+                    outgoing[i].setdefault(target[code],[]).append(code)
+        self.broadcast("migrate",kwargs_by_worker=[{"outgoing":outgoing[i],"incoming":[j for j in range(len(self.workers)) if i in outgoing[j]]}
+                                                   for i in range(len(self.workers))])
+        moved=[(code,j) for i in range(len(self.workers)) for j,codes in outgoing[i].items() for code in codes]
+        for i,worker in enumerate(self.workers):
+            worker.codes=[code for code in worker.codes if target[code]==i]+[code for code,j in moved if j==i]
+
+    def checkpoint(self)->tuple:
+        """Collect regions and random states of all workers
+
+        Returns:
+            tuple: (location code -> Region, list of random states in order of workers)
+
+        """
+        for worker in self.workers:
+            worker.send("checkpoint")
+        regions,rng_states={},[]
+        for worker in self.workers:
+            data=worker.recv()
+            regions.update(data["regions"])
+            rng_states.append(data["rng_state"])
+        return regions,rng_states
+
+    def finalize(self)->dict:
+        return self.broadcast("finalize")
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
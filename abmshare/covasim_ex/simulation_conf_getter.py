@@ -53,6 +53,90 @@ def get_mobility_filepath(config:dict|str)->str|None:
         return None
 
 
+def get_mobility_indexes_filepath(config:dict|str)->str|None:
+    """Get filepath of saved mobility indexes (commuters), which are loaded instead of random allocation
+
+    Args:
+        conf (dict | str): configuration
+
+    Returns:
+        str | None: path to mobility indexes, if exists
+
+    """
+    config=exut.load_config_dict(config)
+    try:
+        return (exut.get_nested_value_from_dict(dictionary=config,keys=exdf.covasim_mobility_confkeys) or {}).get(exdf.confkeys["indexes_filepath"],None)
+    except:
+        print("There is problem with get_mobility_indexes_filepath")
+        return None
+
+
+def get_mobility_sync_settings(config:dict|str)->dict:
+    """Get synchronization policy of mobility (sync_interval in days, sync_threshold of infectious commuters fraction),
+    sync_threshold without sync_interval means synchronization only on threshold.
+
+    Args:
+        conf (dict | str): configuration
+
+    Returns:
+        dict: keyword arguments for mobility.SyncPolicy
+
+    """
+    config=exut.load_config_dict(config)
+    try:
+        mobility=exut.get_nested_value_from_dict(dictionary=config,keys=exdf.covasim_mobility_confkeys) or {}
+        return {"interval":mobility.get(exdf.confkeys["sync_interval"],None),
+                "threshold":mobility.get(exdf.confkeys["sync_threshold"],None)}
+    except:
+        print("There is problem with get_mobility_sync_settings")
+        return {}
+
+
+def get_checkpoint_settings(config:dict|str)->dict|None:
+    """Get checkpoint settings (interval in days, how many checkpoints keep)
+
+    Args:
+        conf (dict | str): configuration
+
+    Returns:
+        dict | None: {"interval":int,"keep":int}, None if checkpoints are not turned on
+
+    """
+    config=exut.load_config_dict(config)
+    try:
+        checkpoint=config.get(exdf.confkeys["checkpoint"]) or {}
+        if not checkpoint.get(exdf.confkeys["value"],False):
+            return None
+        return {"interval":checkpoint.get(exdf.confkeys["checkpoint_interval"],1),
+                "keep":checkpoint.get(exdf.confkeys["checkpoint_keep"],exdf.default_checkpoint_keep)}
+    except:
+        print("There is problem with get_checkpoint_settings")
+        return None
+
+
+def get_ensemble_settings(config:dict|str)->dict|None:
+    """Get ensemble settings (number of runs and quantiles of reduced results)
+
+    Args:
+        conf (dict | str): configuration
+
+    Returns:
+        dict | None: {"n_runs":int,"quantiles":{"low":float,"high":float}}, None if ensemble is not turned on
+
+    """
+    config=exut.load_config_dict(config)
+    try:
+        ensemble=config.get(exdf.confkeys["ensemble"]) or {}
+        if not ensemble.get(exdf.confkeys["value"],False):
+            return None
+        return {"n_runs":ensemble.get(exdf.confkeys["n_runs"],exdf.default_ensemble_n_runs),
+                "quantiles":{"low":ensemble.get(exdf.confkeys["quantile_low"],exdf.default_ensemble_quantiles["low"]),
+                             "high":ensemble.get(exdf.confkeys["quantile_high"],exdf.default_ensemble_quantiles["high"])}}
+    except:
+        print("There is problem with get_ensemble_settings")
+        return None
+
+
 def get_population_filepath(config:dict|str)->str|None:
     """Get population file filepath
 
@@ -206,7 +290,8 @@ def get_pars_by_code(config:dict|str,code:str)->dict|None:
             for key,value in data.iloc[id].items():
                 if key in exdf.covasim_pars_all or key in exdf.covasim_region_csv_columns:
                     if key == "popfile" and (value is not None and not pd.isna(value)):
-                        out_pars[key] = value if exut.file_validator(value) else None
+                        # Populations from population store are resolved by region
+                        out_pars[key] = value if exut.file_validator(value) or str(value).startswith(exdf.population_store_scheme) else None
                         continue
                     out_pars[key] = value
             global_pars=get_global_pars(config)
@@ -1,9 +1,10 @@
 import abmshare.covasim_ex.simulation_creator as sim_creator
+import abmshare.run_plan as exrp
 import abmshare.utils as exut
 
 
 class SimulationExtensionController():
-    def __init__(self,configuration,wait=False,test=False,save_settings:dict=None,parallel_run:bool=True,override_pop_location:bool=False,mobility:bool=None):
+    def __init__(self,configuration,wait=False,test=False,save_settings:dict=None,parallel_run:bool=True,override_pop_location:bool=False,mobility:bool=None,resume:bool|str=None,plan:exrp.RunPlan=None):
         """Initialize instance of Synthpops extension controller which is responsible for creating populations.
 
         configuration (dict)                    : configuration with informations for run synthpops                                                     
@@ -11,6 +12,8 @@ class SimulationExtensionController():
         test (bool)                             : configure test settings by default values
         save_settings(dict)                     : dictionary with specified save_pars for every creates/used files
         override_pop_location (bool)            : if it should override pop location in configuration file
+        resume (bool|str)                       : continue from the latest checkpoint (True - in save_settings location, str - checkpoint or directory)
+        plan (RunPlan)                          : compiled run plan, compiled from configuration if not given
         """
         if not isinstance(configuration,dict):
             configuration=exut.load_config(configuration)
@@ -21,6 +24,8 @@ class SimulationExtensionController():
         self.parallel_run=self.configuration.get("parallel_run",False)
         self.override_pop_location=override_pop_location
         self.mobility=mobility
+        self.resume=resume
+        self.plan=plan
         if not wait:
             self.parser()
 
@@ -28,4 +33,5 @@ class SimulationExtensionController():
         """Core function for parsing synthpops configuration
         """
         sim_creator.Simulation_creator(configuration=self.configuration,save_settings=self.save_settings,test=self.test,
-                                       parallel_run=self.parallel_run,override_pop_location=self.override_pop_location,mobility=self.mobility)
+                                       parallel_run=self.parallel_run,override_pop_location=self.override_pop_location,mobility=self.mobility,
+                                       resume=self.resume,plan=self.plan)
@@ -2,16 +2,23 @@ import concurrent.futures
 import datetime
 import functools
 import multiprocessing as mp
+import time
 
 from pytictoc import TicToc
 
-import abmshare.covasim_ex.intervention_process as exip
+import abmshare.covasim_ex.checkpoint as ckpt
+import abmshare.covasim_ex.ensemble as exens
+import abmshare.covasim_ex.intervention_schedule as exis
 import abmshare.covasim_ex.mobility as mb
 import abmshare.covasim_ex.simulation_conf_getter as exscg
 import abmshare.defaults as exdf
+import abmshare.run_plan as exrp
 import abmshare.utils as exut
 import covasim as cv
-from abmshare.covasim_ex.region import Region
+from abmshare.covasim_ex.progress_metrics import ProgressMetrics, region_day_values
+from abmshare.covasim_ex.region import Region, create_region
+from abmshare.covasim_ex.region_scheduler import RegionScheduler
+from abmshare.covasim_ex.region_worker import RegionWorkerPool
 
 
 class Simulation_creator():
@@ -22,7 +29,9 @@ class Simulation_creator():
                  save_settings:dict=None,
                  unique_mobility_indexes:dict=False,
                  override_pop_location:bool=False,
-                 mobility:bool=None):
+                 mobility:bool=None,
+                 resume:bool|str=None,
+                 plan:exrp.RunPlan=None):
         """_summary_
 
         Args:
@@ -30,11 +39,15 @@ class Simulation_creator():
             wait (bool, optional): _description_. Defaults to False.
             test (bool, optional): _description_. Defaults to False.
             save_settings (dict, optional): _description_. Defaults to None.
+            resume (bool | str, optional): continue from the latest checkpoint (True - in save_settings location, str - given checkpoint or directory). Defaults to None.
+            plan (RunPlan, optional): compiled run plan. Defaults to None (compiled from configuration).
 
         """
         if not isinstance(configuration,dict):
             configuration=exut.load_config(configuration)
         self.configuration=configuration
+        self.plan=plan or exrp.compile_run_plan(simulation_configuration=self.configuration)
+        self.schedule=exis.compile_schedule(self.plan) # Compiled once, regions get their slices
         self.test=self.configuration.get("test",False) or test
         self.parallel_run=parallel_run
         self.override_pop_location=override_pop_location
@@ -46,17 +59,37 @@ class Simulation_creator():
         self.multisim_result=None
         self.region_objects_result={}
         self.shared_mobility_exclude = list()
-        self.unique_mobility_indexes=exscg.get_global_pars(self.configuration,"unique_mobility_indexes") or unique_mobility_indexes
+        self.mobility_graph=None
+        self.sync_policy=mb.SyncPolicy(**exscg.get_mobility_sync_settings(self.configuration))
+        self.run_metadata={}
+        self.resume=resume
+        self.checkpoint_settings=exscg.get_checkpoint_settings(self.configuration)
+        self.ensemble_settings=exscg.get_ensemble_settings(self.configuration)
+        self.start_day=0
+        self.checkpoint_rng_states=None
+        self.checkpoint_worker_groups=None
+        self.unique_mobility_indexes=self.plan.unique_mobility_indexes or unique_mobility_indexes
+        self.mobility_indexes=mb.load_mobility_indexes(exscg.get_mobility_indexes_filepath(self.configuration))
+        self.parallel_backend=self.configuration.get(exdf.confkeys["parallel_backend"],exdf.simulation_parallel_backends["thread"])
         # Initialize new immunity data and variants
         if not wait:
             self.process()
 
     def process(self):
         # Core processing class
-        if not self.parallel_run: self.run_single_core_sims()
-        else: self.run_multi_core_sims()
+        if self.ensemble_settings:
+            if self.resume:
+                raise ValueError("Ensemble runs have no checkpoints and cannot be resumed, run them again without resume.")
+            self.run_ensemble()
+        else:
+            if self.resume:
+                self.load_checkpoint()
+            if not self.parallel_run: self.run_single_core_sims()
+            else: self.run_multi_core_sims()
         # Save multisim object
         self.save_multisim_object()
+        self.save_mobility_indexes()
+        self.save_run_metadata()
 
     def run_single_core_sims(self):
         """_summary_
@@ -64,15 +97,19 @@ class Simulation_creator():
         """
         tic=TicToc()
         tic.tic()
-        # Sim preparation
-        for location_code in exscg.get_region_codes(self.configuration):
-            self.sim_creation_process(location_code=location_code)
+        # Sim preparation (regions are already loaded when resuming from checkpoint)
+        if not self.region_objects:
+            for location_code in list(self.plan.codes):
+                self.sim_creation_process(location_code=location_code)
+            # Initial interaction for all simulations
+            if self.mobility and self.unique_mobility_indexes or self.mobility and not self.unique_mobility_indexes:
+                self.mobility_graph=mb.interactions(self.region_objects,init=True,indexes=self.mobility_indexes)
+        elif self.checkpoint_rng_states:
+            ckpt.set_rng_state(self.checkpoint_rng_states[0])
         self.simulation_days=(next(iter(self.region_objects.values()))).get_days()+1
-        # Initial interaction for all simulations
-        if self.mobility and self.unique_mobility_indexes or self.mobility and not self.unique_mobility_indexes:
-            mb.interactions(self.region_objects,init=True)
+        progress=self.create_progress_metrics(separator="\t\t")
         # Run sims
-        for t in range(self.simulation_days):
+        for t in range(self.start_day,self.simulation_days):
             # print(f"Running sim for day:{t}")
             exclude_regions=[]
             for region in self.region_objects.values():
@@ -82,26 +119,21 @@ class Simulation_creator():
                     print(f"Starting simulation date:{actual_date}")
                 region.run_step()
                 # Now handle mobility intervention when is turned
-                for change in region.mobility_intervention_list:
-                    if not self.mobility:
-                        break #NOTE: narovnak na ohybak
-                    if (change.start_day <= t <= change.end_day):
-                        exclude_regions.append(region.location_code)
+                if self.mobility and region.is_mobility_excluded(t):
+                    exclude_regions.append(region.location_code)
             # Handle all intervention. Exclude from sync those, which are locked down
-            if len(set(exclude_regions)) < len(self.region_objects) and self.mobility:
-                mb.interactions({key:self.region_objects[key] for key in self.region_objects.keys() if key not in exclude_regions},init=False)
+            self.synchronize_mobility(t,self.region_objects,exclude_regions)
             # Print
-            print(f"\nDay: {t} \t\t"+
-                  f"Infections    [{int(sum([region.cv_simulation.results['new_infections'][t] for region in self.region_objects.values()]))}/"+
-                                   f"{int(sum([sum(region.cv_simulation.results['new_infections']) for region in self.region_objects.values()]))}]\t\t"+
-                  f"Deaths    [{int(sum([region.cv_simulation.results['new_deaths'][t] for region in self.region_objects.values()]))}/"+
-                                   f"{int(sum([max(region.cv_simulation.results['n_dead']) for region in self.region_objects.values()]))}]",end="")
+            progress.update(t,{key:region_day_values(region,t) for key,region in self.region_objects.items()},
+                            date=next(iter(self.region_objects.values())).cv_simulation.date(t))
+            self.save_checkpoint(t)
             # print(f"Day:{t}\t"+
             #       f"Today new infections: {int(sum([region.cv_simulation.results['new_infections'][t] for region in self.region_objects.values()]))}\t\t"+
             #       f"Cummulative infections:{int(sum([sum(region.cv_simulation.results['new_infections']) for region in self.region_objects.values()]))}\t\t"+
             #       f"Today new deaths: {int(sum([region.cv_simulation.results['new_deaths'][t] for region in self.region_objects.values()]))}\t\t"+
             #       f"Totall dead: {int(sum([max(region.cv_simulation.results['n_dead']) for region in self.region_objects.values()]))}\t\t\n")
 
+        progress.close()
         # Finalize sims
         for val in self.region_objects.values():
             val.finalize_simulation()
@@ -109,32 +141,59 @@ class Simulation_creator():
         # Create multisim object
         self.multisim_result=cv.MultiSim([val.cv_simulation for val in self.region_objects.values()])
 
-    def sim_creation_process(self, location_code:str,shared_dict=None):
-        region = Region(location_code=location_code,
-                                                            name=exscg.get_region_name(config=self.configuration,code=location_code),
-                                                            population_size=exscg.get_pop_size_by_code(config=self.configuration,code=location_code),
-                                                            mobility_data=exscg.get_mobility_data_by_code(config=self.configuration,code=location_code),
-                                                            mobility_incoming_data=exscg.get_incoming_mobility_data_by_code(config=self.configuration,code=location_code),
-                                                            intervention_list=exip.process_interventions(interventions=exscg.get_interventions_by_code(config=self.configuration,code=location_code),
-                                                                                                            config=self.configuration),
-                                                            variant_list=exip.create_variants(config=self.configuration,code=location_code),
-                                                            region_pars=exscg.get_pars_by_code(config=self.configuration,code=location_code),
-                                                            save_settings=self.save_settings,
-                                                            test=self.test,
-                                                            override_pop_location=self.override_pop_location)
-        region.initialize_simulation()
-        if shared_dict is not None:
-            shared_dict[location_code] = region
-        else:
-            self.region_objects[location_code] = region
+    def run_ensemble(self):
+        """Run N seeds of the whole coupled simulation. Regions (populations) are created once, members run
+        in forked processes and only reduced results (median, quantiles) are kept in multisim object.
+        """
+        tic=TicToc()
+        tic.tic()
+        for location_code in list(self.plan.codes):
+            self.sim_creation_process(location_code=location_code,init_infections=False)
+        self.simulation_days=(next(iter(self.region_objects.values()))).get_days()+1
+        reduced_sims=exens.run_ensemble(self,n_runs=self.ensemble_settings["n_runs"],quantiles=self.ensemble_settings["quantiles"],
+                                        n_workers=self.configuration.get(exdf.confkeys["workers"]))
+        self.region_objects_result=dict(self.region_objects)
+        self.run_metadata["ensemble"]={"n_runs":self.ensemble_settings["n_runs"],"quantiles":self.ensemble_settings["quantiles"]}
+        tic.toc("Ensemble done in:")
+        self.multisim_result=cv.MultiSim(list(reduced_sims.values()))
+
+    def create_progress_metrics(self,separator:str="\t")->ProgressMetrics:
+        """Progress metrics of the day loop, per day records are written to output directory (if save settings are given)
+        """
+        filepath=exut.merge_twoPaths(self.save_settings["location"],exdf.default_progress_metrics_rel_path) if self.save_settings.get("location") else None
+        progress=ProgressMetrics(self.region_objects.keys(),filepath=filepath,separator=separator)
+        if self.start_day>0:
+            progress.restore(self.region_objects,self.start_day)
+        return progress
+
+    def synchronize_mobility(self,t:int,regions:dict,exclude:list):
+        """Synchronize commuters after day t (if sync policy allows it). Regions in exclude are locked down.
+        """
+        if not self.mobility or len(set(exclude)) >= len(regions):
+            return
+        fraction=None
+        if self.sync_policy.needs_fraction:
+            counts=[mb.commuter_infection_counts(region) for region in regions.values()]
+            fraction=sum(c[0] for c in counts)/max(sum(c[1] for c in counts),1)
+        if not self.sync_policy.should_sync(t,fraction):
+            self.sync_policy.skip()
+            return
+        start=time.perf_counter()
+        mb.interactions(regions,init=False,exclude=exclude,graph=self.mobility_graph)
+        self.sync_policy.record(t,time.perf_counter()-start,fraction)
+
+    def sim_creation_process(self, location_code:str,init_infections:bool=True)->Region:
+        region=create_region(self.plan,location_code,save_settings=self.save_settings,test=self.test,
+                             override_pop_location=self.override_pop_location,init_infections=init_infections,
+                             schedule=self.schedule)
+        self.region_objects[location_code] = region
+        return region
 
     def sim_simulation_process(self, region: Region, t: int):
         exclude_list_for_this_process = []
         region.run_step()
-        for change in region.mobility_intervention_list:
-            if not self.mobility: break #NOTE: narovnak na ohybak
-            if (change.start_day <= t <= change.end_day):
-                exclude_list_for_this_process.append(region.location_code)
+        if self.mobility and region.is_mobility_excluded(t):
+            exclude_list_for_this_process.append(region.location_code)
         self.region_objects_result[region.location_code] = region
         self.shared_mobility_exclude=exclude_list_for_this_process
 
@@ -142,53 +201,197 @@ class Simulation_creator():
         # Timer
         tic = TicToc()
         tic.tic()
-        # First parallelly create region object and initialize it
-        manager = mp.Manager()
-        shared_region_objects = manager.dict()
-
-        simulation_codes = exscg.get_region_codes(self.configuration)
-
-        # Use functools.partial to pass the shared dict to your function
-        func = functools.partial(self.sim_creation_process,shared_dict=shared_region_objects)
-        with mp.Pool(processes=min(len(simulation_codes), mp.cpu_count())) as pool:
-            pool.map(func, simulation_codes)
-        # Convert back to regular dictionary after multiprocessing is done
-        self.region_objects = dict(shared_region_objects)
-        # Handle init mobility interactions
-        if self.mobility and self.unique_mobility_indexes or self.mobility and not self.unique_mobility_indexes:
-            mb.interactions(self.region_objects,init=True)
-        else:
-            pass
-            # TODO: future to default version with no randoms
+        # Process backend creates regions directly in its workers
+        if self.parallel_backend==exdf.simulation_parallel_backends["process"]:
+            self.run_process_sims()
+            return
+        # First parallelly create region object and initialize it (regions are already loaded when resuming from checkpoint)
+        if not self.region_objects:
+            simulation_codes = list(self.plan.codes)
+            func = functools.partial(create_region,self.plan,save_settings=self.save_settings,test=self.test,
+                                     override_pop_location=self.override_pop_location,schedule=self.schedule)
+            # Regions are returned directly from pool (pickled once, no manager proxy)
+            with mp.Pool(processes=min(len(simulation_codes), mp.cpu_count())) as pool:
+                regions = {region.location_code:region for region in pool.imap_unordered(func, simulation_codes)}
+            self.region_objects = {code:regions[code] for code in simulation_codes}
+            # Handle init mobility interactions
+            if self.mobility and self.unique_mobility_indexes or self.mobility and not self.unique_mobility_indexes:
+                self.mobility_graph=mb.interactions(self.region_objects,init=True,indexes=self.mobility_indexes)
+            else:
+                pass
+                # TODO: future to default version with no randoms
         self.simulation_days=(next(iter(self.region_objects.values()))).get_days()+1
 
+        if self.checkpoint_rng_states:
+            ckpt.set_rng_state(self.checkpoint_rng_states[0])
+        progress=self.create_progress_metrics()
         # Run the simulation in parallel and synchro mobility
-        for t in range(self.simulation_days):
+        for t in range(self.start_day,self.simulation_days):
             # print(f"Running multisimulation for day:{t}")
             # Run the simulations in parallel for this day
             with concurrent.futures.ThreadPoolExecutor() as executor:
                 results = list(executor.map(lambda obj: self.sim_simulation_process(obj, t), self.region_objects.values()))
 
-            if len(set(self.shared_mobility_exclude)) < len(self.region_objects_result) and self.mobility:
-                keys_not_excluded = [key for key in self.region_objects_result.keys() if key not in self.shared_mobility_exclude]
-                relevant_region_objects = {key: self.region_objects_result[key] for key in keys_not_excluded}
-                mb.interactions(relevant_region_objects, init=False)
+            self.synchronize_mobility(t,self.region_objects_result,self.shared_mobility_exclude)
             # Print
-            print(f"\nDay: {t} \t"+
-                  f"Infections    [{int(sum([region.cv_simulation.results['new_infections'][t] for region in self.region_objects.values()]))}/"+
-                                   f"{int(sum([sum(region.cv_simulation.results['new_infections']) for region in self.region_objects.values()]))}]\t"+
-                  f"Deaths    [{int(sum([region.cv_simulation.results['new_deaths'][t] for region in self.region_objects.values()]))}/"+
-                                   f"{int(sum([max(region.cv_simulation.results['n_dead']) for region in self.region_objects.values()]))}]",end="")
+            progress.update(t,{key:region_day_values(region,t) for key,region in self.region_objects_result.items()},
+                            date=next(iter(self.region_objects_result.values())).cv_simulation.date(t))
+            self.save_checkpoint(t,regions=self.region_objects_result)
 
+        progress.close()
         # Finalize sims after all days are simulated
         self.region_objects = dict(self.region_objects_result)
         for val in self.region_objects.values():
             val.finalize_simulation()
         self.multisim_result=cv.MultiSim([val.cv_simulation for val in self.region_objects.values()])
 
+    def run_process_sims(self):
+        """Run regions in long-lived worker processes. Regions are packed on bounded number of workers by their cost
+        (RegionScheduler) and created directly in the workers, coordinator keeps only lightweight handles, sends step
+        commands and synchronizes commuters between workers.
+        """
+        scheduler=RegionScheduler(n_workers=self.configuration.get(exdf.confkeys["workers"]) or min(len(list(self.plan.codes)),mp.cpu_count()),
+                                  rebalance_interval=self.configuration.get(exdf.confkeys["rebalance_interval"],0))
+        pool,progress=None,None
+        try:
+            if self.region_objects: # Resumed from checkpoint
+                codes=list(self.region_objects.keys())
+                graph=self.mobility_graph or mb.MobilityGraph(self.region_objects)
+                seed=next(iter(self.region_objects.values())).rand_seed
+                restored=bool(self.checkpoint_rng_states and self.checkpoint_worker_groups)
+                groups=scheduler.initial_groups(self.region_objects,groups=self.checkpoint_worker_groups if restored else None)
+                self.simulation_days=(next(iter(self.region_objects.values()))).get_days()+1
+                progress=self.create_progress_metrics()
+                pool=RegionWorkerPool([{key:self.region_objects[key] for key in group} for group in groups],seed=seed,
+                                      rng_states=self.checkpoint_rng_states if restored else None)
+            else:
+                codes=list(self.plan.codes)
+                groups=scheduler.initial_groups({code:self.plan.region(code).population_size for code in codes})
+                pool=RegionWorkerPool([{} for _ in groups])
+                handles=pool.create(groups,configuration=self.plan,save_settings=self.save_settings,test=self.test,
+                                    override_pop_location=self.override_pop_location,schedule=self.schedule)
+                handles={code:handles[code] for code in codes}
+                scheduler.estimated_costs={code:handle.cost for code,handle in handles.items()}
+                seed=handles[codes[0]].rand_seed
+                pool.set_seed(seed)
+                self.simulation_days=handles[codes[0]].get_days()+1
+                graph=None
+                # Initial interaction, indexes are allocated on handles and sent to workers
+                if self.mobility:
+                    if mb.has_mobility_indexes(self.mobility_indexes,codes):
+                        for code,handle in handles.items():
+                            handle.set_unique_mobility_indexes(self.mobility_indexes[code])
+                    else:
+                        mb.create_random_mobility_indexes(handles)
+                    pool.set_mobility_indexes({code:handle.unique_mobility_indexes for code,handle in handles.items()})
+                    graph=mb.MobilityGraph(handles)
+                    pool.synchronize(graph)
+                self.mobility_graph=graph
+                graph=graph or mb.MobilityGraph(handles)
+                self.region_objects=handles
+                progress=self.create_progress_metrics()
+            self.region_objects={} # Regions lives in workers now
+            for t in range(self.start_day,self.simulation_days):
+                start=time.perf_counter()
+                day_results=pool.step(t,mobility=bool(self.mobility),commuters=self.sync_policy.needs_fraction)
+                scheduler.record(pool.groups,day_results,time.perf_counter()-start)
+                exclude_regions=[key for key,value in day_results.items() if value["mobility_excluded"]]
+                if len(set(exclude_regions)) < len(day_results) and self.mobility:
+                    fraction=None
+                    if self.sync_policy.needs_fraction:
+                        fraction=(sum(value["infectious_commuters"] for value in day_results.values())/
+                                  max(sum(value["commuters"] for value in day_results.values()),1))
+                    if self.sync_policy.should_sync(t,fraction):
+                        start=time.perf_counter()
+                        pool.synchronize(graph,exclude=exclude_regions)
+                        self.sync_policy.record(t,time.perf_counter()-start,fraction)
+                    else:
+                        self.sync_policy.skip()
+                # Print
+                progress.update(t,day_results,date=day_results[codes[0]].get("date"))
+                # Migrate regions when measured step times drifted
+                new_groups=scheduler.rebalance(t,pool.groups)
+                if new_groups:
+                    pool.migrate(new_groups)
+                if self.checkpoint_due(t):
+                    regions,rng_states=pool.checkpoint()
+                    self.save_checkpoint(t,regions={key:regions[key] for key in codes},rng_states=rng_states,worker_groups=pool.groups)
+            # Finalize sims in workers and collect them back (in original order)
+            regions=pool.finalize()
+            self.run_metadata["load_balance"]=scheduler.utilization(pool.groups)
+        finally:
+            if pool is not None:
+                pool.close()
+            if progress is not None:
+                progress.close()
+        print("\nWorker utilization:")
+        for i,worker in enumerate(self.run_metadata["load_balance"]["workers"]):
+            print(f"Worker {i}: {worker['utilization']*100:.1f}% ({', '.join(worker['regions'])})")
+        self.region_objects={key:regions[key] for key in codes}
+        self.region_objects_result=dict(self.region_objects)
+        self.multisim_result=cv.MultiSim([val.cv_simulation for val in self.region_objects.values()])
+
     def save_multisim_object(self):
         if not self.save_settings:
             print("Save settings is not defined. Nowhere to save simulation.")
         else:
             self.save_settings["sim_location"]=exut.merge_twoPaths(self.save_settings["location"],exdf.default_multisim_object_rel_path)
             self.multisim_result.save(self.save_settings["sim_location"])
+
+    def save_mobility_indexes(self):
+        """Save commuter indexes next to multisim object, so they can be reloaded (mobility "indexes_filepath")
+        """
+        if not self.save_settings or not self.mobility:
+            return
+        self.save_settings["mobility_indexes_location"]=exut.merge_twoPaths(self.save_settings["location"],exdf.default_mobility_indexes_rel_path)
+        mb.save_mobility_indexes(self.region_objects,self.save_settings["mobility_indexes_location"])
+
+    def save_run_metadata(self):
+        """Save run metadata (mobility synchronization counts and time) next to multisim object
+        """
+        self.run_metadata["mobility_sync"]=self.sync_policy.summary()
+        if not self.save_settings:
+            return
+        self.save_settings["run_metadata_location"]=exut.merge_twoPaths(self.save_settings["location"],exdf.default_run_metadata_rel_path)
+        exut.save_json(self.save_settings["run_metadata_location"],self.run_metadata)
+
+    def checkpoint_due(self,t:int)->bool:
+        """If checkpoint should be written after day t (not after the last day)
+        """
+        if not self.checkpoint_settings or ckpt.get_checkpoint_dirpath(self.save_settings) is None:
+            return False
+        return (t+1)%self.checkpoint_settings["interval"]==0 and t<self.simulation_days-1
+
+    def save_checkpoint(self,t:int,regions:dict=None,rng_states:list=None,worker_groups:list=None):
+        """Write checkpoint after day t (if it is due), regions with mobility indexes, random states and sync policy
+        """
+        if not self.checkpoint_due(t):
+            return
+        data={"regions":regions or self.region_objects,
+              "rng_states":rng_states or [ckpt.get_rng_state()],
+              "worker_groups":worker_groups,
+              "parallel_run":self.parallel_run,
+              "parallel_backend":self.parallel_backend,
+              "mobility_graph":self.mobility_graph,
+              "sync_policy":self.sync_policy}
+        ckpt.save_checkpoint(ckpt.get_checkpoint_dirpath(self.save_settings),t,data,keep=self.checkpoint_settings["keep"])
+
+    def load_checkpoint(self):
+        """Load the latest checkpoint, simulation continues with the next day
+        """
+        path=self.resume if isinstance(self.resume,str) else ckpt.get_checkpoint_dirpath(self.save_settings)
+        data=ckpt.load_latest_checkpoint(path)
+        if data is None:
+            print("Simulation starts from the beginning.")
+            return
+        if data["parallel_run"]!=self.parallel_run or data["parallel_backend"]!=self.parallel_backend:
+            print("Checkpoint was created with different parallel settings, results will not be identical to uninterrupted run.")
+        elif self.parallel_run and self.parallel_backend==exdf.simulation_parallel_backends["thread"]:
+            print("Thread backend shares random states between regions, results will not be identical to uninterrupted run.")
+        self.region_objects=dict(data["regions"])
+        self.region_objects_result=dict(self.region_objects)
+        self.checkpoint_rng_states=data["rng_states"]
+        self.checkpoint_worker_groups=data.get("worker_groups")
+        self.mobility_graph=data["mobility_graph"]
+        self.sync_policy=data["sync_policy"]
+        self.start_day=data["day"]+1
@@ -0,0 +1,210 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import abmshare.defaults as exdf
+
+"""
+Process wide cache of loaded datafiles (csv/xlsx).
+Entries are keyed by (absolute path, mtime, size), so changed file is loaded again. Least recently used entries are
+evicted when the memory cap is reached. Cached frames are read-only, consumers get shallow copies (own index and
+columns, shared read-only data) with key of the file in attrs["datafile_key"].
+Case-insensitive lookup indexes of columns (value -> row position) are cached too, per file (or per dataframe
+identity for dataframes which are not loaded from file), so repeated lookups of codes do not scan the frame.
+"""
+
+
+def datafile_key(filepath:str)->tuple:
+    """Key of datafile in cache (absolute path, mtime in ns, size)
+    """
+    path=os.path.abspath(filepath)
+    stat=os.stat(path)
+    return (path,stat.st_mtime_ns,stat.st_size)
+
+
+def set_read_only(df:pd.DataFrame)->pd.DataFrame:
+    """Mark data of dataframe as read-only (in place), so the cached frame can not be changed through its copies
+    """
+    for block in df._mgr.blocks:
+        try:
+            block.values.flags.writeable=False
+        except (AttributeError,ValueError):
+            pass # Extension arrays
+    return df
+
+
+class DatafileCache:
+    """LRU cache of dataframes with memory cap and hit/miss counters.
+    """
+    def __init__(self,max_bytes:int=None):
+        self.max_bytes=exdf.default_datafile_cache_max_bytes if max_bytes is None else max_bytes
+        self.entries=OrderedDict()
+        self.bytes=0
+        self.hits=0
+        self.misses=0
+        self.lock=threading.Lock()
+
+    def get(self,filepath:str,loader)->pd.DataFrame:
+        """Return dataframe of file from cache or load it by loader
+
+        Args:
+            filepath (str): path to datafile
+            loader (callable): function loading dataframe from filepath
+
+        Returns:
+            pd.DataFrame: shallow copy of cached (read-only) dataframe
+
+        """
+        key=datafile_key(filepath)
+        with self.lock:
+            entry=self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits+=1
+        if entry is None:
+            df=loader(filepath)
+            size=int(df.memory_usage(index=True,deep=True).sum())
+            set_read_only(df)
+            with self.lock:
+                self.misses+=1
+                # Older versions of the same file are not valid anymore
+                for old_key in [old_key for old_key in self.entries if old_key[0]==key[0] and old_key!=key]:
+                    self.bytes-=self.entries.pop(old_key)[1]
+                if key not in self.entries:
+                    self.entries[key]=(df,size)
+                    self.bytes+=size
+                entry=self.entries[key]
+                while self.bytes>self.max_bytes and len(self.entries)>1:
+                    self.bytes-=self.entries.popitem(last=False)[1][1]
+        view=entry[0].copy(deep=False)
+        view.attrs["datafile_key"]=key
+        return view
+
+    def stats(self)->dict:
+        with self.lock:
+            return {"hits":self.hits,"misses":self.misses,"entries":len(self.entries),"bytes":self.bytes,"max_bytes":self.max_bytes}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes=0
+            self.hits=0
+            self.misses=0
+
+
+def column_data_key(values:np.ndarray)->tuple:
+    """Identity of column data (memory address, strides and length), it differs for filtered copies of dataframe.
+    Cached entries keep reference to the data, so the address can not be reused by another array.
+    """
+    return (values.__array_interface__["data"][0],values.strides,len(values))
+
+
+def build_column_index(values)->dict:
+    """Lowercased value -> row position. Duplicate values in contiguous rows give a slice of positions (as pandas
+    Index.get_loc), duplicates in other rows give position of the first row.
+    """
+    positions={}
+    for i,value in enumerate(values):
+        if isinstance(value,str):
+            positions.setdefault(value.lower(),[]).append(i)
+    index={}
+    for key,pos in positions.items():
+        if len(pos)>1 and pos[-1]-pos[0]==len(pos)-1:
+            index[key]=slice(pos[0],pos[-1]+1)
+        else:
+            index[key]=pos[0]
+    return index
+
+
+class ColumnIndexCache:
+    """Cache of case-insensitive lookup indexes of dataframe columns.
+    Indexes of datafiles are keyed by key of the file (changed file gets new index), indexes of other dataframes
+    are keyed by identity of the dataframe and live as long as the dataframe (values changed in place are not detected).
+    """
+    def __init__(self,max_entries:int=None):
+        self.max_entries=exdf.default_column_index_cache_entries if max_entries is None else max_entries
+        self.entries=OrderedDict()
+        self.frames={} # id of dataframe -> indexes, removed when dataframe is garbage collected
+        self.hits=0
+        self.misses=0
+        self.lock=threading.Lock()
+
+    def get(self,df:pd.DataFrame,column:str)->dict:
+        """Lookup index of column of dataframe
+
+        Args:
+            df (pd.DataFrame): dataframe
+            column (str): column name
+
+        Returns:
+            dict: lowercased value -> row position (see build_column_index)
+
+        """
+        values=df[column].to_numpy()
+        data_key=column_data_key(values)
+        file_key=df.attrs.get("datafile_key")
+        with self.lock:
+            if file_key is not None:
+                entries=self.entries
+                key=(file_key,column,data_key)
+            else:
+                if id(df) not in self.frames:
+                    self.frames[id(df)]={}
+                    weakref.finalize(df,self.frames.pop,id(df),None)
+                entries=self.frames[id(df)]
+                key=(column,data_key)
+            entry=entries.get(key)
+            if entry is not None:
+                self.hits+=1
+                if file_key is not None:
+                    entries.move_to_end(key)
+                return entry[1]
+        index=build_column_index(values)
+        with self.lock:
+            self.misses+=1
+            if file_key is not None:
+                # Indexes of older versions of the same file are not valid anymore
+                for old_key in [old_key for old_key in entries if old_key[0][0]==file_key[0] and old_key[0]!=file_key]:
+                    del entries[old_key]
+                while len(entries)>=self.max_entries:
+                    entries.popitem(last=False)
+            entries[key]=(values,index)
+        return index
+
+    def stats(self)->dict:
+        with self.lock:
+            return {"hits":self.hits,"misses":self.misses,"entries":len(self.entries)+sum(len(v) for v in self.frames.values())}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.frames.clear()
+            self.hits=0
+            self.misses=0
+
+
+datafile_cache=DatafileCache()
+column_index_cache=ColumnIndexCache()
+
+
+def get_datafile(filepath:str,loader)->pd.DataFrame:
+    return datafile_cache.get(filepath,loader)
+
+
+def get_column_index(df:pd.DataFrame,column:str)->dict:
+    return column_index_cache.get(df,column)
+
+
+def cache_stats()->dict:
+    """Hit/miss counters and memory usage of the datafile cache (and counters of column index cache)
+    """
+    return {**datafile_cache.stats(),"column_index":column_index_cache.stats()}
+
+
+def clear_cache():
+    datafile_cache.clear()
+    column_index_cache.clear()
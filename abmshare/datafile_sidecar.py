@@ -0,0 +1,227 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import abmshare.defaults as exdf
+
+"""
+Binary columnar sidecar cache of input datafiles (csv/xlsx).
+Parsed dataframe is saved next to the source file (in hidden directory) as one .npy file per column together with
+content hash of the source, later loads memory-map the columns instead of parsing the file again. Sidecar is used
+only if the source did not change (same size and mtime, or same content hash). Caches for the whole input_data tree
+can be prebuilt by: python -m abmshare.datafile_sidecar <input_data directory>
+"""
+
+
+def sidecar_dirpath(filepath:str)->str:
+    dirpath,filename=os.path.split(os.path.abspath(filepath))
+    return os.path.join(dirpath,exdf.default_sidecar_dirname,filename)
+
+
+def file_hash(filepath:str)->str:
+    """Content hash of file
+    """
+    digest=hashlib.blake2b(digest_size=16)
+    with open(filepath,"rb") as file:
+        for chunk in iter(lambda:file.read(1024**2),b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_sidecar_meta(filepath:str)->dict|None:
+    try:
+        with open(os.path.join(sidecar_dirpath(filepath),exdf.default_sidecar_meta_filename)) as file:
+            meta=json.load(file)
+        return meta if meta.get("version")==exdf.default_sidecar_version else None
+    except (OSError,ValueError):
+        return None
+
+
+def is_sidecar_valid(filepath:str,meta:dict)->bool:
+    """Source did not change since sidecar was written (same size and mtime, or same content)
+    """
+    stat=os.stat(filepath)
+    if stat.st_size!=meta["size"]:
+        return False
+    if stat.st_mtime_ns==meta["mtime_ns"]:
+        return True
+    if file_hash(filepath)!=meta["source_hash"]:
+        return False
+    try: # Same content (e.g. copied or touched file), next check does not need hashing
+        meta["mtime_ns"]=stat.st_mtime_ns
+        with open(os.path.join(sidecar_dirpath(filepath),exdf.default_sidecar_meta_filename),"w") as file:
+            json.dump(meta,file)
+    except OSError:
+        pass
+    return True
+
+
+def encode_column(series:pd.Series)->tuple|None:
+    """Column as (kind, arrays to save), None if column can not be saved (mixed object values, extension types)
+    """
+    values=series.to_numpy()
+    if values.dtype.kind in "biuf":
+        return "array",{"values":values}
+    if values.dtype.kind=="M":
+        return "datetime",{"values":values.view("i8")}
+    if values.dtype==object:
+        mask=pd.isna(series).to_numpy()
+        if not all(isinstance(value,str) for value in values[~mask]):
+            return None
+        return "str",{"values":np.array(np.where(mask,"",values),dtype=str),"mask":mask}
+    return None
+
+
+def decode_column(kind:str,dtype:str,arrays:dict)->np.ndarray:
+    if kind=="array":
+        return arrays["values"]
+    if kind=="datetime":
+        return arrays["values"].view(dtype)
+    values=arrays["values"].astype(object)
+    values[arrays["mask"]]=np.nan
+    return values
+
+
+def write_sidecar(filepath:str,df:pd.DataFrame,source_hash:str=None)->bool:
+    """Save dataframe of filepath as sidecar
+
+    Args:
+        filepath (str): path to source datafile
+        df (pd.DataFrame): parsed dataframe of the source
+        source_hash (str, optional): content hash of the source. Defaults to None (computed).
+
+    Returns:
+        bool: True if sidecar was written, False if dataframe can not be saved (unsupported columns or index)
+
+    """
+    if not isinstance(df.index,pd.RangeIndex) or df.index.start!=0 or df.index.step!=1 or df.columns.has_duplicates:
+        return False
+    columns=[]
+    for column in df.columns:
+        if not isinstance(column,(str,int,float)):
+            return False
+        encoded=encode_column(df[column])
+        if encoded is None:
+            return False
+        columns.append((column,)+encoded)
+    stat=os.stat(filepath)
+    meta={"version":exdf.default_sidecar_version,
+          "source_hash":source_hash or file_hash(filepath),
+          "size":stat.st_size,
+          "mtime_ns":stat.st_mtime_ns,
+          "length":len(df),
+          "columns":[]}
+    dirpath=sidecar_dirpath(filepath)
+    tmp_dirpath=f"{dirpath}.tmp{os.getpid()}"
+    os.makedirs(tmp_dirpath,exist_ok=True)
+    try:
+        for i,(column,kind,arrays) in enumerate(columns):
+            files={}
+            for key,array in arrays.items():
+                files[key]=f"c{i}_{key}.npy"
+                np.save(os.path.join(tmp_dirpath,files[key]),array,allow_pickle=False)
+            meta["columns"].append({"name":column,"kind":kind,"dtype":df[column].dtype.str,"files":files})
+        with open(os.path.join(tmp_dirpath,exdf.default_sidecar_meta_filename),"w") as file:
+            json.dump(meta,file)
+        shutil.rmtree(dirpath,ignore_errors=True)
+        os.replace(tmp_dirpath,dirpath)
+    finally:
+        shutil.rmtree(tmp_dirpath,ignore_errors=True)
+    return True
+
+
+def load_sidecar(filepath:str)->pd.DataFrame|None:
+    """Load dataframe of filepath from its sidecar (numeric columns are memory-mapped)
+
+    Returns:
+        pd.DataFrame|None: dataframe or None if there is no valid sidecar
+
+    """
+    meta=read_sidecar_meta(filepath)
+    if meta is None or not is_sidecar_valid(filepath,meta):
+        return None
+    dirpath=sidecar_dirpath(filepath)
+    try:
+        data={}
+        for column in meta["columns"]:
+            arrays={key:np.load(os.path.join(dirpath,name),mmap_mode="r",allow_pickle=False) for key,name in column["files"].items()}
+            data[column["name"]]=decode_column(column["kind"],column["dtype"],arrays)
+        return pd.DataFrame(data,index=pd.RangeIndex(meta["length"]),copy=False)
+    except (OSError,ValueError,KeyError):
+        return None
+
+
+def load_with_sidecar(filepath:str,reader,write:bool=None)->pd.DataFrame:
+    """Load datafile from valid sidecar or by reader (and write sidecar for it)
+
+    Args:
+        filepath (str): path to datafile
+        reader (callable): function parsing the datafile
+        write (bool, optional): write sidecar after parsing. Defaults to None (for extensions in exdf.datafile_sidecar_extensions).
+
+    Returns:
+        pd.DataFrame: dataframe
+
+    """
+    df=load_sidecar(filepath)
+    if df is not None:
+        return df
+    df=reader(filepath)
+    if write is None:
+        write=os.path.splitext(filepath)[1].lower() in exdf.datafile_sidecar_extensions
+    if write:
+        try:
+            write_sidecar(filepath,df)
+        except OSError:
+            pass # e.g. read-only input directory
+    return df
+
+
+def prebuild_sidecars(dirpath:str,extensions:list=None,force:bool=False)->list:
+    """Build sidecars for all datafiles in directory tree
+
+    Args:
+        dirpath (str): root directory (e.g. input_data of sandbox)
+        extensions (list, optional): datafile extensions. Defaults to exdf.datafile_sidecar_extensions.
+        force (bool, optional): rebuild also valid sidecars. Defaults to False.
+
+    Returns:
+        list: list of (filepath, status, seconds)
+
+    """
+    import abmshare.utils as exut # Imported here, utils imports this module (loading of datafiles through sidecars)
+    extensions=[ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in (extensions or exdf.datafile_sidecar_extensions)]
+    report=[]
+    for root,dirs,files in os.walk(dirpath):
+        dirs[:]=[d for d in dirs if d!=exdf.default_sidecar_dirname]
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1].lower() not in extensions:
+                continue
+            filepath=os.path.join(root,filename)
+            start=time.perf_counter()
+            meta=read_sidecar_meta(filepath)
+            if not force and meta is not None and is_sidecar_valid(filepath,meta):
+                status="valid"
+            else:
+                try:
+                    status="built" if write_sidecar(filepath,exut.read_datafile(filepath)) else "unsupported"
+                except Exception as e:
+                    status=f"failed ({e})"
+            report.append((filepath,status,time.perf_counter()-start))
+            print(f"{report[-1][2]:8.3f} s  {status:<12}{filepath}")
+    return report
+
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Prebuild binary sidecar caches of input datafiles")
+    parser.add_argument("directory",help="Directory with input data (e.g. sandbox input_data)")
+    parser.add_argument("-e","--extensions",nargs="+",default=None,help="Datafile extensions (default .xlsx)")
+    parser.add_argument("-f","--force",action="store_true",help="Rebuild also valid sidecars")
+    args=parser.parse_args()
+    prebuild_sidecars(args.directory,extensions=args.extensions,force=args.force)
@@ -106,6 +106,8 @@ confkeys={
     "separated_simulation":"separated_simulation",
     "copy_files":"copy_files",
     "copy_loaded_pop":"copy_loaded_pop",
+    "population_store":"population_store",
+    "population_scheduler":"population_scheduler",
     "config_dirpath":"config_dirpath",
     "parent_location":"parent_location",
     "parent":"parent",
@@ -143,6 +145,19 @@ confkeys={
     "region_config_filename":"region_config_filename",
     "pars_file":"pars_file",
     "multiprocess":"parallel_run",
+    "parallel_backend":"parallel_backend",
+    "indexes_filepath":"indexes_filepath",
+    "sync_interval":"sync_interval",
+    "sync_threshold":"sync_threshold",
+    "checkpoint":"checkpoint",
+    "checkpoint_interval":"interval",
+    "checkpoint_keep":"keep",
+    "workers":"workers",
+    "rebalance_interval":"rebalance_interval",
+    "ensemble":"ensemble",
+    "n_runs":"n_runs",
+    "quantile_low":"quantile_low",
+    "quantile_high":"quantile_high",
     "population":"population",
     "synthpops_input_data":"synthpops_input_data",
     "value":"value",
@@ -660,6 +675,7 @@ synthpops_pars={
         "windows_length",
         "do_make",
         "country_filepath",
+        "contact_order",
     ],
     "pop_location_pars":
     [
@@ -1231,6 +1247,12 @@ covasim_exclude_simulation_pars=[
 
 covasim_global_keys=covasim_pars_all
 
+# Backends for parallel simulation run (simulation configuration key parallel_backend)
+simulation_parallel_backends={
+    "thread":"thread",   # Regions are stepped in threads of main process
+    "process":"process", # Every region lives in its own worker process for whole run
+}
+
 covasim_default_datetime="2020-03-01"
 covasim_datetime_format="%Y-%m-%d"
 
@@ -1291,6 +1313,51 @@ intervention_mapping={
 }
 
 default_multisim_object_rel_path="sims/simulation.msim"
+default_datafile_cache_max_bytes=512*1024**2 # Memory cap of loaded datafiles cache
+default_column_index_cache_entries=256 # Max number of cached lookup indexes of datafile columns
+datafile_sidecar_extensions=[".xlsx"] # Datafiles which get binary sidecar cache on the first load
+default_sidecar_dirname=".abmshare_cache"
+default_sidecar_meta_filename="meta.json"
+default_sidecar_version=1
+default_validation_cache_suffix=".validation.json" # Cached validation results of datafile (in sidecar directory)
+default_validation_cache_version=1
+default_validation_workers=8 # Threads checking existence of files referenced by datafiles
+default_validation_max_reported_values=10 # Invalid values shown in one validation message
+default_region_config_writers=8 # Threads writing synthpops region configs
+default_population_store_dirpath="~/.cache/abmshare/populations" # Content-addressed store of synthetic populations
+population_store_env="ABMSHARE_POPULATION_STORE" # Overrides default directory of population store
+default_population_store_max_bytes=10*1024**3 # Least recently used populations are evicted over this size
+population_store_version=2
+population_store_scheme="store://" # popfile value of covasim region: store://<key> or store:// (lookup by location code)
+population_store_ignored_pars=["region_config_path","parent_config_path","config_dirpath"] # Paths, not part of population key
+population_generation_base_bytes=256*1024**2 # Estimated memory of population generation process without agents
+population_generation_bytes_per_agent=10*1024 # Estimated peak memory of population generation per agent
+default_population_memory_fraction=0.8 # Default memory budget of population generation (fraction of available memory)
+default_mobility_indexes_rel_path="sims/mobility_indexes.npz"
+default_run_metadata_rel_path="sims/run_metadata.json"
+default_run_plan_filename="RunPlan.json"
+default_intervention_schedule_filename="InterventionSchedule.csv"
+intervention_schedule_reset_types=["beta_change","isolate_contacts"] # Change is reverted on the end day (end day is not active)
+intervention_schedule_value_keys={ # Parameter of intervention type, which is exported as value in intervention schedule
+    "beta_change":"beta_change",
+    "isolate_contacts":"beta_change",
+    "per_day_testing":"daily_tests",
+    "testing_probability":"symp_prob",
+    "contact_tracing":"trace_time",
+    "vaccinate_probability":"prob",
+    "vaccinate_distribution":"num_doses",
+    "simple_vaccination":"prob",
+}
+default_import_profile_top=25 # Number of the slowest imports in import time profile
+default_progress_metrics_rel_path="sims/progress.jsonl"
+default_mobility_sync_interval=1
+default_checkpoint_rel_path="checkpoints"
+default_checkpoint_prefix="checkpoint_day_"
+default_checkpoint_keep=2
+default_rebalance_threshold=0.1 # minimal relative improvement of the slowest worker for migration of regions
+default_step_time_smoothing=0.3
+default_ensemble_n_runs=10
+default_ensemble_quantiles={"low":0.1,"high":0.9}
 
 grid_dict_info={
     "default_base_directory":"ABM_share_meta",
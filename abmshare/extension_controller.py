@@ -1,20 +1,24 @@
 import os
 import sys
 
-import abmshare.covasim_ex.immunity_process as exim
 from abmshare import defaults as exdf
 from abmshare import utils as exut
-from abmshare.covasim_ex import simulation_controller as simproc
-from abmshare.grid_compute_ex import grid_compute_controller as gridproc
-from abmshare.report_ex import report_ex_controller as repproc
-from abmshare.synthpops_ex import synthpops_controller as syntproc
 from abmshare.validator import validator as val
 
+# Heavy modules (covasim, synthpops, plotting) are imported on the first use, validation and grid submission do not need them
+exim=exut.lazy_import("abmshare.covasim_ex.immunity_process")
+exis=exut.lazy_import("abmshare.covasim_ex.intervention_schedule")
+exrp=exut.lazy_import("abmshare.run_plan")
+simproc=exut.lazy_import("abmshare.covasim_ex.simulation_controller")
+gridproc=exut.lazy_import("abmshare.grid_compute_ex.grid_compute_controller")
+repproc=exut.lazy_import("abmshare.report_ex.report_ex_controller")
+syntproc=exut.lazy_import("abmshare.synthpops_ex.synthpops_controller")
+
 # Check for the parameters file.
 
 class ExtensionController():
     def __init__(self,configuration,synthpops_configuration=None,simulation_configuration=None,
-                 report_configuration=None,grid_compute:bool=False,grid_user:str=None,validate=None,test=False):
+                 report_configuration=None,grid_compute:bool=False,grid_user:str=None,validate=None,test=False,resume:str=None):
         """Configuration (dict)                    : configuration with informations for run synthpops
         synthpops_configuration (dict)          : OPTIONAl, defaultly loaded from main configuration
         covasim_configuration (dict)            : OPTIONAl, defaultly loaded from main configuration
@@ -23,6 +27,7 @@ class ExtensionController():
         test (bool)                             : if it should prepare default test environment and values
         validate (bool:None)                    : True - it will only validate input files, None / it will validate and run, False, it Will not validate at all
         grid_user(str)                          : name of user for proper path while grid computing
+        resume(str)                             : output directory of interrupted run, simulation continues from its latest checkpoint
         """
         if not isinstance(configuration,dict):
             self.conf_path=configuration
@@ -38,6 +43,8 @@ class ExtensionController():
         self.log_file=None
         self.validate=validate
         self.mobility=None
+        self.resume=resume
+        self.run_plan=None
 
         if not synthpops_configuration:
             synthpops_configuration = self.configuration.get("synthpops_settings", None)
@@ -72,7 +79,11 @@ class ExtensionController():
         #Handle save options
     def start(self):
         try:
-            if exdf.confkeys["auto_save_settings"] in self.configuration and self.validate!=True:
+            if self.resume and self.validate!=True:
+                # Continue in output directory of interrupted run
+                self.save_settings=dict(self.configuration.get(exdf.confkeys["auto_save_settings"],{}))
+                self.save_settings["location"]=self.resume
+            elif exdf.confkeys["auto_save_settings"] in self.configuration and self.validate!=True:
                 self.save_settings=self.load_save_settings_parse()
                 self.save_configuration()
         except Exception:
@@ -115,15 +126,19 @@ class ExtensionController():
             sys.stdout = self.log_file
         except Exception:
             pass
-        if self.initialized_modules["synthpops"]:            
+        self.compile_run_plan()
+        if self.initialized_modules["synthpops"] and self.resume:
+            print("Resuming simulation, populations are not created again.")
+        elif self.initialized_modules["synthpops"]:
             if self.mobility==None:
-                self.mobility=exut.get_nested_value_from_dict(exut.load_config(self.synthpops_configuration["filepath"]),exdf.synthpops_mobility_bool) if not None else False
+                self.mobility=self.run_plan.mobility
             print("*******************************************")
             print("Running pop creation process")
-            syntproc.SynthpopsExtensionController(configuration=self.synthpops_configuration["filepath"],save_settings=self.save_settings,test=self.test,mobility=self.mobility)
+            syntproc.SynthpopsExtensionController(configuration=self.synthpops_configuration["filepath"],save_settings=self.save_settings,test=self.test,mobility=self.mobility,
+                                                  plan=self.run_plan)
         if self.initialized_modules["multisim"]:
             if self.mobility==None:
-                self.mobility=exut.get_nested_value_from_dict(exut.load_config(self.synthpops_configuration["filepath"]),exdf.synthpops_mobility_bool) if not None else False            
+                self.mobility=self.run_plan.mobility
             print("*******************************************")
             print("Running multisim simulation process")
             # immunity
@@ -135,7 +150,8 @@ class ExtensionController():
                 print("Immunity process could not be initialized.")
                 pass
             simproc.SimulationExtensionController(configuration=self.simulation_configuration["filepath"],save_settings=self.save_settings,
-                                                  override_pop_location=self.override_save_settings,test=self.test,mobility=self.mobility)
+                                                  override_pop_location=self.override_save_settings,test=self.test,mobility=self.mobility,
+                                                  resume=bool(self.resume),plan=self.run_plan)
         try:
             if self.initialized_modules["report"]:                
                 print("*******************************************")
@@ -193,6 +209,31 @@ class ExtensionController():
         except Exception:
             pass
 
+    def compile_run_plan(self):
+        """Compile configurations of enabled modules into immutable run plan (only once for the whole run) and save it
+        to output directory (for auditing of the run). Invalid configuration stops the run.
+        """
+        try:
+            self.run_plan=exrp.compile_run_plan(configuration=self.configuration,
+                                                synthpops_configuration=self.synthpops_configuration["filepath"] if self.synthpops_configuration else None,
+                                                simulation_configuration=self.simulation_configuration["filepath"] if self.initialized_modules["multisim"] else None)
+        except Exception as e:
+            print(f"Run plan could not be compiled, check the configuration: {e}")
+            raise
+        if self.save_settings.get("location"):
+            location=os.path.join(self.save_settings["location"],"Configuration")
+            try:
+                exut.directory_validator(location)
+                exrp.save_run_plan(self.run_plan,os.path.join(location,exdf.default_run_plan_filename))
+            except Exception:
+                print("Run plan could not be saved.")
+            if self.run_plan.n_days is not None: # Schedule of interventions of all regions for auditing
+                try:
+                    exis.compile_schedule(self.run_plan).export(os.path.join(location,exdf.default_intervention_schedule_filename))
+                except Exception as e:
+                    print(f"Intervention schedule could not be exported: {e}")
+        return self.run_plan
+
     def check_override(self):
         if self.configuration["initialize"]["synthpop_initialize"] and self.configuration["initialize"]["simulation_initialize"]:
             self.override_save_settings=True
@@ -0,0 +1,267 @@
+import dataclasses
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import abmshare.covasim_ex.intervention_process as exip
+import abmshare.covasim_ex.simulation_conf_getter as exscg
+import abmshare.defaults as exdf
+import abmshare.synthpops_ex.population_store as exps
+import abmshare.synthpops_ex.synthpops_conf_getter as spcg
+import abmshare.utils as exut
+
+"""
+Compiled run plan.
+Main, synthpops and simulation configurations are parsed and validated only once (in ExtensionController.start)
+into immutable plan: regions with parameters, interventions with resolved days and mobility matrix. Downstream
+modules take facts from the plan instead of re-reading configuration files and CSVs. Plan is saved as JSON next to
+the outputs of the run (load_run_plan reads it back, e.g. for auditing).
+"""
+
+
+def plain_value(value):
+    """Convert value from dataframe/configuration to hashable JSON compatible value (numpy scalars to python,
+    lists to tuples, dicts to tuples of pairs)
+    """
+    if isinstance(value,np.generic):
+        return value.item()
+    if isinstance(value,np.ndarray):
+        return tuple(plain_value(x) for x in value.tolist())
+    if isinstance(value,(list,tuple)):
+        return tuple(plain_value(x) for x in value)
+    if isinstance(value,dict):
+        return tuple((key,plain_value(val)) for key,val in value.items())
+    return value
+
+
+def pairs_to_dict(pairs:tuple)->dict:
+    return {key:value for key,value in pairs}
+
+
+@dataclass(frozen=True,slots=True)
+class MobilityMatrix:
+    """Number of commuters from region (row) to region (column)
+    """
+    codes:tuple
+    columns:tuple
+    values:tuple
+
+    @classmethod
+    def from_dataframe(cls,data:pd.DataFrame)->"MobilityMatrix":
+        columns=tuple(data.columns[2:])
+        return cls(codes=tuple(plain_value(code) for code in data["location_code"]),
+                   columns=columns,
+                   values=tuple(tuple(float(x) for x in row) for row in np.asarray(data[list(columns)],dtype=float)))
+
+    def value(self,source:str,target:str)->float:
+        return self.values[self.codes.index(source)][self.columns.index(target)]
+
+    def outgoing(self,code:str,codes:tuple=None)->dict:
+        """Commuters from region code to regions codes (same as exscg.get_mobility_data_by_code)
+        """
+        return {target:self.value(code,target) for target in (codes or self.columns)}
+
+    def incoming(self,code:str,codes:tuple=None)->dict:
+        """Commuters to region code from regions codes (same as exscg.get_incoming_mobility_data_by_code)
+        """
+        return {source:self.value(source,code) for source in (codes or self.codes)}
+
+    def as_dict(self)->dict:
+        """Mobility rows without nans (same as exut.prepare_mobility)
+        """
+        return {code:np.nan_to_num(np.array(row,dtype=float)) for code,row in zip(self.codes,self.values)}
+
+
+@dataclass(frozen=True,slots=True)
+class InterventionPlan:
+    """Intervention (or variant) of region with days resolved to day indexes of the simulation
+    """
+    type:str
+    start_day:int|None
+    end_day:int|None
+    pars:tuple
+
+    def as_dict(self)->dict:
+        """Intervention row as consumed by intervention_process (list values as lists)
+        """
+        return {key:list(value) if isinstance(value,tuple) else value for key,value in self.pars}
+
+
+@dataclass(frozen=True,slots=True)
+class RegionPlan:
+    location_code:str
+    name:str
+    parent_name:str
+    population_size:int
+    pars:tuple
+    interventions:tuple=()
+    variants:tuple=()
+
+    def get_pars(self)->dict:
+        return pairs_to_dict(self.pars)
+
+
+@dataclass(frozen=True,slots=True)
+class RunPlan:
+    """Immutable plan of the whole run
+    """
+    codes:tuple=()
+    start_day:str=None
+    n_days:int=None
+    global_pars:tuple=()
+    regions:tuple=()
+    mobility:bool=False
+    mobility_matrix:MobilityMatrix=None
+    unique_mobility_indexes:bool=None
+    synthpops_codes:tuple=()
+    population_mobility_matrix:MobilityMatrix=None
+    population_store_dirpath:str=None
+    population_store_max_bytes:int=None
+    test:bool=False
+
+    def region(self,code:str)->RegionPlan|None:
+        for region in self.regions:
+            if region.location_code==code:
+                return region
+        return None
+
+    def get_global_pars(self,parameter:str=None):
+        pars=pairs_to_dict(self.global_pars)
+        return pars if parameter is None else pars.get(parameter,None)
+
+    def mobility_data(self,code:str)->dict|None:
+        return self.mobility_matrix.outgoing(code,self.codes) if self.mobility_matrix else None
+
+    def mobility_incoming_data(self,code:str)->dict|None:
+        return self.mobility_matrix.incoming(code,self.codes) if self.mobility_matrix else None
+
+    def to_dict(self)->dict:
+        return dataclasses.asdict(self)
+
+    def to_json(self)->str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls,data:dict)->"RunPlan":
+        data=dict(data)
+        for key in ["mobility_matrix","population_mobility_matrix"]:
+            if data.get(key):
+                data[key]=MobilityMatrix(**{k:plain_value(v) for k,v in data[key].items()})
+        data["regions"]=tuple(RegionPlan(**{**{k:plain_value(v) for k,v in region.items() if k not in ["interventions","variants"]},
+                                            "interventions":tuple(InterventionPlan(**{k:plain_value(v) for k,v in intervention.items()})
+                                                                  for intervention in region.get("interventions",[])),
+                                            "variants":tuple(InterventionPlan(**{k:plain_value(v) for k,v in variant.items()})
+                                                             for variant in region.get("variants",[]))})
+                              for region in data.get("regions",[]))
+        for key in ["codes","global_pars","synthpops_codes"]:
+            data[key]=plain_value(data.get(key,()))
+        return cls(**data)
+
+    @classmethod
+    def from_json(cls,text:str)->"RunPlan":
+        return cls.from_dict(json.loads(text))
+
+
+def save_run_plan(plan:RunPlan,filepath:str)->str:
+    with open(filepath,"w") as file:
+        file.write(plan.to_json())
+    return filepath
+
+
+def load_run_plan(filepath:str)->RunPlan:
+    """Load run plan saved by save_run_plan
+    """
+    with open(filepath) as file:
+        return RunPlan.from_json(file.read())
+
+
+def resolve_days(plan:RunPlan,row:dict)->tuple:
+    """Start and end day (indexes of simulation days) of intervention/variant row
+    """
+    days=exip.calculate_daytime(start_day=row.get("start_day"),end_day=row.get("end_day"),num_days=row.get("num_days"),
+                                config=plan,return_days=True)
+    if not days:
+        return None,None
+    return plain_value(days["start_day"]),plain_value(days["end_day"])
+
+
+def compile_region_plan(plan:RunPlan,config:dict,code:str)->RegionPlan:
+    """Compile plan of one region from simulation configuration
+    """
+    pars=exscg.get_pars_by_code(config,code)
+    if pars is None:
+        raise ValueError(f"There are no parameters for location code: {code}")
+    interventions=[]
+    for intervention in exscg.get_interventions_by_code(config,code) or []:
+        start_day,end_day=resolve_days(plan,intervention)
+        interventions.append(InterventionPlan(type=intervention.get("type"),start_day=start_day,end_day=end_day,pars=plain_value(intervention)))
+    variants=[]
+    for variant in exip.get_variants_by_code(config,code):
+        start_day,end_day=resolve_days(plan,variant)
+        variants.append(InterventionPlan(type="variant",start_day=start_day,end_day=end_day,pars=plain_value(variant)))
+    population_size=exscg.get_pop_size_by_code(config,code)
+    if population_size is None:
+        raise ValueError(f"There is no population size for location code: {code}")
+    return RegionPlan(location_code=code,
+                      name=plain_value(pars.get(exdf.covasim_region_csv_columns["name"])),
+                      parent_name=plain_value(pars.get(exdf.covasim_region_csv_columns["region_parent_name"])),
+                      population_size=plain_value(population_size),
+                      pars=plain_value(pars),
+                      interventions=tuple(interventions),
+                      variants=tuple(variants))
+
+
+def compile_run_plan(configuration:dict|str=None,synthpops_configuration:dict|str=None,simulation_configuration:dict|str=None,
+                     codes:list=None,mobility:bool=None)->RunPlan:
+    """Parse and validate configurations into run plan
+
+    Args:
+        configuration (dict | str, optional): main configuration. Defaults to None.
+        synthpops_configuration (dict | str, optional): synthpops configuration. Defaults to None.
+        simulation_configuration (dict | str, optional): simulation configuration. Defaults to None.
+        codes (list, optional): compile only these simulation regions. Defaults to None (all enabled regions).
+        mobility (bool, optional): mobility of the run. Defaults to None (from synthpops configuration).
+
+    Returns:
+        RunPlan: compiled plan
+
+    """
+    fields={}
+    if configuration is not None:
+        configuration=exut.load_config_dict(configuration)
+        fields["test"]=bool((configuration.get("initialize") or {}).get("test",False))
+    if synthpops_configuration is not None:
+        synthpops_configuration=exut.load_config_dict(synthpops_configuration)
+        fields["synthpops_codes"]=tuple(plain_value(code) for code in spcg.get_all_regions(synthpops_configuration) or [])
+        if mobility is None:
+            mobility=bool(exut.get_nested_value_from_dict(synthpops_configuration,exdf.synthpops_mobility_bool))
+        if mobility and spcg.get_mobility_filepath(synthpops_configuration):
+            fields["population_mobility_matrix"]=MobilityMatrix.from_dataframe(exut.load_datafile(spcg.get_mobility_filepath(synthpops_configuration)))
+        # Covasim regions resolve store:// popfiles in the same store as synthpops regions
+        store=exps.store_settings(synthpops_configuration.get(exdf.confkeys["population_store"]))
+        fields["population_store_dirpath"]=store["dirpath"]
+        fields["population_store_max_bytes"]=store["max_bytes"]
+    fields["mobility"]=bool(mobility)
+    plan=RunPlan(**fields)
+    if simulation_configuration is None:
+        return plan
+    config=exut.load_config_dict(simulation_configuration)
+    global_pars=exscg.get_global_pars(config)
+    if global_pars is None or global_pars.get("start_day") is None or global_pars.get("n_days") is None:
+        raise ValueError("Global parameters of simulation must contain start_day and n_days.")
+    all_codes=tuple(plain_value(code) for code in exscg.get_region_codes(config))
+    if not all_codes:
+        raise ValueError("There is no enabled region in the simulation configuration.")
+    mobility_matrix=None
+    if exscg.get_mobility_filepath(config) is not None:
+        mobility_matrix=MobilityMatrix.from_dataframe(exut.load_datafile(exscg.get_mobility_filepath(config)))
+        missing=[code for code in all_codes if code not in mobility_matrix.codes or code not in mobility_matrix.columns]
+        if missing:
+            raise ValueError(f"There is no mobility data for location codes: {missing}")
+    plan=dataclasses.replace(plan,codes=all_codes,start_day=global_pars["start_day"],n_days=plain_value(global_pars["n_days"]),
+                             global_pars=plain_value(global_pars),mobility_matrix=mobility_matrix,
+                             unique_mobility_indexes=plain_value(global_pars.get("unique_mobility_indexes")))
+    regions=tuple(compile_region_plan(plan,config,code) for code in (codes or all_codes))
+    return dataclasses.replace(plan,regions=regions)
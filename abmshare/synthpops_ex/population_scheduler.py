@@ -0,0 +1,157 @@
+import multiprocessing as mp
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+
+import abmshare.defaults as exdf
+
+"""
+Bounded parallel generation of synthetic populations.
+Each region is generated in its own forked process (memory of the population is released when the process exits).
+Peak memory of generation is estimated from population size of region, regions are admitted while the number of
+running processes is under the worker cap and their estimated memory fits into the memory budget. Regions are
+started from the largest one (shortest makespan), smaller regions fill the rest of the budget. Region larger than the
+whole budget runs alone. Errors and timings of processes are sent back to the parent.
+"""
+
+
+class PopulationGenerationError(Exception):
+    pass
+
+
+def estimate_population_bytes(pop_size:int)->int:
+    """Estimated peak memory of generation of population (process overhead + memory per agent)
+    """
+    return exdf.population_generation_base_bytes+int(pop_size or 0)*exdf.population_generation_bytes_per_agent
+
+
+def available_memory()->int|None:
+    """Available physical memory in bytes (psutil if installed, otherwise free pages from sysconf), None if unknown
+    """
+    try:
+        import psutil
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES")*os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError,ValueError,OSError):
+        return None
+
+
+def peak_rss()->int|None:
+    """Peak resident memory of this process in bytes, None if unknown (e.g. on Windows)
+    """
+    try:
+        import resource
+        peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform=="darwin" else peak*1024 # Bytes on macOS, kilobytes elsewhere
+    except (ImportError,OSError):
+        return None
+
+
+def run_population_job(region,connection):
+    """Generate population of region in worker process and send result (seconds, peak memory, error) to the parent
+    """
+    start=time.perf_counter()
+    try:
+        region.create_population_object()
+        error=None
+    except BaseException:
+        error=traceback.format_exc()
+    connection.send({"seconds":time.perf_counter()-start,"peak_bytes":peak_rss(),"error":error})
+    connection.close()
+
+
+class PopulationScheduler:
+    """Runs generation of populations of regions in at most n_workers processes within memory budget.
+    """
+    def __init__(self,n_workers:int=None,memory_budget:int=None):
+        """
+        Args:
+            n_workers (int, optional): maximal number of processes. Defaults to number of CPUs.
+            memory_budget (int, optional): memory (bytes) for running processes. Defaults to exdf.default_population_memory_fraction of available memory.
+        """
+        self.n_workers=max(1,n_workers or os.cpu_count() or 1)
+        if memory_budget is None:
+            memory=available_memory()
+            memory_budget=int(memory*exdf.default_population_memory_fraction) if memory else None
+        self.memory_budget=memory_budget
+        self.results={}
+
+    def order(self,estimates:dict)->list:
+        """Location codes from the largest estimated memory
+        """
+        return sorted(estimates.keys(),key=lambda code:(-estimates[code],str(code)))
+
+    def admit(self,pending:list,estimates:dict,used:int,n_running:int)->str|None:
+        """Next region to start (the largest one which fits into the rest of the budget), None if none can start now
+        """
+        if not pending or n_running>=self.n_workers:
+            return None
+        if n_running==0: # Region larger than the whole budget runs alone
+            return pending[0]
+        for code in pending:
+            if self.memory_budget is None or used+estimates[code]<=self.memory_budget:
+                return code
+        return None
+
+    def run(self,regions:dict)->dict:
+        """Generate populations of all regions
+
+        Args:
+            regions (dict): location code -> synthpops Region (with pop_size)
+
+        Returns:
+            dict: location code -> {seconds, peak_bytes, estimated_bytes, error}
+
+        Raises:
+            PopulationGenerationError: generation of some region failed (after all other regions are finished)
+
+        """
+        context=mp.get_context("fork")
+        estimates={code:estimate_population_bytes(region.pop_size) for code,region in regions.items()}
+        pending=self.order(estimates)
+        running={} # sentinel -> (code, process, connection, start)
+        used=0
+        self.results={}
+        start=time.perf_counter()
+        while pending or running:
+            code=self.admit(pending,estimates,used,len(running))
+            if code is not None:
+                pending.remove(code)
+                receiver,sender=context.Pipe(duplex=False)
+                process=context.Process(target=run_population_job,args=(regions[code],sender))
+                process.start()
+                sender.close()
+                running[process.sentinel]=(code,process,receiver,time.perf_counter())
+                used+=estimates[code]
+                continue
+            for sentinel in mp.connection.wait(list(running.keys())):
+                code,process,receiver,process_start=running.pop(sentinel)
+                process.join()
+                used-=estimates[code]
+                try:
+                    result=receiver.recv()
+                except EOFError: # Process died without result (e.g. killed by OOM killer)
+                    result={"seconds":time.perf_counter()-process_start,"peak_bytes":None,
+                            "error":f"Process exited with code {process.exitcode} without result."}
+                receiver.close()
+                self.results[code]={**result,"estimated_bytes":estimates[code]}
+        self.print_report(time.perf_counter()-start)
+        failed={code:result["error"] for code,result in self.results.items() if result["error"]}
+        if failed:
+            raise PopulationGenerationError("Population generation failed for regions: "+", ".join(map(str,failed))+"\n"
+                                            +"\n".join(f"{code}:\n{error}" for code,error in failed.items()))
+        return self.results
+
+    def print_report(self,wall_time:float):
+        budget=f"{self.memory_budget/1024**3:.1f} GB" if self.memory_budget else "unlimited"
+        print(f"\nPopulations of {len(self.results)} regions generated in {wall_time:.2f} s "
+              f"(workers: {self.n_workers}, memory budget: {budget})")
+        for code,result in sorted(self.results.items(),key=lambda item:-item[1]["seconds"]):
+            peak=f"{result['peak_bytes']/1024**2:.0f} MB" if result["peak_bytes"] else "-"
+            status="failed" if result["error"] else "ok"
+            print(f"{code:<10}{result['seconds']:10.2f} s  estimated {result['estimated_bytes']/1024**2:8.0f} MB  peak {peak:>8}  {status}")
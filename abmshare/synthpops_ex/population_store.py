@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import abmshare.datafile_sidecar as dfs
+import abmshare.defaults as exdf
+import synthpops as sp
+
+"""
+Content-addressed store of synthetic populations.
+Population is stored under hash of everything it is generated from: resolved region config (parent config by its
+content), pop creator pars, synthpops parameters of region, synthpops version and seed. Synthpops region with the same
+key reuses stored population instead of generating it again. Store has a size cap, least recently used populations
+are evicted. Covasim regions can use populations from the store by popfile value store://<key> or store:// (the most
+recently used population of the location code).
+"""
+
+
+def default_store_dirpath()->str:
+    return os.environ.get(exdf.population_store_env) or os.path.expanduser(exdf.default_population_store_dirpath)
+
+
+def store_settings(settings:dict)->dict:
+    """Keyword arguments of PopulationStore from population_store settings of synthpops configuration (dirpath, max_size_gb)
+    """
+    settings=settings or {}
+    max_size_gb=settings.get("max_size_gb")
+    return {"dirpath":settings.get("dirpath") or None,"max_bytes":int(max_size_gb*1024**3) if max_size_gb else None}
+
+
+def population_key(region_config:dict,pop_creator_pars:dict,pars:dict=None,seed:int=None)->str:
+    """Key of population (hash of all inputs of its generation)
+
+    Args:
+        region_config (dict): region config (as saved for synthpops)
+        pop_creator_pars (dict): parameters of sp.Pop
+        pars (dict, optional): synthpops parameters of region. Defaults to None.
+        seed (int, optional): random seed. Defaults to None.
+
+    Returns:
+        str: key
+
+    """
+    region_config=dict(region_config)
+    if region_config.get("parent") and os.path.isfile(region_config["parent"]): # Path differs between runs, content matters
+        region_config["parent"]=dfs.file_hash(region_config["parent"])
+    # Paths of config files are left out, their content is in region config
+    creator_pars={key:value for key,value in pop_creator_pars.items() if key not in exdf.population_store_ignored_pars}
+    text=json.dumps({"region_config":region_config,"pop_creator_pars":creator_pars,"pars":pars or {},
+                     "synthpops_version":sp.__version__,"seed":seed,"version":exdf.population_store_version},
+                    sort_keys=True,default=str)
+    return hashlib.blake2b(text.encode(),digest_size=20).hexdigest()
+
+
+class PopulationStore:
+    """Directory with populations (<key>.pop) and their metadata (<key>.json).
+    Files are replaced atomically, so the store can be shared by processes creating populations in parallel.
+    """
+    def __init__(self,dirpath:str=None,max_bytes:int=None):
+        self.dirpath=dirpath or default_store_dirpath()
+        self.max_bytes=exdf.default_population_store_max_bytes if max_bytes is None else max_bytes
+
+    def population_path(self,key:str)->str:
+        return os.path.join(self.dirpath,f"{key}.pop")
+
+    def meta_path(self,key:str)->str:
+        return os.path.join(self.dirpath,f"{key}.json")
+
+    def read_meta(self,key:str)->dict|None:
+        try:
+            with open(self.meta_path(key)) as file:
+                return json.load(file)
+        except (OSError,ValueError):
+            return None
+
+    def write_meta(self,key:str,meta:dict):
+        tmp_path=f"{self.meta_path(key)}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path,"w") as file:
+            json.dump(meta,file)
+        os.replace(tmp_path,self.meta_path(key))
+
+    def get(self,key:str)->str|None:
+        """Path to stored population (marked as used), None if there is no population with key
+        """
+        meta=self.read_meta(key)
+        if meta is None or not os.path.isfile(self.population_path(key)):
+            return None
+        meta["last_used"]=time.time()
+        try:
+            self.write_meta(key,meta)
+        except OSError:
+            pass
+        return self.population_path(key)
+
+    def put(self,key:str,pop,meta:dict=None)->str:
+        """Save population to store and evict least recently used populations over size cap
+
+        Returns:
+            str: path to stored population
+        """
+        os.makedirs(self.dirpath,exist_ok=True)
+        tmp_path=f"{self.population_path(key)}.tmp{os.getpid()}.{threading.get_ident()}"
+        pop.save(tmp_path)
+        os.replace(tmp_path,self.population_path(key))
+        now=time.time()
+        self.write_meta(key,{**(meta or {}),"key":key,"n":int(pop.n),"size":os.path.getsize(self.population_path(key)),
+                             "created":now,"last_used":now})
+        self.evict(keep=key)
+        return self.population_path(key)
+
+    def entries(self)->list:
+        """Metadata of all stored populations
+        """
+        if not os.path.isdir(self.dirpath):
+            return []
+        entries=[]
+        for filename in os.listdir(self.dirpath):
+            if filename.endswith(".json"):
+                meta=self.read_meta(filename[:-len(".json")])
+                if meta is not None and os.path.isfile(self.population_path(meta["key"])):
+                    entries.append(meta)
+        return entries
+
+    def evict(self,keep:str=None)->list:
+        """Remove least recently used populations until the store fits into size cap
+
+        Args:
+            keep (str, optional): key which is never evicted (just stored population). Defaults to None.
+
+        Returns:
+            list: evicted keys
+
+        """
+        entries=sorted(self.entries(),key=lambda meta:meta.get("last_used",0))
+        size=sum(meta.get("size",0) for meta in entries)
+        evicted=[]
+        for meta in entries:
+            if size<=self.max_bytes:
+                break
+            if meta["key"]==keep:
+                continue
+            for path in [self.population_path(meta["key"]),self.meta_path(meta["key"])]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass # Already evicted by another process
+            size-=meta.get("size",0)
+            evicted.append(meta["key"])
+        return evicted
+
+    def find(self,location_code:str,n:int=None)->str|None:
+        """Key of the most recently used population of location code (and size n, if given)
+        """
+        entries=[meta for meta in self.entries() if str(meta.get("location_code","")).lower()==str(location_code).lower()
+                 and (n is None or meta.get("n")==n)]
+        if not entries:
+            return None
+        return max(entries,key=lambda meta:meta.get("last_used",0))["key"]
+
+    def resolve(self,popfile:str,location_code:str=None,n:int=None)->str|None:
+        """Path to population of popfile value store://<key> or store:// (lookup by location code)
+        """
+        key=popfile[len(exdf.population_store_scheme):].strip("/")
+        if not key:
+            key=self.find(location_code,n) or self.find(location_code)
+        return self.get(key) if key else None
+
+    def copy_to(self,key:str,filepath:str)->str:
+        """Copy stored population to filepath (copy, not link, output files can be overwritten later)
+        """
+        shutil.copyfile(self.get(key),filepath)
+        return filepath
+
+
+def is_store_popfile(popfile)->bool:
+    return isinstance(popfile,str) and popfile.startswith(exdf.population_store_scheme)
@@ -1,14 +1,117 @@
 import copy
 import json
 
-import jsbeautifier
 import numpy as np
+import pandas as pd
 from pytictoc import TicToc
 
+import abmshare.datafile_cache as dfc
 import abmshare.defaults as exdf
+import abmshare.synthpops_ex.population_store as exps
 import abmshare.utils as exut
 import synthpops as sp
 
+"""
+Synthpops region: region config (JSON for synthpops Location) and population object.
+Synthpops input datafiles are parsed once per file (whole table at once) and regions take their slices from the
+parsed result, so building configs of many regions does not walk the same files again.
+"""
+
+parsed_datafiles={} # (datafile key, parser name) -> parsed datafile
+
+
+def parse_datafile(filepath:str,parser):
+    """Parsed datafile, parser is called only once per file (and again after the file changes)
+
+    Args:
+        filepath (str): path to datafile
+        parser (callable): function parsing dataframe of the whole file
+
+    Returns:
+        parsed datafile (shared by all regions, do not change it)
+
+    """
+    key=(dfc.datafile_key(filepath),parser.__name__)
+    if key not in parsed_datafiles:
+        data=exut.load_datafile(filepath)
+        # Parsed older versions of the same file are not valid anymore
+        for old_key in [old_key for old_key in parsed_datafiles if old_key[0][0]==key[0][0] and old_key[1]==key[1]]:
+            del parsed_datafiles[old_key]
+        parsed_datafiles[key]=parser(data.rename(columns=str.lower))
+    return parsed_datafiles[key]
+
+
+def table_rows(data:pd.DataFrame,columns:list,types:list)->list:
+    """Values of columns converted to types as rows, e.g. [[min_age, max_age], ...]
+    """
+    return [list(row) for row in zip(*(data[column].to_numpy().astype(dtype).tolist() for column,dtype in zip(columns,types)))]
+
+
+def parse_age_distributions(data:pd.DataFrame)->dict:
+    """Location code (lowercased) -> population_age_distributions of region (for all bins in exdf.population_age_distributions_bins).
+    Columns after location code, name and population size are age brackets (e.g. 00_04 or prefix_00_04).
+    """
+    brackets=[column.split("_")[-2:] for column in data.columns[3:]]
+    codes=data[exdf.synthpops_region_csv_columns["location_code"].lower()].astype(str).str.lower().tolist()
+    values=data.iloc[:,3:].to_numpy(dtype=object).tolist()
+    output={}
+    for code,row in zip(codes,values):
+        if code in output: # First row of the region is used
+            continue
+        output[code]=[]
+        for num_bins in exdf.population_age_distributions_bins:
+            last=min(num_bins,len(row))-1 # Last bin contains rest of the population
+            distrib=copy.deepcopy(exdf.population_age_distribution_default)
+            distrib["num_bins"]=num_bins
+            distrib["distribution"]=[[int(pre),int(pos),value] for (pre,pos),value in zip(brackets[:last],row[:last])]
+            distrib["distribution"].append([int(brackets[last][0]),100,sum(row[last:])])
+            output[code].append(distrib)
+    return output
+
+
+def parse_rates_by_age(data:pd.DataFrame)->dict:
+    """Column (lowercased location code or region name) -> [[age, rate], ...]
+    """
+    ages=data["age"].to_numpy().astype(int).tolist()
+    return {column:[list(row) for row in zip(ages,data[column].to_numpy().astype(float).tolist())] for column in data.columns if column!="age"}
+
+
+def parse_household_head_age_brackets(data:pd.DataFrame)->list:
+    return table_rows(data,["min_age","max_age"],[int,int])
+
+
+def parse_household_head_age_distribution_by_family_size(data:pd.DataFrame)->list:
+    output=data.to_numpy().astype(float).tolist()
+    for row in output:
+        row[0]=int(row[0])
+    return output
+
+
+def parse_household_size_distribution(data:pd.DataFrame)->list:
+    return table_rows(data,["num","distribution"],[int,float])
+
+
+def parse_school_size_brackets(data:pd.DataFrame)->list:
+    return table_rows(data,["min","max"],[int,int])
+
+
+def parse_school_distribution(data:pd.DataFrame)->list:
+    return data["distribution"].to_numpy().astype(float).tolist()
+
+
+def parse_school_size_distribution(data:pd.DataFrame)->list:
+    return [{"school_type":school_type,"size_distribution":[float(x) for x in size_distribution.split(",")]}
+            for school_type,size_distribution in zip(data["school_type"].tolist(),data["size_distribution"].tolist())]
+
+
+def parse_school_types(data:pd.DataFrame)->list:
+    return [{"school_type":school_type,"age_range":[min_age,max_age]}
+            for school_type,min_age,max_age in zip(data["school_type"].tolist(),data["min_age"].tolist(),data["max_age"].tolist())]
+
+
+def parse_workplace_size_counts(data:pd.DataFrame)->list:
+    return table_rows(data,["min_people","max_people","count"],[int,int,float])
+
 
 class Region:
     def __init__(self,
@@ -61,33 +164,65 @@ class Region:
         self.region_config_output_path=None
         self.pop_creator_pars={}
         self.naming_object={}
+        self.population_store=None
+        self.population_key=None
 
     def create_population_object(self):
+        filename=exut.generate_population_filename(region_name=self.region_name,prefix=self.naming_object["pop_name_prefix"],
+                                                   suffix=self.naming_object["pop_name_suffix"],test=self.test)
+        seed=self.pop_creator_pars.get("rand_seed")
+        # Unseeded population is different in every run, so it is not taken from (nor put to) the store
+        use_store=self.population_store is not None and seed is not None and not pd.isna(seed)
+        if use_store:
+            self.population_key=exps.population_key(self.region_config,self.pop_creator_pars,self.pars,seed=seed)
+            if self.population_store.get(self.population_key):
+                print(f"\nRegion: {self.region_name} ({self.location_code}) population object reused from store ({self.population_key}).",end="")
+                self.save_stored_population(filename=filename)
+                return
         print(f"\nCreating population object for region {self.region_name} ({self.location_code})",end="")
         t=TicToc()
         t.tic()
         pop=sp.Pop(**self.pop_creator_pars)
         t.toc(f"\nRegion: {self.region_name} ({self.location_code}) population object created.")
-        filename=exut.generate_population_filename(region_name=self.region_name,prefix=self.naming_object["pop_name_prefix"],
-                                                   suffix=self.naming_object["pop_name_suffix"],test=self.test)
+        if use_store:
+            try:
+                self.population_store.put(self.population_key,pop,meta={"location_code":self.location_code,"region_name":self.region_name})
+            except Exception as e:
+                print(f"\nPopulation of region {self.region_name} ({self.location_code}) could not be stored: {e}",end="")
         self.save_population_object(pop=pop,filename=filename)
         #saving
 
-    def save_population_object(self,pop:sp.Pop,filename:str):
+    def population_filepath(self,filename:str)->str:
         if self.save_settings:
             filedir=exut.merge_twoPaths(self.save_settings["location"],exdf.save_settings["population_path"])
         elif self.naming_object["pop_creator_dirpath"]:
             filedir = self.naming_object["pop_creator_dirpath"]
         exut.directory_validator(filedir)
-        filepath=exut.merge_twoPaths(filedir,filename)
+        return exut.merge_twoPaths(filedir,filename)
+
+    def save_population_object(self,pop:sp.Pop,filename:str):
+        filepath=self.population_filepath(filename)
         if self.naming_object["pop_output_type"] == "json":
             pop.to_json(f"{filepath}.json")
         elif self.naming_object["pop_output_type"] =="obj":
             pop.save(f"{filepath}.pop")
+        elif self.naming_object["pop_output_type"] =="binary": # Arrays are memory mapped by sp.Pop.load
+            pop.save(f"{filepath}.pop",fmt="binary")
         else:
             print("Location for save was not specified, saving population as default .pop object.")
             pop.save(f"{filepath}.pop")
 
+    def save_stored_population(self,filename:str):
+        """Save population from store to output (stored .pop file is copied, json and binary are exported from loaded population)
+        """
+        if self.naming_object["pop_output_type"] in ["json","binary"]:
+            self.save_population_object(pop=sp.Pop.load(self.population_store.get(self.population_key)),filename=filename)
+        else:
+            self.population_store.copy_to(self.population_key,f"{self.population_filepath(filename)}.pop")
+
+    def set_population_store(self,population_store:exps.PopulationStore):
+        self.population_store=population_store
+
     def add_naming_object(self,naming_object):
         """Naming object is a dictionary with keys and values for naming the population."""
         for key, value in exdf.synthpops_naming_keys_mapped.items():
@@ -108,25 +243,28 @@ class Region:
     def add_datafiles(self,datafiles:list):
         self.data_files=datafiles
 
-    def process_region_creation(self,test:bool=False):
+    def process_region_creation(self,test:bool=False,save:bool=True):
         self.prepare_region_config()
         self.load_synthpops_csv_data()
         self.process_region_config()
-        self.save_region_config()
+        if save:
+            self.save_region_config()
+
+    def region_config_dirpath(self)->str:
+        if self.save_settings:
+            return exut.merge_twoPaths(self.save_settings["location"],exdf.save_settings["population_configurations"])
+        return self.naming_object["pop_creator_dirpath"]
 
-    def save_region_config(self):
+    def save_region_config(self,validate_directory:bool=True):
+        """Save region config as JSON (validate_directory False when the directory is already created, e.g. by RegionConfigCreator)
+        """
         try:
-            if self.save_settings:
-                filedir=exut.merge_twoPaths(self.save_settings["location"],exdf.save_settings["population_configurations"])
-            else:
-                filedir=self.naming_object["pop_creator_dirpath"]
-            exut.directory_validator(filedir)
+            filedir=self.region_config_dirpath()
+            if validate_directory:
+                exut.directory_validator(filedir)
             filepath=exut.merge_twoPaths(filedir,f"{self.region_name}.json")
-            options = jsbeautifier.default_options()
-            options.indent_size = 2
-            pretty_json=jsbeautifier.beautify(json.dumps(self.region_config), options)
             with open(filepath,"w") as f:
-                f.write(pretty_json)
+                f.write(json.dumps(self.region_config,indent=2))
             self.region_config_output_path=filepath
         except:
             print(f"\nNo save settings for region {self.region_name} ({self.location_code}). Cannot save population configurations.",end="")
@@ -148,7 +286,7 @@ class Region:
             self.region_config["parent"]=self.parent_config
 
     def load_synthpops_csv_data(self):
-        """Method for loading csv data and parsing them.
+        """Method for loading csv data and parsing them (each datafile is parsed only once for all regions, see parse_datafile).
         """
         # for key,value in self.csv_data_dict.items():
         for key,filepath in self.data_files.items():
@@ -171,153 +309,54 @@ class Region:
     def load_pop_age_distribution_csv(self):
         """Method for parsing csv age_distribution file.
         """
-        num_of_bins = exdf.population_age_distributions_bins
-        data = exut.load_datafile(self.data_files["population_age_distributions"])
-        data = data.iloc[exut.get_index_by_column_and_value(df=data, column=exdf.synthpops_region_csv_columns["location_code"], value=self.location_code)][3:]
-        output = []
-        for bin in num_of_bins:
-            max = -1
-            distrib = copy.deepcopy(exdf.population_age_distribution_default)
-            distrib["num_bins"] = bin
-            if bin != len(data):
-                max = bin
-            for i, column in enumerate(data.index):
-                if len(column.split("_")) == 3:
-                    _prefix, pre, pos = column.split("_")
-                else:
-                    pre, pos = column.split("_")
-                if max - 1 == i or i == len(data) - 1:
-                    distrib["distribution"].append([int(pre), 100, np.sum(data.iloc[i:])]) # add mean for data
-                    break
-                distrib["distribution"].append([int(pre), int(pos), data.iloc[i]])
-            output.append(distrib)
-        return output
+        distributions=parse_datafile(self.data_files["population_age_distributions"],parse_age_distributions)
+        if self.location_code.lower() not in distributions:
+            raise ValueError(f"There is no age distribution for location code {self.location_code} in {self.data_files['population_age_distributions']}")
+        return copy.deepcopy(distributions[self.location_code.lower()])
 
     ## method for loading csv data and parsing them. Default its int:float pairs
-    def load_employment_rates_by_age(self):
-        csv_data_name="employment_rates_by_age"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-
+    def load_rates_by_age(self,csv_data_name:str):
+        rates=parse_datafile(self.data_files[csv_data_name],parse_rates_by_age)
         region_name= self.region_parent_name.lower()
         location_code=self.location_code.lower()
-
-        if location_code in data.head():
+        if location_code in rates:
             index_name = location_code
-        elif region_name is not None and region_name in data.head():
+        elif region_name is not None and region_name in rates:
             index_name = region_name
         else:
             print(f"Cannot find region in {csv_data_name}. Region name: {region_name}, location code: {location_code}, using Defaults")
             return self.region_config[csv_data_name]
-        output=[]
-        # Convert all columns to lowercase
-        for i,row in data.iterrows():
-            output.append([int(row["age"]),float(row[index_name])])
-        return output
+        return copy.deepcopy(rates[index_name])
 
+    def load_employment_rates_by_age(self):
+        return self.load_rates_by_age("employment_rates_by_age")
 
     def load_enrollment_rates_by_age(self):
-        csv_data_name="enrollment_rates_by_age"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        region_name= self.region_parent_name.lower()
-        location_code=self.location_code.lower()
-        if location_code in data.head():
-            index_name = location_code
-        elif region_name is not None and region_name in data.head():
-            index_name = region_name
-        else:
-            print(f"Cannot find region in {csv_data_name}. Region name: {region_name}, location code: {location_code}, using Defaults")
-            return self.region_config[csv_data_name]
-        output=[]
-        # Convert all columns to lowercase
-        for i,row in data.iterrows():
-            output.append([int(row["age"]),float(row[index_name])])
-        return output
+        return self.load_rates_by_age("enrollment_rates_by_age")
 
     def load_household_head_age_brackets(self):
-        csv_data_name="household_head_age_brackets"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        # Convert all columns to lowercase
-        for i,row in data.iterrows():
-            output.append([int(row["min_age"]),int(row["max_age"])])
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["household_head_age_brackets"],parse_household_head_age_brackets))
 
     def load_household_head_age_distribution_by_family_size(self):
-        csv_data_name="household_head_age_distribution_by_family_size"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        # Convert all columns to lowercase
-        ind=0
-        for i,row in data.iterrows():
-            output.append([float(x) for x in row[:]])
-            output[ind][0]=int(output[ind][0])
-            ind+=1
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["household_head_age_distribution_by_family_size"],parse_household_head_age_distribution_by_family_size))
 
     def load_household_size_distribution(self):
-        csv_data_name="household_size_distribution"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        for i,row in data.iterrows():
-            output.append([int(row["num"]),float(row["distribution"])])
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["household_size_distribution"],parse_household_size_distribution))
 
     def load_school_size_brackets(self):
-        csv_data_name="school_size_brackets"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        for i,row in data.iterrows():
-            output.append([int(row["min"]),int(row["max"])])
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["school_size_brackets"],parse_school_size_brackets))
 
     def load_school_distribution(self):
-        csv_data_name="school_size_distribution"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        for i,row in data.iterrows():
-            output.append(float(row["distribution"]))
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["school_size_distribution"],parse_school_distribution))
 
     def load_school_size_distribution(self):
-        csv_data_name = "school_size_distribution_by_type"
-        data = exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output = []
-        for _, row in data.iterrows():
-            pattern = {
-                "school_type": row["school_type"],
-                "size_distribution": [float(x) for x in row["size_distribution"].split(",")],
-            }
-            output.append(pattern)
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["school_size_distribution_by_type"],parse_school_size_distribution))
 
     def load_school_types(self):
-        csv_data_name="school_types_by_age"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        pattern={"school_type":"","age_range":[]}
-        for i,row in data.iterrows():
-            pattern["school_type"]=row["school_type"]
-            pattern["age_range"]=[row["min_age"],row["max_age"]]
-            output.append(pattern.copy())
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["school_types_by_age"],parse_school_types))
 
     def load_workplace_size_counts(self):
-        csv_data_name="workplace_size_counts_by_num_personnel"
-        data=exut.load_datafile(self.data_files[csv_data_name])
-        data.columns = map(str.lower, data.columns)
-        output=[]
-        for i,row in data.iterrows():
-            output.append([int(row["min_people"]),int(row["max_people"]),float(row["count"])])
-        return output
+        return copy.deepcopy(parse_datafile(self.data_files["workplace_size_counts_by_num_personnel"],parse_workplace_size_counts))
 
     def __str__(self):
         return f"Region: {self.region_name} ({self.location_code})\nParent: {self.region_parent_name}\nNotes: {self.notes}\n"
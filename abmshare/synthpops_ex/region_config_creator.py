@@ -1,6 +1,9 @@
-import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
 
 import abmshare.defaults as exdf
+import abmshare.run_plan as exrp
+import abmshare.synthpops_ex.population_scheduler as expsch
+import abmshare.synthpops_ex.population_store as exps
 import abmshare.synthpops_ex.synthpops_conf_getter as spcg
 import abmshare.utils as exut
 from abmshare.synthpops_ex.region import Region
@@ -13,6 +16,7 @@ class RegionConfigCreator:
                  save_settings:dict=None,
                  test:bool=False,
                  mobility:bool=None,
+                 plan:exrp.RunPlan=None,
                  ):
         """_summary_
 
@@ -21,6 +25,7 @@ class RegionConfigCreator:
             parent_configuration (dict, optional): there can be preloaded configuration with some pars. Can be loaded from main conf
             wait (bool, optional): if wait is true, then its manually needed to call process function
             save_settings (dict, optional): (OPTIONAL) if provided, then its changed output filepath
+            plan (RunPlan, optional): compiled run plan with regions and mobility matrix, compiled from configuration if not given
 
         """
         # Some pars
@@ -36,21 +41,33 @@ class RegionConfigCreator:
         self.regions={}
         # Other parameters
         self.num_of_regions=None
+        self.population_timings={}
         # Creator parameters
         self.multiprocess=self.configuration.get(exdf.confkeys["multiprocess"],False)
         self.mobility=mobility
+        self.plan=plan or exrp.compile_run_plan(synthpops_configuration=self.configuration,mobility=self.mobility)
 
         if exut.get_nested_value_from_dict(dictionary=self.configuration,keys=exdf.synthpops_mobility_confkeys+["value"]) and self.mobility==None or self.mobility==True:
-            self.mobility_dict=exut.prepare_mobility(exut.load_datafile(spcg.get_mobility_filepath(self.configuration)))
+            self.mobility_dict=self.plan.population_mobility_matrix.as_dict()
         else:
             self.mobility_dict=False
+        self.population_store=self.create_population_store()
         # Check and assign/empty configuration structure
         self.empty_configuration=exut.load_config(exut.merge_file_path("synthpops_ex/data/empty_region.json"))
         if not wait:
             self.process()
 
+    def create_population_store(self)->exps.PopulationStore|None:
+        """Population store from configuration (population_store: value, dirpath, max_size_gb), None if it is not used
+        """
+        settings=self.configuration.get(exdf.confkeys["population_store"]) or {}
+        if not settings.get("value"):
+            return None
+        return exps.PopulationStore(**exps.store_settings(settings))
+
     def preparation_region_pop_creator(self):
-        for region in spcg.get_all_regions(self.configuration):
+        for region in self.plan.synthpops_codes:
+            self.regions[region].set_population_store(self.population_store)
             # First add popsize and mobility
             if self.test and isinstance(self.mobility_dict,bool):
                 self.regions[region].add_pop_size(exdf.testsettings["n_size"])
@@ -69,18 +86,17 @@ class RegionConfigCreator:
                     self.regions[region].add_pop_creator_par(key=value,value=key)
 
 
-    def create_population_objects_multiprocess(self,location_key:str):
-        self.regions[location_key].create_population_object()
+    def create_population_scheduler(self)->expsch.PopulationScheduler:
+        """Scheduler of parallel population generation from configuration (population_scheduler: workers, memory_budget_gb)
+        """
+        settings=self.configuration.get(exdf.confkeys["population_scheduler"]) or {}
+        memory_budget_gb=settings.get("memory_budget_gb")
+        return expsch.PopulationScheduler(n_workers=settings.get("workers"),
+                                          memory_budget=int(memory_budget_gb*1024**3) if memory_budget_gb else None)
 
     def create_population_objects(self):
         if self.multiprocess:
-            processes=[]
-            for key in self.regions.keys():
-                p=mp.Process(target=self.create_population_objects_multiprocess,args=(key,))
-                p.start()
-                processes.append(p)
-            for p in processes:
-                p.join()
+            self.population_timings=self.create_population_scheduler().run(self.regions)
         else:
             for key in self.regions.keys():
                 self.regions[key].create_population_object()
@@ -89,7 +105,7 @@ class RegionConfigCreator:
 
     def preparation_region_config(self):
         # Look for csv files, otherwise regions
-        for region in spcg.get_all_regions(self.configuration):
+        for region in self.plan.synthpops_codes:
             self.regions[region]=""
         self.num_of_regions=len(self.regions)
 
@@ -119,7 +135,29 @@ class RegionConfigCreator:
                                      )
             self.regions[key].add_datafiles(datafiles=spcg.get_region_specific_csv_files(config=self.configuration,location_code=creator_data[exdf.synthpops_region_csv_columns["location_code"]][id],mapped_output=True))
             self.regions[key].add_naming_object(naming_object=exut.get_nested_value_from_dict(dictionary=self.configuration,keys=exdf.synthpops_naming_confkeys))
-            self.regions[key].process_region_creation(test=test)
+            self.regions[key].process_region_creation(test=test,save=False)
+        self.save_region_configs()
+
+    def save_region_configs(self):
+        """Save configs of all regions concurrently (directories are created before)
+        """
+        regions=list(self.regions.values())
+        if not regions:
+            return
+        dirpaths={}
+        for region in regions:
+            dirpaths.setdefault(region.region_config_dirpath(),[]).append(region.location_code)
+        for dirpath,codes in dirpaths.items():
+            if not dirpath: # No save settings, reported by save_region_config of each region
+                continue
+            try:
+                exut.directory_validator(dirpath)
+            except FileExistsError: # Created meanwhile by another process
+                pass
+            except OSError as e:
+                raise OSError(f"Directory {dirpath} for region configs of {', '.join(map(str,codes))} could not be created: {e}") from e
+        with ThreadPoolExecutor(max_workers=min(exdf.default_region_config_writers,len(regions))) as executor:
+            list(executor.map(lambda region:region.save_region_config(validate_directory=False),regions))
 
 
 
@@ -1,9 +1,10 @@
+import abmshare.run_plan as exrp
 import abmshare.synthpops_ex.region_config_creator as reg_creator
 import abmshare.utils as exut
 
 
 class SynthpopsExtensionController():
-    def __init__(self,configuration,wait=False,test=False,save_settings:dict=None,mobility:bool=None):
+    def __init__(self,configuration,wait=False,test=False,save_settings:dict=None,mobility:bool=None,plan:exrp.RunPlan=None):
         """Initialize instance of Synthpops extension controller which is responsible for creating populations.
 
         configuration (dict)                    : configuration with informations for run synthpops                                                     
@@ -11,6 +12,7 @@ class SynthpopsExtensionController():
         test (bool)                             : configure test settings by default values
         save_settings(dict)                     : dictionary with specified save_pars for every creates/used files
         override_pop_location (bool)            : if it should override pop location in configuration file
+        plan (RunPlan)                          : compiled run plan, compiled from configuration if not given
         """
         if not isinstance(configuration,dict):
             configuration=exut.load_config(configuration)
@@ -19,10 +21,11 @@ class SynthpopsExtensionController():
         else: self.test=self.configuration.get("test",False)
         self.save_settings=save_settings or {}
         self.mobility=mobility
+        self.plan=plan
         if not wait:
             self.parser()
 
     def parser(self):
         """Core function for parsing synthpops configuration
         """
-        reg_creator.RegionConfigCreator(configuration=self.configuration,save_settings=self.save_settings,test=self.test,mobility=self.mobility)
+        reg_creator.RegionConfigCreator(configuration=self.configuration,save_settings=self.save_settings,test=self.test,mobility=self.mobility,plan=self.plan)
@@ -1,10 +1,13 @@
 import ast
 import copy
+import importlib.util
 import json
 import os
 import pathlib
 import re
 import shutil
+import subprocess
+import sys
 import time
 from datetime import datetime
 from pathlib import Path
@@ -13,6 +16,8 @@ import numpy as np
 import pandas as pd
 import yaml
 
+import abmshare.datafile_cache as dfc
+import abmshare.datafile_sidecar as dfs
 import abmshare.defaults as exdf
 
 
@@ -84,10 +89,29 @@ def trim_spaces(x):
 
 def load_datafile(filepath: str|pd.DataFrame):
     """Method for reading *xlsx or *csv file. Returns pd.dataframe.
+    Files are cached (see abmshare.datafile_cache), returned dataframe shares read-only data with the cache.
+    Parsed files are loaded from binary sidecar if it exists (see abmshare.datafile_sidecar).
     filepath(str)               : path to file 
     """
     if isinstance(filepath, pd.DataFrame):
         return filepath
+    try:
+        return dfc.get_datafile(filepath,load_datafile_uncached)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File {filepath} not found")
+
+
+def load_datafile_uncached(filepath: str):
+    """Load datafile from its binary sidecar, or parse it (and write the sidecar)
+    filepath(str)               : path to file
+    """
+    return dfs.load_with_sidecar(filepath,read_datafile)
+
+
+def read_datafile(filepath: str):
+    """Read *xlsx or *csv file without cache, strip whitespace from columns and string values.
+    filepath(str)               : path to file
+    """
     file, ext = os.path.splitext(filepath)
     try:
         if ext == ".csv":
@@ -238,7 +262,7 @@ def file_validator(filepath):
     """Method for validating if specific file exists. Returns True/False;
     filepath(string)            : path to file
     """
-    if os.path.exists(filepath):
+    if isinstance(filepath,(str,os.PathLike)) and os.path.exists(filepath):
         return True
     return False
 
@@ -796,29 +820,21 @@ def get_index_by_column_and_value(df:pd.DataFrame,column:str,value:str|list):
     Args:
         df (pd.DataFrame): dataframe
         column (str): column name
-        value (str|list): value in column, or values
+        value (str|list): value in column, or values (case-insensitive)
 
     Returns:
-        int: index of row
+        int|slice: position of row (slice for duplicate values in contiguous rows, first position for other duplicates),
+        list of them for list values or None
 
     """
-    temp=df.copy(True)
-    temp[column]=temp[column].str.lower()
-    column=column.lower()
+    index=dfc.get_column_index(df,column) # Cached case-insensitive index of column
     try:
         # If list values are provided
         if isinstance(value,list):
             value=[x.lower() for x in value]
-            output=[]
-            for val in value:
-                try:
-                    output.append(temp.set_index(column).index.get_loc(val))
-                except:
-                    pass
-            return output
+            return [index[val] for val in value if val in index]
         # If str value is provided
-        value=value.lower()
-        return temp.set_index(column).index.get_loc(value)
+        return index[value.lower()]
     except:
         return None
 
@@ -976,3 +992,70 @@ def safe_eval_fraction(fraction_str):
 
     # Convert to numpy float
     return np.float64(result)
+
+def lazy_import(name:str):
+    """Module which is imported on the first access of its attribute (heavy modules like covasim, synthpops are
+    not imported for validation or grid submission)
+
+    Args:
+        name (str): full name of module
+
+    Returns:
+        module: lazily loaded module
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec=importlib.util.find_spec(name)
+    loader=importlib.util.LazyLoader(spec.loader)
+    spec.loader=loader
+    module=importlib.util.module_from_spec(spec)
+    sys.modules[name]=module
+    loader.exec_module(module)
+    parent,_,child=name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent],child,module)
+    return module
+
+def parse_import_times(lines:list)->list:
+    """Parse output of python -X importtime
+
+    Returns:
+        list: list of (module, self time [s], cumulative time [s]) sorted by cumulative time
+
+    """
+    output=[]
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time,cumulative,module=[x.strip() for x in line[len("import time:"):].split("|")]
+        output.append((module,int(self_time)/1e6,int(cumulative)/1e6))
+    return sorted(output,key=lambda x:-x[2])
+
+def profile_imports(argv:list,top:int=None,filepath:str=None)->int:
+    """Run script again with python -X importtime and print import time profile (the slowest imports)
+
+    Args:
+        argv (list): script and its arguments (without profile flag)
+        top (int, optional): number of printed modules. Defaults to exdf.default_import_profile_top.
+        filepath (str, optional): save whole profile as csv. Defaults to None.
+
+    Returns:
+        int: return code of the script
+
+    """
+    top=top or exdf.default_import_profile_top
+    process=subprocess.run([sys.executable,"-X","importtime"]+list(argv),stderr=subprocess.PIPE,text=True)
+    lines=process.stderr.splitlines()
+    for line in lines: # Pass through other messages
+        if not line.startswith("import time:"):
+            print(line,file=sys.stderr)
+    times=parse_import_times(lines)
+    total=sum(x[1] for x in times)
+    print(f"\nImport time profile (total {total:.3f} s, {len(times)} modules):")
+    print(f"{'cumulative [s]':>15}{'self [s]':>10}  module")
+    for module,self_time,cumulative in times[:top]:
+        print(f"{cumulative:>15.3f}{self_time:>10.3f}  {module}")
+    if filepath:
+        pd.DataFrame(times,columns=["module","self","cumulative"]).to_csv(filepath,index=False)
+    return process.returncode
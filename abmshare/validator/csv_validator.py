@@ -1,10 +1,21 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
 import abmshare.defaults as exdf
 import abmshare.utils as exut
+import abmshare.validator.validation_cache as vc
 import abmshare.validator.validator_defaults as vd
-from abmshare.validator.validator_defaults import TypeValidationError
+from abmshare.validator.validator_defaults import TypeValidationError, ValueValidationError
 
+"""
+Validation of datafiles (csv/xlsx) of configurations.
+Columns are checked at once (types, empty values, ranges), files referenced by datafiles are checked in parallel and
+results are cached per content of the datafile, so unchanged inputs are skipped on the next start.
+"""
 
 def validate_simulation_csv(filepath:str,rule:dict,keys:list):
     if exdf.covasim_region_parameters_confkeys in keys:
@@ -25,40 +36,146 @@ def validate_simulation_csv(filepath:str,rule:dict,keys:list):
     else:
         raise Exception("Unknown file. Cannot proceed.")
 
-def validate_csv(df:pd.DataFrame|str,base_keys_dict_with_values:dict,empty_allowed:list=None,check_files:list=None):
-    if isinstance(df,str):
-        filepath=df
-        df=exut.load_datafile(df)
-    param_keys=set(base_keys_dict_with_values.keys())
-    csv_columns=set(df.columns)
-    unmatched_columns=csv_columns- param_keys
+dtype_python_types={"b":bool,"i":int,"u":int,"f":float,"c":complex,"M":pd.Timestamp,"m":pd.Timedelta}
 
-    if unmatched_columns: # if there is some column, which cannot be used
-        print(f"Columns {unmatched_columns} are not defined for use.")
+def expected_types(expected)->tuple:
+    """Allowed types of column as tuple for isinstance (values which are not types, e.g. "random", stand for their type)
+    """
+    expected=expected if isinstance(expected,(list,tuple)) else [expected]
+    return tuple(x if isinstance(x,type) else type(x) for x in expected)
+
+def type_mask(series:pd.Series,expected:tuple)->np.ndarray:
+    """Values of column which are instances of expected types (as python values of iterated column)
+    """
+    kind=series.dtype.kind if isinstance(series.dtype,np.dtype) else None
+    if kind in dtype_python_types: # Homogeneous column, one check for all values
+        return np.full(len(series),issubclass(dtype_python_types[kind],expected))
+    return np.fromiter(map(isinstance,series.tolist(),itertools.repeat(expected)),dtype=bool,count=len(series))
+
+def range_mask(series:pd.Series,value_range:tuple)->np.ndarray:
+    """Values of column which are out of range (low, high), None means unbounded
+    """
+    values=pd.to_numeric(series,errors="coerce").to_numpy(dtype=float)
+    low,high=value_range
+    out=np.zeros(len(values),dtype=bool)
+    if low is not None:
+        out|=values<low
+    if high is not None:
+        out|=values>high
+    return out
 
-    # Skip theese columns, defined by other functions
-    #NOTE: for future processing
-    skip_columns=[]
+def format_values(series:pd.Series,mask:np.ndarray)->str:
+    """Examples of values and their row numbers for error messages
+    """
+    rows=np.flatnonzero(mask)
+    shown=rows[:exdf.default_validation_max_reported_values]
+    values=", ".join(f"{value!r} (row {i})" for i,value in zip(shown,series.iloc[shown].tolist()))
+    return values if len(rows)==len(shown) else f"{values} and {len(rows)-len(shown)} more"
 
+def existing_files(filepaths:list)->dict:
+    """Check existence of files in parallel (files may be on network storage)
+
+    Returns:
+        dict: filepath -> True/False
+    """
+    filepaths=list(dict.fromkeys(filepaths))
+    if len(filepaths)<=1:
+        return {filepath:exut.file_validator(filepath) for filepath in filepaths}
+    with ThreadPoolExecutor(max_workers=min(exdf.default_validation_workers,len(filepaths))) as executor:
+        return dict(zip(filepaths,executor.map(exut.file_validator,filepaths)))
+
+def check_dataframe(df:pd.DataFrame,base_keys_dict_with_values:dict,empty_allowed:list,check_files:list,value_ranges:dict,filepath:str)->tuple:
+    """Column-wise type, NaN and range checks of dataframe
+
+    Returns:
+        tuple: (list of error messages, list of referenced files to check)
+    """
+    messages=[]
+    unmatched_columns=set(df.columns)-set(base_keys_dict_with_values.keys())
+    if unmatched_columns: # if there is some column, which cannot be used
+        messages.append(f"Columns {unmatched_columns} are not defined for use.")
+    files=[]
     for col in df.columns:
-        if col in base_keys_dict_with_values:
-            expected_type = base_keys_dict_with_values[col] if not isinstance(base_keys_dict_with_values[col],list) else tuple(base_keys_dict_with_values[col])
-            for value in df[col]:
-                try:
-                    if col in skip_columns: # Skip theese columns
-                        pass
-                    elif check_files and isinstance(value,expected_type) and col in check_files: # Check for the files, if they are string
-                        if not exut.file_validator(value):
-                            raise FileExistsError(f"File {value} does not exist in configuration file:{filepath}")
-                    elif isinstance(expected_type,list) and type(value) in expected_type and pd.notna(value) or not isinstance(expected_type,list) and isinstance(value,expected_type) and pd.notna(value) or col in empty_allowed and pd.isna(value): # If there is more than one type allowed
-                        pass
-                    else: # If there is a problem
-                        raise TypeValidationError(f"Value {value} in column {col} on the is not of type {expected_type}. This can throw errors later on. Check it in file {filepath}")
-                except Exception as e:
-                    print(f"{e}")
+        if col not in base_keys_dict_with_values:
+            continue
+        series=df[col]
+        expected=expected_types(base_keys_dict_with_values[col])
+        typed=type_mask(series,expected)
+        notna=pd.notna(series).to_numpy()
+        if col in check_files: # Strings are paths to files, checked separately
+            files.extend(value for value in series[typed].tolist() if not str(value).startswith(exdf.population_store_scheme))
+            valid=typed|(~notna&(col in empty_allowed))
+        else:
+            valid=typed&notna|(~notna&(col in empty_allowed))
+        if not valid.all():
+            messages.append(f"{TypeValidationError.__name__}: Values {format_values(series,~valid)} in column {col} are not of type {expected}. This can throw errors later on. Check it in file {filepath}")
+        if col in value_ranges:
+            out=range_mask(series,value_ranges[col])&valid&notna
+            if out.any():
+                messages.append(f"{ValueValidationError.__name__}: Values {format_values(series,out)} in column {col} are out of range {value_ranges[col]}. Check it in file {filepath}")
+    return messages,files
+
+def validate_csv(df:pd.DataFrame|str,base_keys_dict_with_values:dict,empty_allowed:list=None,check_files:list=None,value_ranges:dict=None,use_cache:bool=True)->dict:
+    """Validate types, empty values and ranges of datafile columns, errors are printed (not raised)
+
+    Args:
+        df (pd.DataFrame | str): dataframe or path to datafile
+        base_keys_dict_with_values (dict): column -> allowed type(s)
+        empty_allowed (list, optional): columns which can have empty values. Defaults to None.
+        check_files (list, optional): columns with paths to files, which must exist. Defaults to None.
+        value_ranges (dict, optional): column -> (low, high) allowed range of numeric values. Defaults to None.
+        use_cache (bool, optional): skip validation of unchanged file (see validation_cache). Defaults to True.
+
+    Returns:
+        dict: report of validation (filepath, rows, messages, cached, seconds)
+
+    """
+    start=time.perf_counter()
+    filepath=df if isinstance(df,str) else None
+    empty_allowed=list(empty_allowed or [])
+    check_files=[check_files] if isinstance(check_files,str) else list(check_files or [])
+    value_ranges=value_ranges or {}
+    key=vc.rules_key(base_keys_dict_with_values,empty_allowed,check_files,value_ranges)
+    result=vc.validation_cache.get(filepath,key) if filepath and use_cache else None
+    cached=result is not None
+    if not cached:
+        df=exut.load_datafile(df)
+        messages,files=check_dataframe(df,base_keys_dict_with_values,empty_allowed,check_files,value_ranges,filepath)
+        result={"rows":len(df),"messages":messages,"files":list(dict.fromkeys(files))}
+        if filepath and use_cache:
+            vc.validation_cache.put(filepath,key,result)
+    # Referenced files can disappear without change of the datafile, they are always checked
+    messages=result["messages"]+[f"{FileExistsError.__name__}: File {file} does not exist in configuration file:{filepath}"
+                                 for file,exists in existing_files(result["files"]).items() if not exists]
+    for message in messages:
+        print(message)
+    return {"filepath":filepath,"rows":result["rows"],"messages":messages,"cached":cached,"seconds":time.perf_counter()-start}
+
+def validate_interventions_csv(filepath:str,intervention_dict:dict,use_cache:bool=True)->dict:
+    """Validate rows of interventions datafile by rules of their intervention types, errors are raised
+
+    Args:
+        filepath (str): path to interventions datafile
+        intervention_dict (dict): intervention type -> column -> rules
+        use_cache (bool, optional): skip validation of unchanged file (see validation_cache). Defaults to True.
+
+    Returns:
+        dict: report of validation (filepath, rows, messages, cached, seconds)
+
+    """
+    start=time.perf_counter()
+    key=vc.rules_key(intervention_dict)
+    result=vc.validation_cache.get(filepath,key) if use_cache else None
+    cached=result is not None
+    if not cached:
+        df=exut.load_datafile(filepath)
+        check_interventions(df,intervention_dict)
+        result={"rows":len(df),"messages":[],"files":[]}
+        if use_cache:
+            vc.validation_cache.put(filepath,key,result)
+    return {"filepath":filepath,"rows":result["rows"],"messages":result["messages"],"cached":cached,"seconds":time.perf_counter()-start}
 
-def validate_interventions_csv(filepath:str,intervention_dict:list):
-    df=exut.load_datafile(filepath)
+def check_interventions(df:pd.DataFrame,intervention_dict:dict):
     csv_columns=set(df.columns)
     datetime_columns=["start_day","end_day","num_days"]
     for i,row in df.iterrows():
@@ -7,6 +7,8 @@ def validate_type(value, expected_type, optional=False,filename:str=None,keys:li
             print("There is a problem with an optional value")
         else:
             print(f"Expected {expected_type} but got {type(value)} in file:{filename} on keys:{keys}")
+    elif "min" in expected_type and value<expected_type["min"]:
+        print(f"Expected value at least {expected_type['min']} but got {value} in file:{filename} on keys:{keys}")
 
 
 def validate_end_with(value, expected_endings,filename:str=None,keys:list=None):
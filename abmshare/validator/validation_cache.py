@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import threading
+
+import abmshare.datafile_cache as dfc
+import abmshare.datafile_sidecar as dfs
+import abmshare.defaults as exdf
+
+"""
+Cache of validation results of input datafiles.
+Results are saved per file content hash and validation rules (next to the file, in the sidecar directory), so
+unchanged inputs are not validated again on the next start. Results of the current process are kept in memory too.
+"""
+
+
+def rules_key(*rules)->str:
+    """Hash of validation rules (types are represented by their names, tuples as lists)
+    """
+    text=json.dumps([exdf.default_validation_cache_version,*rules],sort_keys=True,default=lambda x:getattr(x,"__name__",repr(x)))
+    return hashlib.blake2b(text.encode(),digest_size=16).hexdigest()
+
+
+def cache_filepath(filepath:str)->str:
+    dirpath,filename=os.path.split(os.path.abspath(filepath))
+    return os.path.join(dirpath,exdf.default_sidecar_dirname,f"{filename}{exdf.default_validation_cache_suffix}")
+
+
+class ValidationCache:
+    """Validation results keyed by content of the file and rules
+    """
+    def __init__(self):
+        self.entries={} # (datafile key, rules key) -> result
+        self.lock=threading.Lock()
+
+    def read(self,filepath:str)->dict|None:
+        try:
+            with open(cache_filepath(filepath)) as file:
+                data=json.load(file)
+            return data if data.get("version")==exdf.default_validation_cache_version else None
+        except (OSError,ValueError):
+            return None
+
+    def write(self,filepath:str,data:dict):
+        path=cache_filepath(filepath)
+        try:
+            os.makedirs(os.path.dirname(path),exist_ok=True)
+            tmp_path=f"{path}.tmp{os.getpid()}"
+            with open(tmp_path,"w") as file:
+                json.dump(data,file)
+            os.replace(tmp_path,path)
+        except OSError:
+            pass # e.g. read-only input directory
+
+    def get(self,filepath:str,key:str)->dict|None:
+        """Cached result of validation of file by rules with key, None if file changed or was not validated yet
+        """
+        file_key=dfc.datafile_key(filepath)
+        with self.lock:
+            if (file_key,key) in self.entries:
+                return self.entries[(file_key,key)]
+        data=self.read(filepath)
+        if data is None or key not in data["results"] or data["size"]!=file_key[2]:
+            return None
+        if data["mtime_ns"]!=file_key[1]:
+            if dfs.file_hash(filepath)!=data["source_hash"]:
+                return None
+            data["mtime_ns"]=file_key[1] # Same content (e.g. copied or touched file)
+            self.write(filepath,data)
+        with self.lock:
+            self.entries[(file_key,key)]=data["results"][key]
+        return data["results"][key]
+
+    def put(self,filepath:str,key:str,result:dict):
+        file_key=dfc.datafile_key(filepath)
+        data=self.read(filepath)
+        source_hash=data["source_hash"] if data and data["size"]==file_key[2] and data["mtime_ns"]==file_key[1] else dfs.file_hash(filepath)
+        if data is None or data["source_hash"]!=source_hash: # Results of older content are not valid anymore
+            data={"version":exdf.default_validation_cache_version,"source_hash":source_hash,"results":{}}
+        data.update({"size":file_key[2],"mtime_ns":file_key[1]})
+        data["results"][key]=result
+        self.write(filepath,data)
+        with self.lock:
+            self.entries[(file_key,key)]=result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+validation_cache=ValidationCache()
@@ -4,7 +4,21 @@ import abmshare.validator.json_validator as jv
 import abmshare.validator.validator_defaults as vd
 
 
-def process(main_config:str|dict,simulation_config:str|dict=None,synthpops_config:str|dict=None,report_config:str|dict=None):
+def print_report(reports:list):
+    """Print time of validation of each datafile
+    """
+    for report in reports:
+        status="cached" if report["cached"] else "validated"
+        print(f"{report['seconds']:8.3f} s  {status:<10}{len(report['messages']):>4} messages  {report['rows']:>7} rows  {report['filepath']}")
+    print(f"{sum(report['seconds'] for report in reports):8.3f} s  total")
+
+def process(main_config:str|dict,simulation_config:str|dict=None,synthpops_config:str|dict=None,report_config:str|dict=None,use_cache:bool=True)->list:
+    """Validate configurations and their datafiles
+
+    Returns:
+        list: reports of validated datafiles (see csv_validator.validate_csv)
+    """
+    reports=[]
     # First validate configs, then csvs
     jv.validate_json(main_config,vd.share_extension_json_validation)
     if simulation_config:
@@ -14,15 +28,17 @@ def process(main_config:str|dict,simulation_config:str|dict=None,synthpops_confi
         #Validate CSVS
         # Validate simulation_region_pars
         if "region_parameters" in files:
-            cv.validate_csv(files["region_parameters"],base_keys_dict_with_values=vd.simulation_region_csv_cols_with_types,
-                            empty_allowed=vd.simulation_empty_allowed,check_files=vd.simulation_input_files)
+            reports.append(cv.validate_csv(files["region_parameters"],base_keys_dict_with_values=vd.simulation_region_csv_cols_with_types,
+                            empty_allowed=vd.simulation_empty_allowed,check_files=vd.simulation_input_files,
+                            value_ranges=vd.simulation_value_ranges,use_cache=use_cache))
         # Validate simulation global_pars
         if "global_parameters" in files:
-            cv.validate_csv(files["global_parameters"],base_keys_dict_with_values=vd.simulation_region_csv_cols_with_types,
-                            empty_allowed=vd.simulation_empty_allowed,check_files=vd.simulation_input_files)
+            reports.append(cv.validate_csv(files["global_parameters"],base_keys_dict_with_values=vd.simulation_region_csv_cols_with_types,
+                            empty_allowed=vd.simulation_empty_allowed,check_files=vd.simulation_input_files,
+                            value_ranges=vd.simulation_value_ranges,use_cache=use_cache))
         # Validate simulation_interventions
         if "interventions" in files:
-            cv.validate_interventions_csv(files["interventions"],vd.simulation_interventions_csv_cols_with_types)
+            reports.append(cv.validate_interventions_csv(files["interventions"],vd.simulation_interventions_csv_cols_with_types,use_cache=use_cache))
         # Validate simulation variants #TODO:
 
         # Validate simulation Vaccines #TODO:
@@ -32,19 +48,22 @@ def process(main_config:str|dict,simulation_config:str|dict=None,synthpops_confi
         files=exut.get_all_csv_files(synthpops_config,vd.synthpops_data_files,return_dict=True,filenames=vd.synthpops_data_files_names)
         # Validate parameters synthpops data file
         if "pop_creator_file" in files:
-            cv.validate_csv(files["pop_creator_file"],vd.synthpops_region_cols,empty_allowed=vd.synthpops_empty_allowed)
+            reports.append(cv.validate_csv(files["pop_creator_file"],vd.synthpops_region_cols,empty_allowed=vd.synthpops_empty_allowed,use_cache=use_cache))
         if "input_data_global" in files:
-            cv.validate_csv(files["input_data_global"],vd.synthpops_input_files_cols,check_files=vd.synthpops_input_data_files)
+            reports.append(cv.validate_csv(files["input_data_global"],vd.synthpops_input_files_cols,check_files=vd.synthpops_input_data_files,use_cache=use_cache))
         # Validate pop creator pars
         if "parameters" in files:
-            cv.validate_csv(files["parameters"],vd.synthpops_pars_cols,check_files=vd.synthpops_region_config_files,
-                empty_allowed=vd.synthpops_empty_allowed)
+            reports.append(cv.validate_csv(files["parameters"],vd.synthpops_pars_cols,check_files=vd.synthpops_region_config_files,
+                empty_allowed=vd.synthpops_empty_allowed,value_ranges=vd.synthpops_value_ranges,use_cache=use_cache))
         print("Synthetic population config has been validated")
     # if report_config: # Need to fix it
     #     jv.validate_json(report_config,vd.report_json_validation,report_conf=True)
     #     print("Report config has been validated")
     #TODO: Someday combinations of synthpop + covasim
         print("Validation of input files was successful")
+    if reports:
+        print_report(reports)
+    return reports
 
 
 # if __name__=="__main__":
@@ -7,6 +7,9 @@ class ValidationError(Exception):
 class TypeValidationError(ValidationError):
     pass
 
+class ValueValidationError(ValidationError):
+    pass
+
 class MissingKeyError(ValidationError):
     pass
 
@@ -15,6 +18,9 @@ class InvalidCombinationError(ValidationError):
 
 simulation_json_validation={
     "parallel_run": {"type": bool},
+    "parallel_backend": {"type": str, "optional": True},
+    "workers": {"type": int, "optional": True},
+    "rebalance_interval": {"type": int, "optional": True},
     "test":{"type":bool,"optional":True},
     "region_parameters": {"filepath": {"type": str, "allowed": (".csv",".xlsx")}},
     "interventions": {"filepath": {"type": str, "allowed": (".csv",".xlsx"),"optional":True}},
@@ -24,6 +30,20 @@ simulation_json_validation={
         "value": {"type": bool},
         "filepath": {"type": str, "allowed": (".csv",".xlsx"),
         "optional":True},
+        "indexes_filepath": {"type": str, "allowed": (".npz",), "optional":True},
+        "sync_interval": {"type": int, "optional":True, "min":0}, # 0 only with sync_threshold
+        "sync_threshold": {"type": (int,float), "optional":True},
+    },
+    "ensemble": {
+        "value": {"type": bool},
+        "n_runs": {"type": int, "optional":True},
+        "quantile_low": {"type": (int,float), "optional":True},
+        "quantile_high": {"type": (int,float), "optional":True},
+    },
+    "checkpoint": {
+        "value": {"type": bool},
+        "interval": {"type": int, "optional":True},
+        "keep": {"type": int, "optional":True},
     },
     "population_size": {"filepath": {"type": str, "allowed": (".csv",".xlsx")}},
     "global_parameters": {
@@ -38,6 +58,15 @@ simulation_json_validation={
 synthpops_json_validation = {
     "parallel_run": {"type": bool},
     "test": {"type": bool, "optional": True},
+    "population_store": {
+        "value": {"type": bool},
+        "dirpath": {"type": str, "optional": True},
+        "max_size_gb": {"type": (int,float), "optional": True},
+    },
+    "population_scheduler": {
+        "workers": {"type": int, "optional": True},
+        "memory_budget_gb": {"type": (int,float), "optional": True},
+    },
     "pop_creator_settings": {
         "pop_output_naming": {
             "value": {"type": bool},
@@ -197,6 +226,21 @@ simulation_parameters = {
 
 
 simulation_region_csv_cols_with_types= {**simulation_region_cols,**simulation_parameters}
+# Allowed ranges (low, high) of numeric values, None means unbounded
+simulation_value_ranges={
+    "pop_size":(0,None),
+    "pop_infected":(0,None),
+    "n_days":(0,None),
+    "pop_scale":(0,None),
+    "beta":(0,None),
+    "n_imports":(0,None),
+    "asymp_factor":(0,None),
+    "iso_factor":(0,None),
+    "quar_factor":(0,None),
+    "quar_period":(0,None),
+    "n_beds_hosp":(0,None),
+    "n_beds_icu":(0,None),
+}
 simulation_empty_allowed=[
     "popfile",
     "pop_size",
@@ -424,6 +468,18 @@ synthpops_pars_cols={
     "do_make": bool,  # Whether to make the population
 }
 
+synthpops_value_ranges={
+    "n":(0,None),
+    "average_LTCF_degree":(0,None),
+    "average_class_size":(0,None),
+    "inter_grade_mixing":(0,1),
+    "average_student_teacher_ratio":(0,None),
+    "average_teacher_teacher_degree":(0,None),
+    "average_student_all_staff_ratio":(0,None),
+    "average_additional_staff_degree":(0,None),
+    "window_length":(0,None),
+}
+
 synthpops_empty_allowed=[
     #Region pars
     exdf.synthpops_region_csv_columns["parent_dirpath"],
@@ -17,7 +17,7 @@ from . import utils as cvu
 # Specify all externally visible functions this file defines
 __all__ = ["make_people", "make_randpop", "make_random_contacts",
            "make_microstructured_contacts", "make_hybrid_contacts",
-           "make_synthpop"]
+           "make_synthpop", "parse_synthpop_arrays"]
 
 
 def make_people(sim, popdict=None, die=True, reset=False, recreate=False, verbose=None, **kwargs):
@@ -404,7 +404,9 @@ def make_synthpop(sim=None, popdict=None, layer_mapping=None, community_contacts
         if isinstance(popdict, sp.people.People):
             people = popdict
         elif isinstance(popdict, sp.Pop):
-            people = popdict.to_people()
+            people = parse_synthpop_arrays(popdict.arrays, layer_mapping=layer_mapping) # Directly from the arrays, without the dict of people
+        elif isinstance(popdict, dict) and isinstance(popdict.get("contacts"), cvb.Contacts):
+            people = popdict # Already converted, e.g. the output of make_synthpop() from an sp.Pop
         elif isinstance(popdict, dict):
             people = sp.people.make_people(popdict=popdict)
         elif isinstance(popdict, cvb.BasePeople):
@@ -414,11 +416,51 @@ def make_synthpop(sim=None, popdict=None, layer_mapping=None, community_contacts
             raise TypeError(errormsg)
 
     # Convert contacts from SynthPops to Covasim
-    people.contacts = cvb.Contacts(**people.contacts)
+    if not isinstance(people["contacts"], cvb.Contacts):
+        people["contacts"] = cvb.Contacts(**people["contacts"])
 
     # Add community contacts and layer keys
     c_contacts = make_random_contacts(pop_size, community_contacts)
-    people.contacts.add_layer(c=c_contacts)
+    people["contacts"].add_layer(c=c_contacts)
     people["layer_keys"] = list(layer_mapping.values())
 
     return people
+
+
+def parse_synthpop_arrays(arrays, layer_mapping=None):
+    """Convert the arrays of a SynthPops population (sp.Pop.arrays) into a popdict
+    with Covasim layers. The contacts of each layer are stored in SynthPops in
+    both directions; every contact is kept once (p1 < p2) in the order of the
+    SynthPops contacts, the same edges as from the dict of people.
+
+    Args:
+        arrays (sp.PopArrays): people attributes and contacts of a SynthPops population
+        layer_mapping (dict): a mapping from SynthPops layers to Covasim layers
+
+    Returns:
+        popdict (objdict): uid, age, sex, and contacts (Contacts without community contacts)
+    """
+    default_layer_mapping = {"H":"h", "S":"s", "W":"w", "C":"c", "LTCF":"l"}
+    layer_mapping = sc.mergedicts(default_layer_mapping, layer_mapping)
+
+    contacts = cvb.Contacts()
+    for spkey in arrays.layer_keys:
+        try:
+            lkey = layer_mapping[spkey] # Map the SynthPops key into a Covasim layer key
+        except KeyError: # pragma: no cover
+            errormsg = f'Could not find key "{spkey}" in layer mapping "{layer_mapping}"'
+            raise sc.KeyNotFoundError(errormsg)
+        p1, p2 = arrays.edges(spkey)
+        keep = p2 > p1 # Don't add duplicate contacts
+        layer = cvb.Layer(label=lkey)
+        layer["p1"] = p1[keep].astype(cvd.default_int, copy=False) # Already a copy, not copied again
+        layer["p2"] = p2[keep].astype(cvd.default_int, copy=False)
+        layer["beta"] = np.ones(len(layer["p1"]), dtype=cvd.default_float)
+        contacts[lkey] = layer
+
+    popdict = sc.objdict()
+    popdict["uid"]      = np.arange(len(arrays), dtype=np.int64)
+    popdict["age"]      = arrays["age"].astype(np.int64)
+    popdict["sex"]      = arrays["sex"].astype(np.int64)
+    popdict["contacts"] = contacts
+    return popdict
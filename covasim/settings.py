@@ -203,6 +203,9 @@ class Options(sc.objdict):
         optdesc.numba_cache = "Set Numba caching -- saves on compilation time; disabling is not recommended"
         options.numba_cache = bool(int(os.getenv("COVASIM_NUMBA_CACHE", 1)))
 
+        optdesc.numba_lazy = "Compile Numba functions on the first call instead of on import -- makes importing Covasim faster"
+        options.numba_lazy = bool(int(os.getenv("COVASIM_NUMBA_LAZY", 1)))
+
         return optdesc, options
 
 
@@ -280,7 +283,7 @@ class Options(sc.objdict):
             if value in [None, "default"]:
                 value = self.orig_options[key]
             self[key] = value
-            numba_keys = ["precision", "numba_parallel", "numba_cache"] # Specify which keys require a reload
+            numba_keys = ["precision", "numba_parallel", "numba_cache", "numba_lazy"] # Specify which keys require a reload
             if key in numba_keys:
                 reload_required = True
             if key in "backend":
@@ -6,7 +6,9 @@ at the heart of the integration loop.
 
 #%% Housekeeping
 
+import functools  # For wrapping lazily compiled Numba functions
 import random  # Used only for resetting the seed
+import threading  # For compiling lazily compiled Numba functions once under the thread backend
 
 import numba as nb  # For faster computations
 import numpy as np  # For numerics
@@ -32,11 +34,54 @@ if cvo.numba_parallel not in [0, 1, 2, "0", "1", "2", "none", "safe", "full"]:
     errormsg = f'Numba parallel must be "none", "safe", or "full", not "{cvo.numba_parallel}"'
     raise ValueError(errormsg)
 cache = cvo.numba_cache # Turning this off can help switching parallelization options
+lazy = cvo.numba_lazy # Compile Numba functions on the first call instead of on import
+
+
+class LazyDispatcher:
+    """Numba function which is compiled (with the given signature) on the first call instead of on import, so
+    importing Covasim (e.g. only for validation) does not pay for compilation. Attributes of the compiled dispatcher
+    (e.g. py_func, signatures) are accessible directly."""
+
+    def __init__(self, func, signature, kwargs):
+        functools.update_wrapper(self, func)
+        self._signature = signature
+        self._kwargs = kwargs
+        self._dispatcher = None
+        self._lock = threading.Lock()
+
+    def compile(self):
+        if self._dispatcher is None:
+            with self._lock: # Threads calling the function for the first time at once compile it only once
+                if self._dispatcher is None:
+                    self._dispatcher = nb.njit(self._signature, **self._kwargs)(self.__wrapped__)
+        return self._dispatcher
+
+    def __call__(self, *args, **kwargs):
+        return (self._dispatcher or self.compile())(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.compile(), attr)
+
+    def __reduce__(self):
+        return (_get_numba_function, (self.__name__,)) # Pickled by reference, like the compiled dispatcher
+
+
+def _get_numba_function(name):
+    return globals()[name]
+
+
+def njit(signature, **kwargs):
+    """Same as nb.njit(signature, **kwargs), but compilation is deferred to the first call (if cv.options.numba_lazy)"""
+    if not lazy:
+        return nb.njit(signature, **kwargs)
+    return lambda func: LazyDispatcher(func, signature, kwargs)
 
 
 #%% The core Covasim functions -- compute the infections
 
-@nb.njit(             (nbint, nbfloat[:], nbfloat[:],     nbfloat[:], nbfloat,   nbfloat,    nbfloat), cache=cache, parallel=safe_parallel)
+@njit(             (nbint, nbfloat[:], nbfloat[:],     nbfloat[:], nbfloat,   nbfloat,    nbfloat), cache=cache, parallel=safe_parallel)
 def compute_viral_load(t,     time_start, time_recovered, time_dead,  frac_time, load_ratio, high_cap): # pragma: no cover
     """Calculate relative transmissibility for time t. Includes time varying
     viral load, pre/asymptomatic factor, diagnosis factor, etc.
@@ -78,7 +123,7 @@ def compute_viral_load(t,     time_start, time_recovered, time_dead,  frac_time,
     return load
 
 
-@nb.njit(            (nbfloat[:], nbfloat[:], nbbool[:], nbbool[:], nbfloat,    nbfloat[:], nbbool[:], nbbool[:], nbbool[:], nbfloat,      nbfloat,    nbfloat,     nbfloat[:]), cache=cache, parallel=safe_parallel)
+@njit(            (nbfloat[:], nbfloat[:], nbbool[:], nbbool[:], nbfloat,    nbfloat[:], nbbool[:], nbbool[:], nbbool[:], nbfloat,      nbfloat,    nbfloat,     nbfloat[:]), cache=cache, parallel=safe_parallel)
 def compute_trans_sus(rel_trans,  rel_sus,    inf,       sus,       beta_layer, viral_load, symp,      diag,      quar,      asymp_factor, iso_factor, quar_factor, immunity_factors): # pragma: no cover
     """Calculate relative transmissibility and susceptibility"""
     f_asymp   =  symp + ~symp * asymp_factor # Asymptomatic factor, changes e.g. [0,1] with a factor of 0.8 to [0.8,1.0]
@@ -89,7 +134,7 @@ def compute_trans_sus(rel_trans,  rel_sus,    inf,       sus,       beta_layer,
     return rel_trans, rel_sus
 
 
-@nb.njit(             (nbfloat,  nbint[:],  nbint[:], nbfloat[:],   nbfloat[:], nbfloat[:], nbbool), cache=cache, parallel=rand_parallel)
+@njit(             (nbfloat,  nbint[:],  nbint[:], nbfloat[:],   nbfloat[:], nbfloat[:], nbbool), cache=cache, parallel=rand_parallel)
 def compute_infections(beta,     p1,        p2,       layer_betas,  rel_trans,  rel_sus,    legacy=False): # pragma: no cover
     """Compute who infects whom
 
@@ -127,7 +172,7 @@ def compute_infections(beta,     p1,        p2,       layer_betas,  rel_trans,
     return slist, tlist
 
 
-@nb.njit((nbint[:], nbint[:], nb.int64[:]), cache=cache)
+@njit((nbint[:], nbint[:], nb.int64[:]), cache=cache)
 def find_contacts(p1, p2, inds): # pragma: no cover
     """Numba for Layer.find_contacts()
 
@@ -371,7 +416,7 @@ def n_multinomial(probs, n): # No speed gain from Numba
     return np.searchsorted(np.cumsum(probs), np.random.random(n))
 
 
-@nb.njit((nbfloat,), cache=cache, parallel=rand_parallel) # Numba hugely increases performance
+@njit((nbfloat,), cache=cache, parallel=rand_parallel) # Numba hugely increases performance
 def poisson(rate):
     """A Poisson trial.
 
@@ -386,7 +431,7 @@ def poisson(rate):
     return np.random.poisson(rate, 1)[0]
 
 
-@nb.njit((nbfloat, nbint), cache=cache, parallel=rand_parallel) # Numba hugely increases performance
+@njit((nbfloat, nbint), cache=cache, parallel=rand_parallel) # Numba hugely increases performance
 def n_poisson(rate, n):
     """An array of Poisson trials.
 
@@ -423,7 +468,7 @@ def n_neg_binomial(rate, dispersion, n, step=1): # Numba not used due to incompa
     return samples
 
 
-@nb.njit((nbint, nbint), cache=cache) # Numba hugely increases performance
+@njit((nbint, nbint), cache=cache) # Numba hugely increases performance
 def choose(max_n, n):
     """Choose a subset of items (e.g., people) without replacement.
 
@@ -439,7 +484,7 @@ def choose(max_n, n):
     return np.random.choice(max_n, n, replace=False)
 
 
-@nb.njit((nbint, nbint), cache=cache) # Numba hugely increases performance
+@njit((nbint, nbint), cache=cache) # Numba hugely increases performance
 def choose_r(max_n, n):
     """Choose a subset of items (e.g., people), with replacement.
 
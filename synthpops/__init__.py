@@ -7,6 +7,8 @@ from .defaults import *
 from .households import *  # depends on base, sampling, data_distributions
 from .ltcfs import *  # depends on base, sampling, data_distributions, households
 from .plotting import *  # depends on pop et. al (pop and plotting depend on each other but pop simply redirects to methods housed in plotting whereas plotting actually uses more from pop)
+from .pop_arrays import *  # depends on defaults
+from .pop_binary import *  # depends on pop_arrays, version
 from .pop import *  # depends on version, defaults, base, config, sampling, data_distributions, households, ltcfs, schools, workplaces, contact_networks, plotting
 from .sampling import *  # depends on base
 from .schools import *  # depends on defaults, base, sampling, data_distributions
@@ -7,6 +7,7 @@ import pandas as pd
 import sciris as sc
 
 from . import data_distributions as spdata
+from . import pop_arrays as sppa
 from . import schools as spsch
 from .config import checkmem
 from .config import logger as log
@@ -33,7 +34,8 @@ def make_contacts(pop,
                   average_additional_staff_degree=20,
                   school_type_by_age=None,
                   workplaces_by_industry_codes=None,
-                  max_contacts=None):
+                  max_contacts=None,
+                  contact_order="set"):
     """From microstructure objects (dictionary mapping ID to age, lists of lists in different settings, etc.), create a dictionary of individuals.
     Each key is the ID of an individual which maps to a dictionary for that individual with attributes such as their age, household ID (hhid),
     school ID (scid), workplace ID (wpid), workplace industry code (wpindcode) if available, and contacts in different layers.
@@ -60,10 +62,11 @@ def make_contacts(pop,
         school_type_by_age (dict)                         : A dictionary of probabilities for the school type likely for each age.
         workplaces_by_industry_codes (np.ndarray or None) : array with workplace industry code for each workplace
         trimmed_size_dic (dict)                           : If supplied, trim contacts on creation rather than post hoc.
+        contact_order (str)                               : Order of contacts of each person, "set" (as in earlier versions) or "sorted" (by id, faster, but different simulations with the same seed). See sp.ContactBuilder.
 
     Returns:
-        A popdict of people with attributes. Dictionary keys are the IDs of individuals in the population and the values are a dictionary
-        for each individual with their attributes, such as age, household ID (hhid), school ID (scid), workplace ID (wpid), workplace
+        A sp.PopArrays of people with attributes (its to_popdict() gives the popdict: dictionary keys are the IDs of individuals in the population and the values are a dictionary
+        for each individual). Attributes include age, household ID (hhid), school ID (scid), workplace ID (wpid), workplace
         industry code (wpindcode) if available, and the IDs of their contacts in different layers. Different layers available are
         households ('H'), schools ('S'), and workplaces ('W'), and long term care facilities ('LTCF'). Contacts in these layers are clustered and thus form a network composed of
         groups of people interacting with each other. For example, all household members are contacts of each other, and everyone in the
@@ -79,7 +82,6 @@ def make_contacts(pop,
 
     """
     log.debug("make_contacts_from_microstructure_objects()")
-    popdict = {}
 
     grade_age_mapping = {i: i + 5 for i in range(13)}
     age_grade_mapping = {i + 5: i for i in range(13)}
@@ -123,7 +125,6 @@ def make_contacts(pop,
 
     uids = list(age_by_uid.keys())
 
-    popdict = {}
     # also need to return schools as well and not just school contacts
     schools = {}
 
@@ -144,65 +145,34 @@ def make_contacts(pop,
     # TODO: include age-based sex ratios
     sexes = np.random.randint(2, size=len(age_by_uid))
 
-    for u, uid in enumerate(age_by_uid):
-        popdict[uid] = {}
-        popdict[uid]["age"] = int(age_by_uid[uid])
-        popdict[uid]["sex"] = sexes[u]
-        popdict[uid]["loc"] = None
-        popdict[uid]["contacts"] = {}
-        if use_ltcf:
-            popdict[uid]["ltcf_res"] = None
-            popdict[uid]["ltcf_staff"] = None
-        popdict[uid]["hhid"] = None
-        popdict[uid]["scid"] = None
-        popdict[uid]["sc_student"] = None
-        popdict[uid]["sc_teacher"] = None
-        popdict[uid]["sc_staff"] = None
-        popdict[uid]["sc_type"] = None
-        popdict[uid]["sc_mixing_type"] = None
-        popdict[uid]["wpid"] = None
-        popdict[uid]["wpindcode"] = None
-        if use_ltcf:
-            popdict[uid]["ltcfid"] = None
-        for k in layer_keys:
-            popdict[uid]["contacts"][k] = set()
+    population = sppa.PopArrays(len(uids), layer_keys, with_ltcf=use_ltcf)
+    population["age"][uids] = [age_by_uid[uid] for uid in uids]
+    population["sex"][uids] = sexes
+    contacts = sppa.ContactBuilder(len(uids), layer_keys, contact_order=contact_order)
 
     # read in facility residents and staff
     if use_ltcf:
         for nf, facility in enumerate(facilities_by_uid_lists):
             facility_staff = facilities_staff_uid_lists[nf]
 
-            for u in facility:
-                popdict[u]["ltcf_res"] = 1
-                popdict[u]["ltcfid"] = nf
-
-            for u in facility_staff:
-                popdict[u]["ltcf_staff"] = 1
-                popdict[u]["ltcfid"] = nf
+            population.set_value("ltcf_res", facility, True)
+            population.set_value("ltcfid", facility, nf)
+            population.set_value("ltcf_staff", facility_staff, True)
+            population.set_value("ltcfid", facility_staff, nf)
 
             if use_two_group_reduction:
-                popdict = create_reduced_contacts_with_group_types(popdict, facility, facility_staff, "LTCF",
-                                                                   average_degree=average_LTCF_degree,
-                                                                   force_cross_edges=True)
+                contacts = create_reduced_contacts_with_group_types(contacts, facility, facility_staff, "LTCF",
+                                                                    average_degree=average_LTCF_degree,
+                                                                    force_cross_edges=True)
 
             else:
                 log.debug("...LTCFs " + checkmem())
-                for uid in facility:
-                    popdict[uid]["contacts"]["LTCF"] = set(facility)
-                    popdict[uid]["contacts"]["LTCF"] = popdict[uid]["contacts"]["LTCF"].union(set(facility_staff))
-                    popdict[uid]["contacts"]["LTCF"].remove(uid)
-
-                for uid in facility_staff:
-                    popdict[uid]["contacts"]["LTCF"] = set(facility)
-                    popdict[uid]["contacts"]["LTCF"] = popdict[uid]["contacts"]["LTCF"].union(set(facility_staff))
-                    popdict[uid]["contacts"]["LTCF"].remove(uid)
+                contacts.set_group("LTCF", facility, facility_staff)
 
     log.debug("...households " + checkmem())
-    for nh, household in enumerate(homes_by_uids):
-        for uid in household:
-            popdict[uid]["contacts"]["H"] = set(household)
-            popdict[uid]["contacts"]["H"].remove(uid)
-            popdict[uid]["hhid"] = nh
+    for household in homes_by_uids:
+        contacts.set_group("H", household)
+    population.set_groups("hhid", homes_by_uids)
 
     log.debug("...students " + checkmem())
 
@@ -226,20 +196,20 @@ def make_contacts(pop,
             min_age = min(student_ages)
             this_school_type = school_type_by_age[min_age]
             this_school_mixing_type = school_mixing_type_dic[this_school_type]
-            popdict, student_groups, teacher_groups = spsch.add_school_edges(popdict, students, student_ages,
-                                                                             teachers, non_teaching_staff, age_by_uid,
-                                                                             grade_age_mapping, age_grade_mapping,
-                                                                             average_class_size_by_mixing_type[this_school_mixing_type],
-                                                                             inter_grade_mixing,
-                                                                             average_student_teacher_ratio,
-                                                                             average_teacher_teacher_degree,
-                                                                             average_additional_staff_degree,
-                                                                             this_school_mixing_type)
+            contacts, student_groups, teacher_groups = spsch.add_school_edges(contacts, students, student_ages,
+                                                                              teachers, non_teaching_staff, age_by_uid,
+                                                                              grade_age_mapping, age_grade_mapping,
+                                                                              average_class_size_by_mixing_type[this_school_mixing_type],
+                                                                              inter_grade_mixing,
+                                                                              average_student_teacher_ratio,
+                                                                              average_teacher_teacher_degree,
+                                                                              average_additional_staff_degree,
+                                                                              this_school_mixing_type)
 
         else:
             school = students.copy() + teachers.copy() + non_teaching_staff.copy()
             school_edges = spsch.generate_random_contacts_across_school(school, average_class_size)
-            popdict = spsch.add_contacts_from_edgelist(popdict, school_edges, "S")
+            contacts = spsch.add_contacts_from_edgelist(contacts, school_edges, "S")
             student_groups = [students]
             teacher_groups = [teachers]
 
@@ -248,23 +218,11 @@ def make_contacts(pop,
         schools[ns]["student_groups"] = student_groups
         schools[ns]["teacher_groups"] = teacher_groups
 
-        for uid in students:
-            popdict[uid]["scid"] = ns
-            popdict[uid]["sc_student"] = 1
-            popdict[uid]["sc_type"] = this_school_type
-            popdict[uid]["sc_mixing_type"] = this_school_mixing_type
-
-        for uid in teachers:
-            popdict[uid]["scid"] = ns
-            popdict[uid]["sc_teacher"] = 1
-            popdict[uid]["sc_type"] = this_school_type
-            popdict[uid]["sc_mixing_type"] = this_school_mixing_type
-
-        for uid in non_teaching_staff:
-            popdict[uid]["scid"] = ns
-            popdict[uid]["sc_staff"] = 1
-            popdict[uid]["sc_type"] = this_school_type
-            popdict[uid]["sc_mixing_type"] = this_school_mixing_type
+        for members, role in [(students, "sc_student"), (teachers, "sc_teacher"), (non_teaching_staff, "sc_staff")]:
+            population.set_value("scid", members, ns)
+            population.set_value(role, members, True)
+            population.set_value("sc_type", members, this_school_type)
+            population.set_value("sc_mixing_type", members, this_school_mixing_type)
 
     pop.schools_in_groups = schools
 
@@ -276,27 +234,23 @@ def make_contacts(pop,
             uids = np.array(workplace)
 
             G = random_graph_model(uids, average_degree)  # undirected graph
-            for u, uid in enumerate(workplace):
-                v = list(G.neighbors(u))
-
-                popdict[uid]["contacts"]["W"] = set(uids[v])
-                popdict[uid]["contacts"]["W"].discard(uid)  # this shouldn't be needed
-                popdict[uid]["wpid"] = nw
-                if workplaces_by_industry_codes is not None: # pragma: no cover
-                    popdict[uid]["wpindcode"] = int(workplaces_by_industry_codes[nw])
+            contacts.set_neighbors("W", uids, [list(G.neighbors(u)) for u in range(len(uids))])
 
     else: # pragma: no cover
-        for nw, workplace in enumerate(workplace_by_uid_lists):
+        for workplace in workplace_by_uid_lists:
+            contacts.set_group("W", workplace)
+
+    population.set_groups("wpid", workplace_by_uid_lists)
+    if workplaces_by_industry_codes is not None: # pragma: no cover
+        members, group_index = sppa.group_members(workplace_by_uid_lists)
+        population["wpindcode"][members] = np.asarray(workplaces_by_industry_codes, dtype=int)[group_index]
 
-            for uid in workplace:
-                popdict[uid]["contacts"]["W"] = set(workplace)
-                popdict[uid]["contacts"]["W"].remove(uid)
-                popdict[uid]["wpid"] = nw
-                if workplaces_by_industry_codes is not None:
-                    popdict[uid]["wpindcode"] = int(workplaces_by_industry_codes[nw])
+    log.debug("...contacts " + checkmem())
+    for layer in layer_keys:
+        population.set_contacts(layer, *contacts.build(layer))
 
     log.debug("...done " + checkmem())
-    return popdict
+    return population
 
 
 def create_reduced_contacts_with_group_types(popdict, group_1, group_2, setting, average_degree=20, p_matrix=None, force_cross_edges=True):
@@ -306,6 +260,7 @@ def create_reduced_contacts_with_group_types(popdict, group_1, group_2, setting,
     This means not everyone in group 2 will have a contact with group 1.
 
     Args:
+        popdict (dict)            : dictionary of people or sp.ContactBuilder
         group_1 (list)            : list of ids for group 1
         group_2 (list)            : list of ids for group 2
         average_degree (int)      : average degree across group 1 and 2
@@ -338,8 +293,9 @@ def create_reduced_contacts_with_group_types(popdict, group_1, group_2, setting,
     group = r1 + r2
     sizes = [len(r1), len(r2)]
 
-    for i in popdict:
-        popdict[i]["contacts"].setdefault(setting, set())
+    if not isinstance(popdict, sppa.ContactBuilder):
+        for i in popdict:
+            popdict[i]["contacts"].setdefault(setting, set())
 
     # group is less than the average degree, so return a fully connected graph instead
     if len(group) <= average_degree:
@@ -408,6 +364,10 @@ def create_reduced_contacts_with_group_types(popdict, group_1, group_2, setting,
                         G.remove_edge(random_group_2_j, random_group_2_neighbor_cut)
 
     E = G.edges()
+    if isinstance(popdict, sppa.ContactBuilder):
+        popdict.add_edgelist(setting, [(group[i], group[j]) for i, j in E])
+        return popdict
+
     for e in E:
         i, j = e
 
@@ -553,6 +513,9 @@ def count_layer_degree(pop, layer="H", ages=None, uids=None, uids_included=None)
 
     layerid_mapping = {"H": "hhid", "LTCF": "ltcfid", "S": "scid", "W": "wpid"}
 
+    if getattr(pop, "arrays", None) is not None:
+        return pop.arrays.layer_degree(layer, layerid_mapping[layer], uids_included, pop.age_by_uid)
+
     degree_dicts = []
 
     for i in uids_included:
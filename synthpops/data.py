@@ -1,5 +1,6 @@
 import json
 import os
+import types
 import warnings
 
 import jsbeautifier
@@ -161,6 +162,62 @@ class Location(JsonObject):
         return dist
 
 
+def freeze_location_value(value):
+    """Read-only version of a value from location data: lists are converted to
+    tuples, dictionaries to mapping proxies and json objects to read-only views.
+    """
+    if isinstance(value, JsonObject):
+        return LocationView(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_location_value(v) for v in value)
+    if isinstance(value, dict):
+        return types.MappingProxyType({k: freeze_location_value(v) for k, v in value.items()})
+    return value
+
+
+class LocationView:
+    """Read-only view of a location json object (e.g. of a cached Location).
+    Attributes are read from the location object and frozen on the first
+    access, they cannot be set.
+    """
+
+    def __init__(self, location):
+        object.__setattr__(self, "_location", location)
+        object.__setattr__(self, "_frozen", {})
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        frozen = self.__dict__["_frozen"]
+        if name not in frozen:
+            value = getattr(self.__dict__["_location"], name)
+            if callable(value):
+                method = value
+                value = lambda *args, **kwargs: freeze_location_value(method(*args, **kwargs))  # results of methods are frozen too
+            else:
+                value = freeze_location_value(value)
+            frozen[name] = value
+        return frozen[name]
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Location data are read-only, cannot set {name}.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Location data are read-only, cannot delete {name}.")
+
+    def __getitem__(self, key):
+        return freeze_location_value(self.__dict__["_location"][key])
+
+    def __contains__(self, key):
+        return key in self.__dict__["_location"]
+
+    def __iter__(self):
+        return iter(self.__dict__["_location"])
+
+    def __repr__(self):
+        return f"LocationView({self.__dict__['_location'].location_name})"
+
+
 def populate_parent_data_from_file_path(location, parent_file_path):
     """Loading a location json object with necessary data fields filled from the
     parent location using the parent location file path.
@@ -317,6 +374,24 @@ def get_location_attr(location, property_name):
     return [False, None]
 
 
+def resolve_location_filepath(rel_filepath, different_location=None):
+    """Path of the location data file relative to defaults.settings.datadir
+    (or to different_location, if provided).
+
+    Args:
+        rel_filepath (str): relative file path for the location data
+        different_location (str): if there is a another location for loading datafiles
+
+    Returns:
+        str: The path of the location data file.
+
+    """
+    # For share-extension save settings or for different configuration source folder
+    if different_location:
+        return os.path.join(different_location, rel_filepath)
+    return os.path.join(get_relative_path(defaults.settings.datadir), rel_filepath)
+
+
 def load_location_from_filepath(rel_filepath, check_constraints=None, different_location=None):
     """Loads location data object from provided relative filepath where the file path is
     relative to defaults.settings.datadir.
@@ -332,11 +407,7 @@ def load_location_from_filepath(rel_filepath, check_constraints=None, different_
     if check_constraints is None:
         check_constraints = True
 
-    # For share-extension save settings or for different configuration source folder
-    if different_location:
-        filepath = os.path.join(different_location, rel_filepath)
-    else:
-        filepath = os.path.join(get_relative_path(defaults.settings.datadir), rel_filepath)
+    filepath = resolve_location_filepath(rel_filepath, different_location=different_location)
     logger.debug(f"Opening location from filepath [{filepath}]")
     f = open(filepath, "r")
     json_obj = json.load(f)
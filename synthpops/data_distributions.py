@@ -1,7 +1,9 @@
 """Read in data distributions.
 """
 
+import json
 import os
+import threading
 
 import numpy as np
 import pandas as pd
@@ -117,6 +119,66 @@ def calculate_location_filepath(location, state_location, country_location):
     return filepath
 
 
+location_cache = {}  # absolute path -> (modification stamps of files the location was loaded from, read-only location)
+location_cache_lock = threading.Lock()
+
+
+def file_stamp(filepath):
+    """Modification time and size of a file, None if it does not exist."""
+    try:
+        stat = os.stat(filepath)
+    except (OSError, TypeError):
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def location_parent_filepaths(location):
+    """Paths of the files of the parents of location data (parent, its parent, ...)."""
+    filepaths = []
+    parent = location.parent
+    while isinstance(parent, str) and len(parent) and len(filepaths) < 100:
+        filepath = data.resolve_location_filepath(parent)
+        filepaths.append(filepath)
+        try:
+            with open(filepath, "r") as f:
+                parent = json.load(f).get("parent")
+        except (OSError, ValueError, AttributeError):
+            break
+    return filepaths
+
+
+def load_cached_location(filepath):
+    """Load location data from a file. The file (with the data of its parents)
+    is parsed and checked only once, later calls get the same read-only
+    location while neither the file nor the files of its parents change.
+
+    Args:
+        filepath (str) : path to the location data file
+
+    Returns:
+        data.LocationView: Read-only location data.
+
+    """
+    key = os.path.abspath(filepath)
+    with location_cache_lock:
+        entry = location_cache.get(key)
+    if entry is not None and all(file_stamp(path) == stamp for path, stamp in entry[0]):
+        return entry[1]
+    stamp = file_stamp(key)  # before parsing, a change during parsing loads the file again next time
+    location = data.load_configuration_from_filepath(key)
+    stamps = [(key, stamp)] + [(path, file_stamp(path)) for path in location_parent_filepaths(location)]
+    view = data.LocationView(location)
+    with location_cache_lock:
+        location_cache[key] = (stamps, view)
+    return view
+
+
+def clear_location_cache():
+    """Remove all location data loaded by load_cached_location()."""
+    with location_cache_lock:
+        location_cache.clear()
+
+
 def load_location(specific_location:str=None, state_location:str=None, country_location:str=None, revert_to_default=None,different_location=None,region_config:str=None,parent_config:str=None):
     """Loading json object for the location data.
 
@@ -127,18 +189,19 @@ def load_location(specific_location:str=None, state_location:str=None, country_l
         revert_to_default (bool)   : If True, try to first find location specific data to return otherwise use default data specified by the default location
         different_location (str)   : Location for region/ state configuration files
         region_config (str)      : Filepath to configuration file
+        parent_config (str)      : Filepath to parent configuration file, used if region configuration cannot be loaded
     Returns:
-        str: A filename for where the location data reside.
+        data.LocationView: Read-only location data (cached, see load_cached_location()).
 
     """
     if region_config:
         try:
-            location_object=data.load_configuration_from_filepath(region_config)
+            location_object=load_cached_location(region_config)
             logger.debug(f"Loaded configuration from {region_config}")
             return location_object
         except:
             try:
-                location_object=data.load_configuration_from_filepath(parent_config)
+                location_object=load_cached_location(parent_config)
                 return location_object
             except:
                 logger.debug(f"Cannot load configuration from {region_config}")
@@ -149,14 +212,14 @@ def load_location(specific_location:str=None, state_location:str=None, country_l
     if defaults.settings.config_dirpath:
         different_location = str(defaults.settings.config_dirpath)
     try:
-        location_object = data.load_location_from_filepath(location_filepath,different_location=different_location)
+        location_object = load_cached_location(data.resolve_location_filepath(location_filepath, different_location=different_location))
         logger.debug(f"Loaded (location, state_location, country_location) = "
                      f"({specific_location}, {state_location}, {country_location}) "
                      f"from [{location_filepath}]")
         return location_object
     except:
         try:
-            location_object = data.load_location_from_filepath(location_filepath)
+            location_object = load_cached_location(data.resolve_location_filepath(location_filepath))
             logger.debug(f"Loaded (location, state_location, country_location) = "
                         f"({specific_location}, {state_location}, {country_location}) "
                         f"from [{location_filepath}]")
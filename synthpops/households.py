@@ -686,21 +686,31 @@ def get_household_head_ages_by_size(pop):
         household head age brackets.
 
     """
-    popdict = pop.popdict
     loc_pars = sc.dcp(pop.loc_pars)
     # loc_pars.location = None
     hha_brackets = spdata.get_head_age_brackets(**loc_pars)  # temporarily location should be None until data json work will automatically search up when data are not available
 
     # hha_index use age as key and bracket index as value
     hha_index = spb.get_index_by_brackets(hha_brackets)
-    uids = get_household_heads(popdict=popdict)
     d = {}
-    # construct tables for each houldhold head
-    for uid in uids.values():
-        d[popdict[uid]["hhid"]] = {"hhid": popdict[uid]["hhid"],
-                                   "age": popdict[uid]["age"],
-                                   "family_size": len(popdict[uid]["contacts"]["H"]) + 1,
-                                   "hh_age_bracket": hha_index[popdict[uid]["age"]]}
+    if getattr(pop, "arrays", None) is not None:
+        uids = pop.arrays.household_heads()
+        ages, family_sizes = pop.arrays["age"], pop.arrays.degree("H") + 1
+        # construct tables for each houldhold head
+        for hhid, uid in uids.items():
+            d[hhid] = {"hhid": hhid,
+                       "age": int(ages[uid]),
+                       "family_size": int(family_sizes[uid]),
+                       "hh_age_bracket": hha_index[int(ages[uid])]}
+    else:
+        popdict = pop.popdict
+        uids = get_household_heads(popdict=popdict)
+        # construct tables for each houldhold head
+        for uid in uids.values():
+            d[popdict[uid]["hhid"]] = {"hhid": popdict[uid]["hhid"],
+                                       "age": popdict[uid]["age"],
+                                       "family_size": len(popdict[uid]["contacts"]["H"]) + 1,
+                                       "hh_age_bracket": hha_index[popdict[uid]["age"]]}
     df_household_age = pd.DataFrame.from_dict(d, orient="index")
 
     # aggregate by age_bracket (column) and family_size (row)
@@ -15,6 +15,8 @@ from . import households as sphh
 from . import ltcfs as spltcf
 from . import people as spp
 from . import plotting as sppl
+from . import pop_arrays as sppa
+from . import pop_binary as sppb
 from . import sampling as spsamp
 from . import schools as spsch
 from . import workplaces as spw
@@ -62,6 +64,7 @@ class Pop(sc.prettyobj):
                  location_code=None,
                  region_config_path=None,
                  parent_config_path=None,
+                 contact_order="set",
                  ):
         """Make a full population network including both people (ages, sexes) and
         contacts. By default uses Seattle, Washington data. Note about the
@@ -115,6 +118,7 @@ class Pop(sc.prettyobj):
             location_code (string)                  : location code for the location
             region_config_path (string)         : location of the region config file (has priority over country location, state_location, location)
             parent_config_path (string)         : location of the parent config file (has priority over region_config_path, country location, state_location, location)
+            contact_order (string)              : order of contacts of each person, "set" (same as earlier versions) or "sorted" (by id, faster generation, but simulations with the same seed differ from populations with "set" order)
 
         Returns:
             network (dict): A dictionary of the full population with ages, connections, and other attributes.
@@ -149,6 +153,7 @@ class Pop(sc.prettyobj):
         self.location_code    = location_code #Only for holding this info
         self.region_config_path = region_config_path
         self.parent_config_path = parent_config_path
+        self.contact_order      = contact_order
 
         # Age distribution parameters
         self.smooth_ages                                 = smooth_ages
@@ -238,7 +243,7 @@ class Pop(sc.prettyobj):
         log.debug("Generating a new population...")
         population = self.generate()
 
-        self.popdict = population
+        self.arrays = population
         log.debug("Pop(): done.")
 
         # Add summaries post hoc  --- TBD: summaries during generation
@@ -272,6 +277,7 @@ class Pop(sc.prettyobj):
         n                               = self.n
         sheet_name                      = self.sheet_name
         max_contacts                    = self.max_contacts
+        contact_order                   = self.contact_order
         use_default                     = self.use_default
         loc_pars                        = self.loc_pars
         # Added above
@@ -501,12 +507,8 @@ class Pop(sc.prettyobj):
                                          average_student_all_staff_ratio=average_student_all_staff_ratio,
                                          average_additional_staff_degree=average_additional_staff_degree,
                                          school_type_by_age=school_type_by_age,
-                                         max_contacts=max_contacts)
-
-        # Change types
-        for key, person in population.items():
-            for layerkey in population[key]["contacts"].keys():
-                population[key]["contacts"][layerkey] = list(population[key]["contacts"][layerkey])
+                                         max_contacts=max_contacts,
+                                         contact_order=contact_order)
 
         school_mixing_types = [self.schools_in_groups[ns]["school_mixing_type"] for ns in range(len(self.schools_in_groups))]
 
@@ -566,6 +568,48 @@ class Pop(sc.prettyobj):
         """Pop key from self."""
         self.__dict__.pop(key, None)  # pop checks if the key exists as an attribute and removes it in that case. Returns a default value of None if the key does not exist
 
+    @property
+    def popdict(self):
+        """Dictionary of people, created from the population arrays (self.arrays) on the first access."""
+        if self.__dict__.get("_popdict") is None:
+            self._popdict = self.arrays.to_popdict()
+        return self._popdict
+
+    @popdict.setter
+    def popdict(self, popdict):
+        self.arrays = sppa.PopArrays.from_popdict(popdict)
+        self._popdict = popdict
+
+    def clear_popdict(self):
+        """Release the dictionary of people (it is created again from the arrays on demand)."""
+        self._popdict = None
+
+    def __getattr__(self, name):
+        # Attributes of a population loaded from a binary file (except its arrays) are unpickled on the first use
+        load_rest = self.__dict__.get("_load_rest")
+        if load_rest is None or name.startswith("__"):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        self.load_rest()
+        return getattr(self, name)
+
+    def load_rest(self):
+        """Load attributes of a population loaded from a binary file which were not loaded yet."""
+        load_rest = self.__dict__.pop("_load_rest", None)
+        if load_rest is not None:
+            self.__dict__.update({key: value for key, value in load_rest().items() if key not in self.__dict__})
+
+    def __getstate__(self):
+        self.load_rest()
+        state = self.__dict__.copy()
+        state.pop("_popdict", None)  # the arrays are saved instead
+        return state
+
+    def __setstate__(self, state):
+        popdict = state.pop("popdict", None)
+        self.__dict__.update(state)
+        if popdict is not None:  # population saved before the arrays were introduced
+            self.popdict = popdict
+
     def to_dict(self):
         """Export to a dictionary -- official way to get the popdict.
 
@@ -573,7 +617,9 @@ class Pop(sc.prettyobj):
 
             popdict = pop.to_dict()
         """
-        return sc.dcp(self.popdict)
+        if self.__dict__.get("_popdict") is None:
+            return self.arrays.to_popdict()
+        return sc.dcp(self._popdict)
 
     def to_json(self, filename, indent=2, **kwargs):
         """Export to a JSON file.
@@ -584,22 +630,33 @@ class Pop(sc.prettyobj):
         """
         return sc.savejson(filename, self.popdict, indent=indent, **kwargs)
 
-    def save(self, filename, **kwargs):
-        """Save population to an binary, gzipped object file.
+    def save(self, filename, fmt="obj", **kwargs):
+        """Save population to an binary, gzipped object file, or to a binary
+        population file (arrays memory mapped by load, see sp.pop_binary).
+
+        Args:
+            filename (str) : the name or path of the file to save to
+            fmt (str)      : "obj" for gzipped object file, "binary" for binary population file
+            kwargs         : passed to sc.saveobj()
 
         **Example**::
 
             pop.save('my-pop.pop')
+            pop.save('my-pop.pop', fmt='binary')
         """
+        if fmt == "binary":
+            return sppb.save_binary_population(self, filename)
         return sc.saveobj(filename, self, **kwargs)
 
     @staticmethod
     def load(filename:str|None, reference_size:int=None, *args, **kwargs):
-        """Load from disk from a gzipped pickle.
+        """Load from disk from a gzipped pickle or a binary population file
+        (its arrays are memory mapped, other attributes are loaded on first use).
 
         Args:
             filename (str): the name or path of the file to load from
-            kwargs: passed to sc.loadobj()
+            reference_size (int): expected size of population, None if population of any size is loaded
+            kwargs: passed to sc.loadobj() or sp.load_binary_population()
 
         **Example**::
 
@@ -608,7 +665,12 @@ class Pop(sc.prettyobj):
         """
         if filename is None or type(filename) != str:
             return None
-        pop = sc.loadobj(filename, *args, **kwargs)
+        if sppb.is_binary_population(filename):
+            state, load_rest = sppb.load_binary_population(filename, *args, **kwargs)
+            pop = Pop.__new__(Pop)
+            pop.__dict__.update(state, _load_rest=load_rest)
+        else:
+            pop = sc.loadobj(filename, *args, **kwargs)
         if not isinstance(pop, Pop):
             errormsg = f"Cannot load object of {type(pop)} as a Pop object"
             raise TypeError(errormsg)
@@ -939,9 +1001,8 @@ class Pop(sc.prettyobj):
             dict: Dictionary of the age count of the generated population.
 
         """
-        return spb.count_ages(self.popdict)
+        return self.arrays.count_ages(defaults.settings.max_age)
 
-    # convert to work on array
     def get_household_sizes(self):
         """Create household sizes in the generated population post generation.
 
@@ -949,9 +1010,8 @@ class Pop(sc.prettyobj):
             dict: Dictionary of household size by household id (hhid).
 
         """
-        return sphh.get_household_sizes(self.popdict)
+        return self.arrays.group_sizes("hhid")
 
-    # convert to work on array
     def count_household_sizes(self):
         """Count of household sizes in the generated population.
 
@@ -961,14 +1021,14 @@ class Pop(sc.prettyobj):
         """
         return spb.count_values(self.information.household_sizes)
 
-    # convert to work on array
     def get_household_heads(self):
         """Get the ids of the head of households in the generated population post generation."""
-        return sphh.get_household_heads(self.popdict)
+        return self.arrays.household_heads()
 
     def get_household_head_ages(self):
         """Get the age of the head of each household in the generated population post generation."""
-        return {hhid: self.popdict[head_id]["age"] for hhid, head_id in self.information.household_heads.items()}
+        ages = self.arrays["age"]
+        return {hhid: int(ages[head_id]) for hhid, head_id in self.information.household_heads.items()}
 
     def count_household_head_ages(self, bins=None):
         """Count of household head ages in the generated population.
@@ -998,7 +1058,6 @@ class Pop(sc.prettyobj):
         """
         return sphh.get_household_head_ages_by_size(self)
 
-    # convert to work on array
     def get_ltcf_sizes(self, keys_to_exclude=[]):
         """Create long term care facility sizes in the generated population post generation.
 
@@ -1016,9 +1075,8 @@ class Pop(sc.prettyobj):
             be counted.
 
         """
-        return spltcf.get_ltcf_sizes(self.popdict, keys_to_exclude)
+        return self.arrays.ltcf_sizes(keys_to_exclude)
 
-    # convert to work on array
     def count_ltcf_sizes(self, keys_to_exclude=[]):
         """Count of long term care facility sizes in the generated population.
 
@@ -1045,7 +1103,7 @@ class Pop(sc.prettyobj):
             dict: Dictionary of the count of enrolled students by age in the generated population.
 
         """
-        return spsch.count_enrollment_by_age(self.popdict)
+        return self.arrays.count_enrollment_by_age(defaults.settings.max_age)
 
     @property
     def enrollment_rates_by_age(self):
@@ -1064,7 +1122,7 @@ class Pop(sc.prettyobj):
             list: List of generated enrollment sizes by school type.
 
         """
-        enrollment_by_school_type = spsch.count_enrollment_by_school_type(self.popdict, *args, **kwargs)
+        enrollment_by_school_type = self.arrays.count_enrollment_by_school_type(*args, **kwargs)
         return enrollment_by_school_type
 
     def count_employment_by_age(self):
@@ -1074,7 +1132,7 @@ class Pop(sc.prettyobj):
             dict: Dictionary of the count of employed workers by age in the generated population.
 
         """
-        return spw.count_employment_by_age(self.popdict)
+        return self.arrays.count_employment_by_age(defaults.settings.max_age)
 
     @property
     def employment_rates_by_age(self):
@@ -1086,7 +1144,6 @@ class Pop(sc.prettyobj):
         """
         return {k: self.information.employment_by_age[k]/self.information.age_count[k] if self.information.age_count[k] > 0 else 0 for k in range(defaults.settings.max_age)}
 
-    # convert to work on array
     def get_workplace_sizes(self):
         """Create workplace sizes in the generated population post generation.
 
@@ -1094,9 +1151,8 @@ class Pop(sc.prettyobj):
             dict: Dictionary of workplace size by workplace id (wpid).
 
         """
-        return spw.get_workplace_sizes(self.popdict)
+        return self.arrays.group_sizes("wpid")
 
-    # convert to work on array
     def count_workplace_sizes(self):
         """Count of workplace sizes in the generated population.
 
@@ -1113,13 +1169,15 @@ class Pop(sc.prettyobj):
             dict: Dictionary of the count of contacts in the layer for the
             different people types in the layer. See
             sp.contact_networks.get_contact_counts_by_layer() for method details.
+            Counted on the arrays, the popdict is not created.
 
         """
-        return spcnx.get_contact_counts_by_layer(self.popdict, layer, **kwargs)
+        return self.arrays.contact_counts_by_layer(layer, **kwargs)
 
     def to_people(self):
         """Convert to the alternative People representation of a population"""
         ppl = spp.make_people(popdict=self.popdict, rand_seed=self.rand_seed)  # Create the corresponding population
+        self.clear_popdict()  # the dictionary was consumed by the conversion
         return ppl
 
     def plot_people(self, *args, **kwargs):
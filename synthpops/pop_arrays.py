@@ -0,0 +1,557 @@
+"""This module provides the struct-of-arrays representation of a population:
+NumPy columns of person attributes and contacts of each layer in compressed
+sparse row (CSR) format. The dictionary of people (popdict) is only a view
+created on demand from these arrays.
+
+By default (contact_order="set") contacts of each person are in the iteration
+order of the Python sets the contacts used to be collected in, so Covasim
+layers (p1, p2) and simulations with the same random seed are the same as with
+populations of earlier versions. With contact_order="sorted" contacts are in
+ascending order of their ids; this is faster, but the order of Covasim layers
+differs, so same-seed trajectories are not reproduced (e.g. cum_infections
+3190 with set order vs 3469 with sorted order for n=8000, seed 7, Covasim seed 3).
+"""
+import numpy as np
+import pandas as pd
+
+from . import defaults as spd
+
+__all__ = ["PopArrays", "ContactBuilder", "contact_orders"]
+
+
+contact_dtype = np.int32  # ids of contacts in CSR indices
+contact_orders = ["set", "sorted"]  # order of contacts of each person, see ContactBuilder
+id_columns = ["hhid", "scid", "wpid", "wpindcode", "ltcfid"]  # -1 means None
+flag_columns = ["ltcf_res", "ltcf_staff", "sc_student", "sc_teacher", "sc_staff"]  # False means None
+category_columns = ["sc_type", "sc_mixing_type"]  # codes into categories, -1 means None
+ltcf_columns = ["ltcf_res", "ltcf_staff", "ltcfid"]  # only in populations with long term care facilities
+person_keys = ["age", "sex", "loc", "contacts", "ltcf_res", "ltcf_staff", "hhid", "scid", "sc_student", "sc_teacher",
+               "sc_staff", "sc_type", "sc_mixing_type", "wpid", "wpindcode", "ltcfid"]  # key order of a person in popdict
+
+
+def group_members(groups):
+    """Members of groups and the index of the group of each member.
+
+    Args:
+        groups (list) : list of lists of ids
+
+    Returns:
+        np.ndarray, np.ndarray: ids of all members and the index of their group
+
+    """
+    sizes = np.fromiter((len(group) for group in groups), dtype=np.int64, count=len(groups))
+    if sizes.sum() == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    members = np.concatenate([np.asarray(group, dtype=np.int64) for group in groups if len(group)])
+    return members, np.repeat(np.arange(len(groups)), sizes)
+
+
+def group_edges(groups):
+    """Directed edges of fully connected groups (without self edges).
+
+    Args:
+        groups (list) : list of lists of ids
+
+    Returns:
+        np.ndarray, np.ndarray: sources and targets of edges
+
+    """
+    members, group_index = group_members(groups)
+    if len(members) == 0:
+        return members, members
+    sizes = np.bincount(group_index, minlength=len(groups))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    # each member is paired with every member of its group
+    source_pos = np.repeat(np.arange(len(members)), sizes[group_index])
+    pair_offsets = np.arange(len(source_pos)) - np.repeat(np.cumsum(sizes[group_index]) - sizes[group_index], sizes[group_index])
+    target_pos = starts[group_index[source_pos]] + pair_offsets
+    keep = source_pos != target_pos
+    return members[source_pos[keep]], members[target_pos[keep]]
+
+
+def edges_to_csr(n, sources, targets):
+    """CSR arrays of directed edges: duplicates and self edges are removed, contacts of each person are sorted.
+
+    Args:
+        n (int)              : number of people
+        sources (np.ndarray) : sources of edges
+        targets (np.ndarray) : targets of edges
+
+    Returns:
+        np.ndarray, np.ndarray: indptr (n + 1) and indices of contacts
+
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    keep = sources != targets
+    keys = np.unique(sources[keep] * n + targets[keep])
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+    return indptr, (keys % n).astype(contact_dtype)
+
+
+class ContactBuilder:
+    """Collects contacts of each layer during population generation and
+    converts them to CSR arrays at once. Functions adding contacts to a popdict
+    (e.g. sp.add_contacts_from_edgelist()) accept the builder too.
+
+    Operations are recorded as they were applied to the sets of contacts of
+    each person in a popdict. With contact_order "set", they are replayed on
+    Python sets when the layer is built, so contacts of each person are in the
+    same order as in the popdict of earlier versions (and populations with the
+    same seed give the same simulations). With contact_order "sorted", edges
+    are deduplicated with NumPy and contacts of each person are sorted.
+
+    Args:
+        n (int)             : number of people
+        layer_keys (list)   : layers
+        contact_order (str) : "set" or "sorted"
+    """
+
+    def __init__(self, n, layer_keys, contact_order="set"):
+        if contact_order not in contact_orders:
+            raise ValueError(f"Contact order {contact_order} is not supported, use one of {contact_orders}.")
+        self.n = n
+        self.layer_keys = list(layer_keys)
+        self.contact_order = contact_order
+        self.operations = {layer: [] for layer in self.layer_keys}
+
+    def add_edges(self, layer, sources, targets):
+        """Add undirected edges between sources[i] and targets[i]."""
+        sources = np.asarray(sources, dtype=np.int64).ravel()
+        targets = np.asarray(targets, dtype=np.int64).ravel()
+        self.operations[layer].append(("edges", sources, targets))
+
+    def add_edgelist(self, layer, edgelist):
+        """Add undirected edges from a list of (i, j) pairs."""
+        edgelist = np.asarray(list(edgelist), dtype=np.int64).reshape(-1, 2)
+        self.add_edges(layer, edgelist[:, 0], edgelist[:, 1])
+
+    def add_group(self, layer, group):
+        """Add a fully connected group to the contacts its members already have."""
+        self.operations[layer].append(("union", list(group)))
+
+    def set_group(self, layer, *groups):
+        """Set contacts of all members of groups to the other members of all groups."""
+        self.operations[layer].append(("group", [list(group) for group in groups]))
+
+    def set_neighbors(self, layer, uids, neighbors):
+        """Set contacts of uids[u] to uids[neighbors[u]] (e.g. neighbors of nodes of a graph)."""
+        self.operations[layer].append(("neighbors", np.asarray(uids, dtype=np.int64), [list(v) for v in neighbors]))
+
+    def build(self, layer):
+        """CSR arrays (indptr, indices) of the layer."""
+        if self.contact_order == "sorted":
+            return self.build_sorted(layer)
+        return self.build_set(layer)
+
+    def build_sorted(self, layer):
+        groups, parts = [], []
+        for operation in self.operations[layer]:
+            if operation[0] == "edges":
+                parts += [(operation[1], operation[2]), (operation[2], operation[1])]
+            elif operation[0] == "neighbors":
+                parts.append(self.neighbor_edges(*operation[1:]))  # already in both directions
+            elif operation[0] == "union":
+                groups.append(operation[1])
+            else:
+                groups.append([uid for group in operation[1] for uid in group])
+        parts.insert(0, group_edges(groups))
+        return edges_to_csr(self.n, np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+    @staticmethod
+    def neighbor_edges(uids, neighbors):
+        """Directed edges from uids[u] to uids[neighbors[u]]."""
+        sizes = [len(v) for v in neighbors]
+        targets = np.fromiter((u for v in neighbors for u in v), dtype=np.int64, count=sum(sizes))
+        return np.repeat(uids, sizes), uids[targets]
+
+    @staticmethod
+    def group_set(groups):
+        """Set of members of groups, united as in the popdict (e.g. set(facility).union(set(facility_staff)))."""
+        members = set(groups[0])
+        for group in groups[1:]:
+            members = members.union(set(group))
+        return members
+
+    def build_set(self, layer):
+        contacts = [()] * self.n
+        group_of = {}  # groups of people whose contacts are a list made from a group set
+        for operation in self.operations[layer]:
+            if operation[0] == "group":
+                # every member gets the set of the group without itself (removing keeps the order of the set),
+                # so the set is created once per group
+                order = list(self.group_set(operation[1]))
+                for uid in order:
+                    contacts[uid] = [v for v in order if v != uid]
+                    group_of[uid] = operation[1]
+            elif operation[0] == "union":
+                group = operation[1]
+                for uid in group:
+                    person = self.as_set(contacts, group_of, uid).union(group)
+                    person.remove(uid)
+                    contacts[uid] = person
+            elif operation[0] == "edges":
+                for i, j in zip(operation[1].tolist(), operation[2].tolist()):
+                    self.as_set(contacts, group_of, i).add(j)
+                    self.as_set(contacts, group_of, j).add(i)
+            else:
+                uids, neighbors = operation[1:]
+                for uid, v in zip(uids.tolist(), neighbors):
+                    person = set(uids[v].tolist())
+                    person.discard(uid)
+                    contacts[uid] = person
+                    group_of.pop(uid, None)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in contacts], out=indptr[1:])
+        indices = np.fromiter((v for c in contacts for v in c), dtype=contact_dtype, count=indptr[-1])
+        return indptr, indices
+
+    @classmethod
+    def as_set(cls, contacts, group_of, uid):
+        """Set of contacts of uid (a list made from a group set is created again as the set in the popdict)."""
+        person = contacts[uid]
+        if not isinstance(person, set):
+            if uid in group_of:
+                person = cls.group_set(group_of.pop(uid))
+                person.remove(uid)
+            else:
+                person = set()
+            contacts[uid] = person
+        return person
+
+
+class PopArrays:
+    """Population as columns of person attributes and CSR contacts by layer.
+    Row i of every array is the person with uid i.
+
+    Args:
+        n (int)           : number of people
+        layer_keys (list) : layers of contacts
+        with_ltcf (bool)  : If True, people have attributes of long term care facilities.
+    """
+
+    def __init__(self, n, layer_keys, with_ltcf=False):
+        self.n = int(n)
+        self.layer_keys = list(layer_keys)
+        self.with_ltcf = with_ltcf
+        self.columns = dict(age=np.zeros(self.n, dtype=np.int16),
+                            sex=np.zeros(self.n, dtype=np.int8))
+        self.columns.update({key: np.full(self.n, -1, dtype=np.int32) for key in id_columns})
+        self.columns.update({key: np.zeros(self.n, dtype=bool) for key in flag_columns})
+        self.columns.update({key: np.full(self.n, -1, dtype=np.int8) for key in category_columns})
+        self.categories = {key: [] for key in category_columns}
+        empty = (np.zeros(self.n + 1, dtype=np.int64), np.zeros(0, dtype=contact_dtype))
+        self.indptr = {layer: empty[0] for layer in self.layer_keys}
+        self.indices = {layer: empty[1] for layer in self.layer_keys}
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    @property
+    def nbytes(self):
+        """Memory of all arrays in bytes."""
+        return sum(a.nbytes for a in self.columns.values()) + sum(self.indptr[k].nbytes + self.indices[k].nbytes for k in self.layer_keys)
+
+    def set_groups(self, key, groups, offset=0):
+        """Set id column key of members of each group to the index of the group (plus offset)."""
+        members, group_index = group_members(groups)
+        self.columns[key][members] = group_index + offset
+
+    def set_value(self, key, uids, value):
+        """Set column key of people uids to value (a string for category columns)."""
+        uids = np.asarray(uids, dtype=np.int64)
+        if key in category_columns:
+            value = self.category_code(key, value)
+        self.columns[key][uids] = value
+
+    def category_code(self, key, value):
+        if value is None:
+            return -1
+        if value not in self.categories[key]:
+            self.categories[key].append(value)
+        return self.categories[key].index(value)
+
+    def set_contacts(self, layer, indptr, indices):
+        """Set CSR contacts of the layer."""
+        if layer not in self.layer_keys:
+            self.layer_keys.append(layer)
+        self.indptr[layer] = indptr
+        self.indices[layer] = indices
+
+    def contacts(self, layer, uid):
+        """Contacts of person uid in the layer."""
+        return self.indices[layer][self.indptr[layer][uid]:self.indptr[layer][uid + 1]]
+
+    def degree(self, layer):
+        """Number of contacts of each person in the layer."""
+        return np.diff(self.indptr[layer])
+
+    def edges(self, layer):
+        """Directed edges (sources, targets) of the layer, every contact is there in both directions."""
+        return np.repeat(np.arange(self.n, dtype=self.indices[layer].dtype), self.degree(layer)), self.indices[layer]
+
+    def value(self, key, uid):
+        """Value of person attribute key as in popdict (None for missing values)."""
+        v = self.columns[key][uid]
+        if key in id_columns or key in category_columns:
+            if v < 0:
+                return None
+            return self.categories[key][v] if key in category_columns else int(v)
+        if key in flag_columns:
+            return 1 if v else None
+        return int(v)
+
+    def keys_of_person(self):
+        return [key for key in person_keys if self.with_ltcf or key not in ltcf_columns]
+
+    def person(self, uid):
+        """Dictionary of person uid as in popdict."""
+        person = {}
+        for key in self.keys_of_person():
+            if key == "loc":
+                person[key] = None
+            elif key == "contacts":
+                person[key] = {layer: self.contacts(layer, uid).tolist() for layer in self.layer_keys}
+            else:
+                person[key] = self.value(key, uid)
+        return person
+
+    def to_popdict(self):
+        """Dictionary of people (popdict) created from the arrays.
+
+        Returns:
+            dict: Dictionary keys are ids of people and values are dictionaries of their attributes and contacts.
+
+        """
+        keys = self.keys_of_person()
+        values = {}
+        for key in keys:
+            if key == "loc":
+                values[key] = [None] * self.n
+            elif key == "contacts":
+                values[key] = {layer: np.split(self.indices[layer], self.indptr[layer][1:-1]) for layer in self.layer_keys}
+            elif key in id_columns:
+                column = self.columns[key].tolist()
+                values[key] = [None if v < 0 else v for v in column]
+            elif key in category_columns:
+                names = self.categories[key]
+                values[key] = [None if v < 0 else names[v] for v in self.columns[key].tolist()]
+            elif key in flag_columns:
+                values[key] = [1 if v else None for v in self.columns[key].tolist()]
+            else:
+                values[key] = self.columns[key].tolist()
+        popdict = {}
+        for uid in range(self.n):
+            person = {}
+            for key in keys:
+                if key == "contacts":
+                    person[key] = {layer: values[key][layer][uid].tolist() for layer in self.layer_keys}
+                else:
+                    person[key] = values[key][uid]
+            popdict[uid] = person
+        return popdict
+
+    @classmethod
+    def from_popdict(cls, popdict, layer_keys=None):
+        """Create arrays from a dictionary of people (ids must be 0 to n-1).
+        The order of contacts of each person is kept.
+
+        Args:
+            popdict (dict)    : dictionary of people
+            layer_keys (list) : layers, if None, layers of contacts of the first person
+
+        Returns:
+            sp.PopArrays: population arrays
+
+        """
+        n = len(popdict)
+        if n and (min(popdict) != 0 or max(popdict) != n - 1):
+            raise ValueError("Ids of people in popdict must be 0 to n-1 to convert it to arrays.")
+        first = popdict[0] if n else {}
+        if layer_keys is None:
+            layer_keys = list(first.get("contacts", {}).keys())
+        arrays = cls(n, layer_keys, with_ltcf="ltcfid" in first)
+        people = [popdict[uid] for uid in range(n)]
+        arrays.columns["age"][:] = [person["age"] for person in people]
+        arrays.columns["sex"][:] = [person["sex"] for person in people]
+        for key in id_columns + flag_columns:
+            if key in first:
+                values = [person.get(key) for person in people]
+                if key in flag_columns:
+                    arrays.columns[key][:] = [v is not None and bool(v) for v in values]
+                else:
+                    arrays.columns[key][:] = [-1 if v is None else v for v in values]
+        for key in category_columns:
+            if key in first:
+                arrays.columns[key][:] = [arrays.category_code(key, person.get(key)) for person in people]
+        for layer in layer_keys:
+            contacts = [person["contacts"].get(layer, ()) for person in people]
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum([len(c) for c in contacts], out=indptr[1:])
+            indices = np.fromiter((c for cs in contacts for c in cs), dtype=contact_dtype, count=indptr[-1])
+            arrays.set_contacts(layer, indptr, indices)
+        return arrays
+
+    def named_arrays(self):
+        """All arrays by name (columns/<key>, indptr/<layer>, indices/<layer>)."""
+        named = {f"columns/{key}": column for key, column in self.columns.items()}
+        for layer in self.layer_keys:
+            named[f"indptr/{layer}"] = self.indptr[layer]
+            named[f"indices/{layer}"] = self.indices[layer]
+        return named
+
+    @classmethod
+    def from_named_arrays(cls, n, layer_keys, named, categories=None, with_ltcf=False):
+        """Create population arrays from existing arrays (e.g. memory mapped), without copying them.
+
+        Args:
+            n (int)            : number of people
+            layer_keys (list)  : layers of contacts
+            named (dict)       : arrays by name, as from named_arrays()
+            categories (dict)  : values of category columns
+            with_ltcf (bool)   : If True, people have attributes of long term care facilities.
+
+        Returns:
+            sp.PopArrays: population arrays
+
+        """
+        arrays = cls(0, layer_keys, with_ltcf=with_ltcf)
+        arrays.n = int(n)
+        arrays.columns = {name.split("/", 1)[1]: array for name, array in named.items() if name.startswith("columns/")}
+        arrays.categories = {key: list(values) for key, values in (categories or arrays.categories).items()}
+        for layer in arrays.layer_keys:
+            arrays.indptr[layer] = named[f"indptr/{layer}"]
+            arrays.indices[layer] = named[f"indices/{layer}"]
+        return arrays
+
+    def count_ages(self, max_age=None):
+        """Age count of the population (keys 0 to max_age - 1)."""
+        max_age = spd.settings.max_age if max_age is None else max_age
+        counts = np.bincount(self.columns["age"], minlength=max_age)
+        if len(counts) > max_age:
+            raise KeyError(f"Age {len(counts) - 1} is out of range 0-{max_age - 1}.")
+        return dict(zip(np.arange(0, max_age), counts.tolist()))
+
+    def group_sizes(self, key, mask=None):
+        """Number of people by id in column key (people with None are not counted)."""
+        ids = self.columns[key] if mask is None else self.columns[key][mask]
+        ids, first, counts = np.unique(ids[ids >= 0], return_index=True, return_counts=True)
+        order = np.argsort(first)  # ids in order of their first member, as in the popdict
+        return dict(zip(ids[order].tolist(), counts[order].tolist()))
+
+    def household_heads(self):
+        """Id of the head (member with minimal id) of each household."""
+        hhid = self.columns["hhid"]
+        uids = np.flatnonzero(hhid >= 0)
+        ids, first = np.unique(hhid[uids], return_index=True)  # uids are sorted, first member has minimal id
+        order = np.argsort(first)
+        return dict(zip(ids[order].tolist(), uids[first[order]].tolist()))
+
+    def ltcf_sizes(self, keys_to_exclude=[]):
+        """Size of each long term care facility, see sp.get_ltcf_sizes()."""
+        if not self.with_ltcf:
+            return {}
+        included = np.zeros(self.n, dtype=bool)
+        for key in ["ltcf_res", "ltcf_staff"]:
+            if key not in keys_to_exclude:
+                included |= self.columns[key]
+        sizes = dict.fromkeys(self.group_sizes("ltcfid"), 0)
+        sizes.update(self.group_sizes("ltcfid", included))
+        return sizes
+
+    def count_enrollment_by_age(self, max_age=None):
+        """Count of enrolled students by age."""
+        max_age = spd.settings.max_age if max_age is None else max_age
+        students = (self.columns["scid"] >= 0) & self.columns["sc_student"]
+        counts = np.bincount(self.columns["age"][students], minlength=max_age)
+        return dict(zip(np.arange(0, max_age), counts[:max_age].tolist()))
+
+    def count_enrollment_by_school_type(self, with_school_types=False, keys_to_exclude=[]):
+        """Enrollment sizes by school type, see sp.count_enrollment_by_school_type()."""
+        students = (self.columns["scid"] >= 0) & self.columns["sc_student"]
+        scids, first, counts = np.unique(self.columns["scid"][students], return_index=True, return_counts=True)
+        order = np.argsort(first)  # schools in order of their first student, as in the popdict
+        type_codes = self.columns["sc_type"][students][first[order]]
+        enrollment_by_school_type = dict()
+        for code, count in zip(type_codes.tolist(), counts[order].tolist()):
+            sc_type = None if code < 0 else self.categories["sc_type"][code]
+            enrollment_by_school_type.setdefault(sc_type, []).append(count)
+        if not with_school_types:
+            sc_types = set(enrollment_by_school_type.keys())
+            if None not in sc_types:
+                enrollment_by_school_type[None] = []
+                for sc_type in set(sc_types.difference(set(keys_to_exclude))):
+                    enrollment_by_school_type[None].extend(enrollment_by_school_type[sc_type])
+                    enrollment_by_school_type.pop(sc_type, None)
+        return enrollment_by_school_type
+
+    def count_employment_by_age(self, max_age=None):
+        """Count of employed people (staff of long term care facilities or schools, workers) by age."""
+        max_age = spd.settings.max_age if max_age is None else max_age
+        # wpid 0 is not counted, as in sp.count_employment_by_age()
+        employed = self.columns["ltcf_staff"] | self.columns["sc_teacher"] | self.columns["sc_staff"] | (self.columns["wpid"] > 0)
+        counts = np.bincount(self.columns["age"][employed], minlength=max_age)
+        return dict(zip(np.arange(0, max_age), counts[:max_age].tolist()))
+
+    def layer_degree(self, layer, layer_id, uids_included, age_by_uid):
+        """Dataframe of uid, age, degree and ages of contacts of people in the layer, see sp.count_layer_degree()."""
+        uids = np.asarray(uids_included, dtype=np.int64)
+        uids = uids[self.columns[layer_id][uids] >= 0]
+        if len(uids) == 0:
+            return pd.DataFrame()
+        age_by_uid = np.asarray(age_by_uid)
+        indptr, indices = self.indptr[layer], self.indices[layer]
+        starts, degree = indptr[uids], indptr[uids + 1] - indptr[uids]
+        ends = np.cumsum(degree)
+        positions = np.arange(ends[-1]) - np.repeat(ends - degree - starts, degree)  # contacts of uids in CSR indices
+        contact_ages = np.split(age_by_uid[indices[positions]], ends[:-1])
+        return pd.DataFrame({"uid": uids, "age": age_by_uid[uids], "degree": degree,
+                             "contact_ages": [a.tolist() for a in contact_ages]})
+
+    def count_contacts_with(self, layer, key):
+        """Number of contacts of each person in the layer who have flag column key set."""
+        if layer not in self.indptr:
+            return np.zeros(self.n, dtype=np.int64)
+        counts = np.concatenate([[0], np.cumsum(self.columns[key][self.indices[layer]], dtype=np.int64)])
+        return counts[self.indptr[layer][1:]] - counts[self.indptr[layer][:-1]]
+
+    def contact_counts_by_layer(self, layer="S", with_layer_ids=False):
+        """Contact counts by the role of people and of their contacts in the layer, see sp.get_contact_counts_by_layer()."""
+        layer = layer.upper()
+        layer_ids = {"S": "scid", "W": "wpid", "H": "hhid", "LTCF": "ltcfid"}
+        if layer == "S":
+            people_types = ["sc_student", "sc_teacher", "sc_staff"]
+            contact_types = people_types + ["all_staff", "all"]
+        elif layer == "LTCF":
+            people_types = ["ltcf_res", "ltcf_staff"]
+            contact_types = people_types + ["all"]
+        elif layer in ["W", "H"]:
+            people_types = [layer_ids[layer]]
+            contact_types = ["all"]
+        else:
+            raise NotImplementedError(f"layer {layer} not supported.")
+
+        uids = np.flatnonzero(self.columns[layer_ids[layer]] >= 0)
+        counts = {"all": self.degree(layer)[uids] if layer in self.indptr else np.zeros(len(uids), dtype=np.int64)}
+        if layer == "S":  # counts by type of contact only in schools, other layers count all contacts
+            for key in people_types:
+                counts[key] = self.count_contacts_with(layer, key)[uids]
+            counts["all_staff"] = counts["sc_teacher"] + counts["sc_staff"]
+        contact_counter = dict()
+        for people_type in people_types:
+            members = self.columns[people_type][uids] if people_type in flag_columns else np.ones(len(uids), dtype=bool)
+            contact_counter[people_type] = {contact_type: counts[contact_type][members].tolist() if contact_type in counts else []
+                                            for contact_type in contact_types}
+        if not with_layer_ids:
+            return contact_counter
+
+        ids = self.columns[layer_ids[layer]][uids]
+        order = np.argsort(ids, kind="stable")
+        unique_ids, first, sizes = np.unique(ids, return_index=True, return_counts=True)
+        by_id = dict(zip(unique_ids.tolist(), (a.tolist() for a in np.split(counts["all"][order], np.cumsum(sizes)[:-1]))))
+        contacts_counter_by_id = {layer_id: by_id[layer_id] for layer_id in unique_ids[np.argsort(first)].tolist()}  # in order of first member
+        return contact_counter, contacts_counter_by_id
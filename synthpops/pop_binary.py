@@ -0,0 +1,137 @@
+"""This module provides the binary population file format: one file with a
+JSON manifest followed by raw NumPy arrays (person attributes, contacts of each
+layer in CSR format, other numeric arrays of the population) and a pickle of
+the remaining attributes of the population. Arrays are memory mapped on load
+(pages are shared by processes loading the same file), the remaining
+attributes are only unpickled when they are first used.
+
+File layout::
+
+    magic (8 bytes) | manifest length (uint64, little endian) | manifest (JSON) | aligned sections
+"""
+
+import json
+import pickle
+
+import numpy as np
+
+from . import pop_arrays as sppa
+from . import version as spv
+
+__all__ = ["is_binary_population", "save_binary_population", "load_binary_population"]
+
+
+magic = b"SPPOPBIN"
+format_version = 1
+alignment = 64  # sections start at multiples of this offset (from the start of data)
+
+
+def aligned(offset):
+    """Offset rounded up to the alignment of sections."""
+    return -(-offset // alignment) * alignment
+
+
+def is_binary_population(filename):
+    """Check if the file is a population in the binary format.
+
+    Args:
+        filename (str) : path to the file
+
+    Returns:
+        bool: True if the file starts with the magic bytes of the binary format.
+
+    """
+    try:
+        with open(filename, "rb") as file:
+            return file.read(len(magic)) == magic
+    except OSError:
+        return False
+
+
+def save_binary_population(pop, filename):
+    """Save population to a binary population file.
+
+    Args:
+        pop (sp.Pop)   : population
+        filename (str) : path to the file
+
+    Returns:
+        str: filename
+    """
+    state = pop.__getstate__()
+    arrays = state.pop("arrays")
+    sections = arrays.named_arrays()
+    for key, value in list(state.items()):  # other numeric arrays of the population are mapped too
+        if isinstance(value, np.ndarray) and value.dtype.kind in "biuf":
+            sections[f"state/{key}"] = np.ascontiguousarray(state.pop(key))
+    state_bytes = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    manifest = dict(format="synthpops-population", version=format_version, synthpops_version=spv.__version__,
+                    n=int(arrays.n), layer_keys=arrays.layer_keys, with_ltcf=bool(arrays.with_ltcf),
+                    categories=arrays.categories, arrays={})
+    offset = 0
+    for name, array in sections.items():
+        manifest["arrays"][name] = dict(dtype=array.dtype.str, shape=list(array.shape), offset=offset)
+        offset = aligned(offset + array.nbytes)
+    manifest["state"] = dict(offset=offset, nbytes=len(state_bytes))
+
+    header = json.dumps(manifest).encode()
+    data_start = aligned(len(magic) + 8 + len(header))
+    with open(filename, "wb") as file:
+        file.write(magic)
+        file.write(np.uint64(len(header)).tobytes())
+        file.write(header)
+        for name, array in sections.items():
+            file.seek(data_start + manifest["arrays"][name]["offset"])
+            file.write(memoryview(np.ascontiguousarray(array)).cast("B"))
+        file.seek(data_start + manifest["state"]["offset"])
+        file.write(state_bytes)
+    return filename
+
+
+def read_manifest(filename):
+    """Manifest of binary population file and the offset of its data."""
+    with open(filename, "rb") as file:
+        if file.read(len(magic)) != magic:
+            raise ValueError(f"{filename} is not a binary population file.")
+        length = int(np.frombuffer(file.read(8), dtype="<u8")[0])
+        manifest = json.loads(file.read(length))
+    if manifest.get("version", 0) > format_version:
+        raise ValueError(f"Binary population file {filename} has version {manifest.get('version')}, "
+                         f"this version of SynthPops reads versions up to {format_version}.")
+    return manifest, aligned(len(magic) + 8 + length)
+
+
+def load_binary_population(filename, mmap_mode="r"):
+    """Load binary population file. Arrays are memory mapped, other attributes
+    are loaded by the returned function.
+
+    Args:
+        filename (str)  : path to the file
+        mmap_mode (str) : mode of np.memmap, "r" (read only) or "c" (copy on write)
+
+    Returns:
+        tuple: state of the population with arrays (arrays, n and other numeric arrays), and a function returning the remaining attributes.
+
+    """
+    manifest, data_start = read_manifest(filename)
+    data = np.memmap(filename, dtype=np.uint8, mode=mmap_mode)
+    sections = {}
+    for name, meta in manifest["arrays"].items():
+        dtype = np.dtype(meta["dtype"])
+        start = data_start + meta["offset"]
+        count = int(np.prod(meta["shape"], dtype=np.int64))
+        sections[name] = data[start:start + count * dtype.itemsize].view(dtype).reshape(meta["shape"])
+
+    arrays = {name: array for name, array in sections.items() if not name.startswith("state/")}
+    state = {name.split("/", 1)[1]: array for name, array in sections.items() if name.startswith("state/")}
+    state["n"] = manifest["n"]
+    state["arrays"] = sppa.PopArrays.from_named_arrays(manifest["n"], manifest["layer_keys"], arrays,
+                                                       categories=manifest["categories"], with_ltcf=manifest["with_ltcf"])
+    start = data_start + manifest["state"]["offset"]
+    state_bytes = data[start:start + manifest["state"]["nbytes"]]  # mapping stays valid if the file is replaced
+
+    def load_rest():
+        return pickle.loads(state_bytes)
+
+    return state, load_rest
@@ -23,6 +23,7 @@ from . import base as spb
 from . import contact_networks as spcnx
 from . import data_distributions as spdata
 from . import defaults
+from . import pop_arrays as sppa
 from . import sampling as spsamp
 from .config import logger as log
 
@@ -650,7 +651,7 @@ def add_contacts_from_edgelist(popdict, edgelist, setting):
     contacts.
 
     Args:
-        popdict (dict)  : dict of people
+        popdict (dict)  : dict of people or sp.ContactBuilder
         edgelist (list) : list of edges
         setting (str)   : social setting layer
 
@@ -658,6 +659,10 @@ def add_contacts_from_edgelist(popdict, edgelist, setting):
         Updated popdict.
 
     """
+    if isinstance(popdict, sppa.ContactBuilder):
+        popdict.add_edgelist(setting, edgelist)
+        return popdict
+
     for e in edgelist:
         i, j = e
 
@@ -673,7 +678,7 @@ def add_contacts_from_group(popdict, group, setting):
     contacts.
 
     Args:
-        popdict (dict) : dict of people
+        popdict (dict) : dict of people or sp.ContactBuilder
         group (list)   : list of people in group
         setting (str)  : social setting layer
 
@@ -681,6 +686,10 @@ def add_contacts_from_group(popdict, group, setting):
         Updated popdict.
 
     """
+    if isinstance(popdict, sppa.ContactBuilder):
+        popdict.add_group(setting, group)
+        return popdict
+
     for i in group:
         popdict[i]["contacts"][setting] = popdict[i]["contacts"][setting].union(group)
         popdict[i]["contacts"][setting].remove(i)
@@ -1172,7 +1181,7 @@ def add_school_edges(popdict, student_uids, student_ages, teacher_uids, non_teac
     inter_grade_mixing has no effect.
 
     Args:
-        popdict (dict)                          : dictionary of people
+        popdict (dict)                          : dictionary of people or sp.ContactBuilder
         student_uids (list)                     : list of uids of students in the school
         student_ages (list)                     : list of the ages of the students in the school
         teacher_uids (list)                     : list of teachers in the school
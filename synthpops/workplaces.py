@@ -1,3 +1,5 @@
+import bisect
+import itertools
 from collections import Counter
 from copy import deepcopy
 
@@ -258,15 +260,22 @@ def assign_rest_of_workers(workplace_sizes, potential_worker_uids, potential_wor
         dictionary of potential workers left mapping id to age, dictionary mapping age to a list of potential workers left of that age, dictionary
         mapping age to the count of workers left to assign.
 
+    Notes:
+        Potential workers of each age are kept as a stack (list with a head index) and the count of workers left to assign is kept per age and
+        per age bracket, so placing a worker does not search lists or renormalize the age distribution. Age brackets of the coworkers of one
+        workplace are sampled at once and resampled only when a bracket runs out of workers. Brackets without workers left are never sampled,
+        which gives the same distribution as rejecting them one by one.
+
     """
     log.debug("assign_rest_of_workers()")
     workplace_age_lists = []
     workplace_uid_lists = []
-    worker_age_keys = workers_by_age_to_assign_count.keys()
-    sorted_worker_age_keys = sorted(worker_age_keys)
+    sorted_worker_age_keys = sorted(workers_by_age_to_assign_count.keys())
+    age_keys = np.array(sorted_worker_age_keys, dtype=int)
 
     # make a copy of the workplace matrix to sample from and modify as people get placed into workplaces and removed from the pool of potential workers
     w_contact_matrix = contact_matrices["W"].copy()
+    n_brackets = w_contact_matrix.shape[1]
 
     # off turn likelihood to meet those unemployed in the workplace because the matrices are not an exact match for the population under study
     for b in age_brackets:
@@ -276,28 +285,62 @@ def assign_rest_of_workers(workplace_sizes, potential_worker_uids, potential_wor
             b = min(b, w_contact_matrix.shape[1] - 1)  # Ensure it doesn't go past the end of the array
             w_contact_matrix[:, b] = 0
 
+    # array state: count left to assign, stack of potential workers and its head by age, counts left by bracket
+    n_ages = int(max(max(sorted_worker_age_keys), max(potential_worker_uids_by_age.keys(), default=0))) + 1
+    count = [0] * n_ages
+    for a in sorted_worker_age_keys:
+        count[int(a)] = int(workers_by_age_to_assign_count[a])
+    pool = [list(potential_worker_uids_by_age.get(a, [])) for a in range(n_ages)]
+    pool_size = [len(p) for p in pool]
+    head = [0] * n_ages
+    bracket_ages = [[int(a) for a in age_brackets[b]] for b in range(n_brackets)]
+    bracket_left = [sum(count[a] for a in ages) for ages in bracket_ages]  # count left in bracket
+    bracket_assignable = [sum(count[a] for a in ages if pool[a]) for ages in bracket_ages]  # count left with potential workers left
+    bracket_on = [bool(np.any(w_contact_matrix[:, b])) for b in range(n_brackets)]  # bracket is not turned off in the contact matrix
+    count_left = sum(count)
+    pool_left = sum(pool_size)
+    potential_left = len(potential_worker_uids)
+
+    def assignable(a):
+        return count[a] if head[a] < pool_size[a] else 0
+
+    def take(a, n=1, drop=0):
+        """Take n potential workers of age a from the stack (and drop count of other workers of age a left to assign)."""
+        nonlocal count_left, pool_left, potential_left
+        n = min(n, pool_size[a] - head[a])
+        before = assignable(a)
+        uids = pool[a][head[a]:head[a] + n]
+        head[a] += n
+        count[a] -= n + drop
+        b = age_by_brackets.get(a)
+        if b is not None and b < n_brackets:
+            bracket_left[b] -= n + drop
+            bracket_assignable[b] += assignable(a) - before
+        count_left -= n + drop
+        pool_left -= n
+        for uid in uids:
+            if potential_worker_uids.pop(uid, None) is not None:
+                potential_left -= 1
+        return uids
+
+    def bracket_cumsum(b_prob):
+        """Cumulative probabilities of brackets of coworkers (brackets without workers left are excluded)."""
+        weights = b_prob * (np.array(bracket_assignable) > 0)
+        return np.cumsum(weights)
+
     for n, size in enumerate(workplace_sizes):
-        workers_by_age_to_assign_distr = spb.norm_dic(workers_by_age_to_assign_count)
-        if sum(workers_by_age_to_assign_distr.values()) == 0:
+        if count_left == 0:
             break
-        if sum([len(v) for v in potential_worker_uids_by_age.values()]) == 0:
+        if pool_left == 0:
             break
         new_work, new_work_uids = [], []
 
-        a_prob = [workers_by_age_to_assign_count[a] for a in sorted_worker_age_keys]
-        a_prob = np.array(a_prob)
-        a_prob = a_prob / np.sum(a_prob)
-
-        achoice = np.random.choice(a=sorted_worker_age_keys, p=a_prob)
-        aindex = achoice
-
-        uid = potential_worker_uids_by_age[aindex][0]
-        potential_worker_uids_by_age[aindex].remove(uid)
-        potential_worker_uids.pop(uid, None)
-        workers_by_age_to_assign_count[aindex] -= 1
-        workers_by_age_to_assign_distr = spb.norm_dic(workers_by_age_to_assign_count)
+        a_prob = np.array(count)[age_keys]
+        aindex = int(np.random.choice(a=sorted_worker_age_keys, p=a_prob / np.sum(a_prob)))
+        if head[aindex] >= pool_size[aindex]:
+            raise IndexError(f"No potential workers of age {aindex} left to assign.")
         new_work.append(aindex)
-        new_work_uids.append(uid)
+        new_work_uids.extend(take(aindex))
 
         bindex = age_by_brackets[aindex]
         bindex = min(bindex, w_contact_matrix.shape[0] - 1)  # Ensure it doesn't go past the end of the array
@@ -306,59 +349,64 @@ def assign_rest_of_workers(workplace_sizes, potential_worker_uids, potential_wor
         if sum_b_prob > 0: # pragma: no cover
             b_prob = b_prob / sum_b_prob
 
-        if size > len(potential_worker_uids) - 1: # pragma: no cover
-            size = len(potential_worker_uids) - 1
-        workers_left_count = np.sum([workers_by_age_to_assign_count[a] for a in workers_by_age_to_assign_count])
-        if size > workers_left_count:
-            size = workers_left_count + 1
+        if size > potential_left - 1: # pragma: no cover
+            size = potential_left - 1
+        if size > count_left:
+            size = count_left + 1
 
         # not enough people left over to try to match age mixing patterns in the last workplace so grab everyone who will get placed in order
-        if len(potential_worker_uids) <= size or workers_left_count <= size:
-            for ai in workers_by_age_to_assign_count:
-                for i in range(workers_by_age_to_assign_count[ai]):  # do not change this during the loop but afterwards, and if 0 then no one will be placed
-                    uid = potential_worker_uids_by_age[ai][0]
-                    new_work.append(ai)
-                    new_work_uids.append(uid)
-                    potential_worker_uids_by_age[ai].remove(uid)
-                    potential_worker_uids.pop(uid, None)
-                workers_by_age_to_assign_count[ai] = 0  # set to zero now that everyone will be placed in this last workplace
-            workers_by_age_to_assign_distr = spb.norm_dic(workers_by_age_to_assign_count)
-        else:
-            for i in range(1, size):
-
-                bi = spsamp.fast_choice(b_prob)
-
-                workers_left_in_bracket = [workers_by_age_to_assign_count[a] for a in age_brackets[bi] if len(potential_worker_uids_by_age[a]) > 0]
-
-                if np.sum(b_prob): # pragma: no cover
-                    loop_b_prob = sc.dcp(b_prob)  # Make a copy to avoid overwriting the original
-                    while np.sum(workers_left_in_bracket) == 0:
-                        loop_b_prob[bi] = 0  # Don't pick the same bracket ever again
-                        bi = spsamp.fast_choice(loop_b_prob)
-                        workers_left_in_bracket = [workers_by_age_to_assign_count[a] for a in age_brackets[bi] if len(potential_worker_uids_by_age[a]) > 0]
-                    a_prob = [workers_by_age_to_assign_count[a] for a in age_brackets[bi]]
-                    ai = age_brackets[bi][spsamp.fast_choice(a_prob)]
-
-                    uid = potential_worker_uids_by_age[ai][0]
-                    new_work.append(ai)
-                    new_work_uids.append(uid)
-                    potential_worker_uids_by_age[ai].remove(uid)
-                    potential_worker_uids.pop(uid, None)
-                    workers_by_age_to_assign_count[ai] -= 1
-                    workers_by_age_to_assign_distr = spb.norm_dic(workers_by_age_to_assign_count)
-
+        if potential_left <= size or count_left <= size:
+            for a in sorted_worker_age_keys:
+                a = int(a)
+                if count[a] > 0:
+                    uids = take(a, count[a])
+                    new_work.extend([a] * len(uids))
+                    new_work_uids.extend(uids)
+                    take(a, 0, drop=count[a])  # set to zero now that everyone will be placed in this last workplace
+        elif sum_b_prob > 0:
+            # sample brackets of all coworkers at once, resample the rest when a bracket runs out of workers
+            draws = np.random.random(size=(max(int(size) - 1, 0), 2))
+            b_draws, a_draws = draws[:, 0], draws[:, 1].tolist()
+            b_cum = bracket_cumsum(b_prob)
+            brackets = np.searchsorted(b_cum, b_draws * b_cum[-1], side="right").tolist()
+            for i in range(len(draws)):
+                if b_cum[-1] <= 0:  # no bracket of contacts has workers left, sample from all workers left
+                    a_prob = [assignable(a) for a in range(n_ages)]
+                    if sum(a_prob) == 0:
+                        break
+                    ai = spsamp.fast_choice(a_prob)
+                else:
+                    ages = bracket_ages[min(brackets[i], n_brackets - 1)]
+                    a_cum = list(itertools.accumulate([count[a] if head[a] < pool_size[a] else 0 for a in ages]))
+                    ai = ages[min(bisect.bisect(a_cum, a_draws[i] * a_cum[-1]), len(ages) - 1)]
+                new_work.append(ai)
+                new_work_uids.extend(take(ai))
+
+                bi = age_by_brackets[ai]
+                changed = bi < n_brackets and bracket_assignable[bi] == 0
                 # if there's no one left in the bracket, then you should turn this bracket off in the contact matrix
-                workers_left_in_bracket = [workers_by_age_to_assign_count[a] for a in age_brackets[bi]]
-                if np.sum(workers_left_in_bracket) == 0:
+                if bi < n_brackets and bracket_left[bi] <= 0 and bracket_on[bi]:
                     w_contact_matrix[:, bi] = 0.
+                    bracket_on[bi] = False
                     # since the matrix was modified, calculate the bracket probabilities again
                     b_prob = w_contact_matrix[bindex, :]
                     if np.sum(b_prob) > 0: # pragma: no cover
                         b_prob = b_prob / np.sum(b_prob)
+                    changed = True
+                if changed:
+                    b_cum = bracket_cumsum(b_prob)
+                    if b_cum[-1] > 0:
+                        brackets[i + 1:] = np.searchsorted(b_cum, b_draws[i + 1:] * b_cum[-1], side="right").tolist()
 
         log.debug(f"  Progress: {n}, {Counter(new_work)}")
         workplace_age_lists.append(new_work)
         workplace_uid_lists.append(new_work_uids)
+
+    for a in potential_worker_uids_by_age:
+        if head[int(a)]:
+            potential_worker_uids_by_age[a] = pool[int(a)][head[int(a)]:]
+    for a in workers_by_age_to_assign_count:
+        workers_by_age_to_assign_count[a] = count[int(a)]
     return workplace_age_lists, workplace_uid_lists, potential_worker_uids, potential_worker_uids_by_age, workers_by_age_to_assign_count
 
 